@@ -1,26 +1,24 @@
-from groq import Groq
-from config import GROQ_API_KEY, MODEL_NAME
-from agents.repo_analyzer import analyze_repo
+import asyncio
 import re
+from agents.llm import complete, complete_async, stream_async, PRIORITY_INTERACTIVE
+from agents.repo_analyzer import analyze_repo
+from utils.context import truncate_to_tokens, fit_history
 
-client = Groq(api_key=GROQ_API_KEY)
+GITHUB_PATTERN = r'https?://github\.com/[\w-]+/[\w-]+'
 
-def get_conversation_response(message, history):
-    """
-    Conversational agent that guides users through project planning.
-    """
-    
-    # Check if message contains a GitHub URL
-    github_pattern = r'https?://github\.com/[\w-]+/[\w-]+'
-    github_match = re.search(github_pattern, message)
-    
-    if github_match:
-        repo_url = github_match.group(0)
-        print(f"Analyzing repo: {repo_url}")
-        
-        # Analyze the repository
-        repo_summary = analyze_repo(repo_url)
-        
+# Token budgets for the repo summary and the chat history in a prompt
+REPO_SUMMARY_TOKENS = 2500
+REVIEW_HISTORY_TOKENS = 1000
+HISTORY_TOKENS = 3000
+
+
+def _find_repo_url(message):
+    github_match = re.search(GITHUB_PATTERN, message)
+    return github_match.group(0) if github_match else None
+
+
+def _build_messages(message, history, repo_url=None, repo_summary=None):
+    if repo_url:
         # Build conversation context with repo analysis
         messages = [
             {
@@ -29,7 +27,7 @@ def get_conversation_response(message, history):
 
 The user shared their GitHub repository. Here's what I found:
 
-{repo_summary}
+{truncate_to_tokens(repo_summary or "", REPO_SUMMARY_TOKENS)}
 
 Based on this analysis:
 1. Summarize what the project currently has
@@ -42,7 +40,7 @@ Keep response concise and helpful."""
         ]
         
         # Add recent history for context
-        for msg in history[-4:]:
+        for msg in fit_history(history[-4:], REVIEW_HISTORY_TOKENS):
             messages.append(msg)
         
         messages.append({"role": "user", "content": f"Here's my repo: {repo_url}. Please review it and suggest what I should do next."})
@@ -68,19 +66,76 @@ Be conversational, friendly, and helpful. Keep responses concise."""
             }
         ]
         
-        # Add conversation history
-        for msg in history:
+        # Add conversation history (most recent messages within the budget)
+        for msg in fit_history(history, HISTORY_TOKENS):
             messages.append(msg)
         
         # Add current message
         messages.append({"role": "user", "content": message})
     
-    # Get response from Groq
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=messages,
+    return messages
+
+
+def get_conversation_response(message, history):
+    """
+    Conversational agent that guides users through project planning.
+    """
+    
+    # Check if message contains a GitHub URL
+    repo_url = _find_repo_url(message)
+    repo_summary = None
+    
+    if repo_url:
+        print(f"Analyzing repo: {repo_url}")
+        
+        # Analyze the repository
+        repo_summary = analyze_repo(repo_url)
+    
+    # Get response from Groq; sampled replies are never served from the cache,
+    # asking again must be able to give a different answer
+    return complete(
+        _build_messages(message, history, repo_url, repo_summary),
+        temperature=0.7,
+        max_tokens=500,
+        fresh=True,
+        priority=PRIORITY_INTERACTIVE
+    )
+
+
+async def get_conversation_response_async(message, history):
+    """Async variant of get_conversation_response()."""
+    repo_url = _find_repo_url(message)
+    repo_summary = None
+    
+    if repo_url:
+        print(f"Analyzing repo: {repo_url}")
+        
+        # Repo analysis is blocking HTTP, keep it off the event loop
+        repo_summary = await asyncio.to_thread(analyze_repo, repo_url)
+    
+    return await complete_async(
+        _build_messages(message, history, repo_url, repo_summary),
         temperature=0.7,
-        max_tokens=500
+        max_tokens=500,
+        fresh=True,
+        priority=PRIORITY_INTERACTIVE
     )
+
+
+async def stream_conversation_response_async(message, history):
+    """Stream the conversational reply token by token."""
+    repo_url = _find_repo_url(message)
+    repo_summary = None
     
-    return response.choices[0].message.content
+    if repo_url:
+        print(f"Analyzing repo: {repo_url}")
+        repo_summary = await asyncio.to_thread(analyze_repo, repo_url)
+    
+    async for delta in stream_async(
+        _build_messages(message, history, repo_url, repo_summary),
+        temperature=0.7,
+        max_tokens=500,
+        fresh=True,
+        priority=PRIORITY_INTERACTIVE
+    ):
+        yield delta
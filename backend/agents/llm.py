@@ -0,0 +1,200 @@
+"""
+Shared Groq clients for all agents.
+
+One sync client serves the CLI, one pooled async client serves the API.
+Both are built lazily on the first call (see utils/clients.py).
+Agents build their prompts and call complete() / complete_async() instead
+of creating their own clients. Replies are served from the response cache
+when an identical request was answered before; pass fresh=True to force a
+new completion (the result still refreshes the cache). json_mode=True asks
+the model for a JSON object.
+
+Calls that miss the cache are admitted by the shared rate-limit scheduler;
+priority is one of PRIORITY_INTERACTIVE / PRIORITY_PLANNING /
+PRIORITY_BACKGROUND.
+
+The async variants do their cache reads and writes (SQLite) in a worker
+thread, so the event loop never waits on the disk.
+"""
+
+import asyncio
+
+from config import require_groq_api_key, MODEL_NAME, LLM_MAX_CONNECTIONS
+from agents.llm_cache import get_cache, make_key
+from agents.rate_limiter import (
+    scheduler, estimate_tokens, parse_duration, RetryableError,
+    PRIORITY_INTERACTIVE, PRIORITY_PLANNING, PRIORITY_BACKGROUND
+)
+from utils.clients import register_client, get_client
+
+
+# groq pulls in httpx and pydantic, import it only when a client is built.
+# Retries are done by the scheduler, which knows about the shared quota.
+def _make_client():
+    from groq import Groq
+    return Groq(api_key=require_groq_api_key(), max_retries=0)
+
+
+def _make_async_client():
+    import httpx
+    from groq import AsyncGroq, DefaultAsyncHttpxClient
+    return AsyncGroq(
+        api_key=require_groq_api_key(),
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS // 4,
+            )
+        ),
+    )
+
+
+register_client("groq", _make_client)
+register_client("groq_async", _make_async_client)
+
+
+def _as_retryable(e):
+    """Map a Groq error to RetryableError, or None if retrying won't help."""
+    import groq
+    if isinstance(e, groq.RateLimitError):
+        return RetryableError(
+            e,
+            throttled=True,
+            retry_after=parse_duration(e.response.headers.get("retry-after")),
+            headers=e.response.headers
+        )
+    if isinstance(e, groq.APIStatusError) and e.status_code >= 500:
+        return RetryableError(e, headers=e.response.headers)
+    if isinstance(e, groq.APIConnectionError):
+        return RetryableError(e)
+    return None
+
+
+def _used_tokens(completion):
+    usage = getattr(completion, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _cached(messages, temperature, max_tokens, fresh):
+    """Return (cache, key, hit) for a request; hit is None on a miss or bypass."""
+    cache = get_cache()
+    if cache is None:
+        return None, None, None
+
+    key = make_key(MODEL_NAME, messages, temperature, max_tokens)
+    hit = None if fresh else cache.get(key)
+    return cache, key, hit
+
+
+async def _cached_async(messages, temperature, max_tokens, fresh):
+    """_cached() off the event loop."""
+    return await asyncio.to_thread(_cached, messages, temperature, max_tokens, fresh)
+
+
+def _extra_args(json_mode):
+    return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+
+def complete(messages, temperature, max_tokens, fresh=False, json_mode=False,
+             priority=PRIORITY_BACKGROUND):
+    """Run a chat completion and return the reply text."""
+    cache, key, hit = _cached(messages, temperature, max_tokens, fresh)
+    if hit is not None:
+        return hit
+
+    def call():
+        client = get_client("groq")
+        try:
+            raw = client.chat.completions.with_raw_response.create(
+                model=MODEL_NAME,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **_extra_args(json_mode)
+            )
+        except Exception as e:
+            raise (_as_retryable(e) or e)
+        res = raw.parse()
+        return res, raw.headers, _used_tokens(res)
+
+    res = scheduler.run(call, priority, estimate_tokens(messages, max_tokens))
+    content = res.choices[0].message.content
+
+    if cache is not None and content:
+        cache.set(key, content)
+    return content
+
+
+async def complete_async(messages, temperature, max_tokens, fresh=False, json_mode=False,
+                         priority=PRIORITY_BACKGROUND):
+    """Async variant of complete() on the shared pooled client."""
+    cache, key, hit = await _cached_async(messages, temperature, max_tokens, fresh)
+    if hit is not None:
+        return hit
+
+    async def call():
+        client = get_client("groq_async")
+        try:
+            raw = await client.chat.completions.with_raw_response.create(
+                model=MODEL_NAME,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **_extra_args(json_mode)
+            )
+        except Exception as e:
+            raise (_as_retryable(e) or e)
+        res = await raw.parse()
+        return res, raw.headers, _used_tokens(res)
+
+    res = await scheduler.run_async(call, priority, estimate_tokens(messages, max_tokens))
+    content = res.choices[0].message.content
+
+    if cache is not None and content:
+        await asyncio.to_thread(cache.set, key, content)
+    return content
+
+
+async def stream_async(messages, temperature, max_tokens, fresh=False,
+                       priority=PRIORITY_INTERACTIVE):
+    """
+    Stream a chat completion, yielding text deltas as they arrive.
+    A cached reply is yielded as a single delta.
+    """
+    cache, key, hit = await _cached_async(messages, temperature, max_tokens, fresh)
+    if hit is not None:
+        yield hit
+        return
+
+    async def call():
+        client = get_client("groq_async")
+        try:
+            raw = await client.chat.completions.with_raw_response.create(
+                model=MODEL_NAME,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+        except Exception as e:
+            raise (_as_retryable(e) or e)
+        return await raw.parse(), raw.headers
+
+    # The scheduler slot is held until the stream is fully read
+    stream, done = await scheduler.start_async(call, priority, estimate_tokens(messages, max_tokens))
+    parts = []
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+    finally:
+        done()
+
+    # Only a fully received reply is cached
+    if cache is not None and parts:
+        await asyncio.to_thread(cache.set, key, "".join(parts))
@@ -0,0 +1,169 @@
+"""
+Content-addressed cache for LLM responses.
+
+Entries are keyed on a hash of (model, messages, temperature, max_tokens)
+and live in two tiers: an in-memory LRU in front of a SQLite file under
+.oracle_data/. Both tiers honour a TTL; the disk tier is trimmed back under
+a byte budget by evicting the least recently used rows.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_TTL, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_MAX_BYTES
+from state.store import STORAGE_DIR
+from state.sqlite_util import connect, evict_lru
+
+CACHE_FILE = STORAGE_DIR / "llm_cache.sqlite3"
+
+
+def make_key(model, messages, temperature, max_tokens):
+    """Stable content hash of one completion request."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_FILE, ttl=LLM_CACHE_TTL,
+                 memory_entries=LLM_CACHE_MEMORY_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+
+        self._memory = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_bytes = 0
+        self._disk_failed = False
+
+    # -----------------------------
+    # Disk tier
+    # -----------------------------
+    def _db(self):
+        """Open the SQLite tier on first use. Returns None if it is unusable."""
+        if self._conn is not None or self._disk_failed:
+            return self._conn
+
+        try:
+            conn = connect(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+            self._disk_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️  Warning: LLM disk cache disabled: {e}")
+            self._disk_failed = True
+
+        return self._conn
+
+    # -----------------------------
+    # Memory tier
+    # -----------------------------
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def get(self, key):
+        """Return the cached reply for key, or None."""
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                value, expires_at = hit
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            conn = self._db()
+            if conn is None:
+                return None
+
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                value, expires_at = row
+                if expires_at < now:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error:
+                return None
+
+            self._remember(key, value, expires_at)
+            return value
+
+    def set(self, key, value):
+        """Store a reply in both tiers."""
+        now = time.time()
+        expires_at = now + self.ttl
+        size = len(value.encode("utf-8"))
+
+        with self._lock:
+            self._remember(key, value, expires_at)
+
+            conn = self._db()
+            if conn is None:
+                return
+
+            try:
+                old = conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, size, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, expires_at, now)
+                )
+                self._disk_bytes += size - (old[0] if old else 0)
+                if self._disk_bytes > self.max_bytes:
+                    self._disk_bytes = evict_lru(conn, "llm_cache", self._disk_bytes, self.max_bytes)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to write LLM cache: {e}")
+
+    def clear(self):
+        """Drop every cached reply."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+                self._disk_bytes = 0
+
+
+_cache = LLMCache() if LLM_CACHE_ENABLED else None
+
+
+def get_cache():
+    """The process-wide cache, or None when caching is disabled."""
+    return _cache
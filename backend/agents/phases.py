@@ -0,0 +1,16 @@
+"""
+Pure helpers for phase lines and commit messages.
+
+Kept free of LLM imports so the CLI can use them on resume without loading
+the agent stack.
+"""
+
+
+def get_phase_name(phase_line):
+    """Strip the "Phase N:" prefix from a planner line."""
+    return phase_line.split(":", 1)[1].strip() if ":" in phase_line else phase_line
+
+
+def get_commit_message(phase_number, phase_name):
+    """Commit message the verifier expects for a phase."""
+    return f"phase-{phase_number}: {phase_name.lower()} complete"
@@ -0,0 +1,178 @@
+"""
+Validation and local repair for structured (JSON) plans.
+
+The planner asks the model for one JSON document:
+
+    {"phases": [{"name": "...", "tasks": ["...", ...], "commit_msg": "phase-1: ..."}]}
+
+Model output is often almost-JSON (code fences, prose around it, trailing
+commas, a cut-off tail). parse_plan() repairs those cases locally instead of
+asking the model again, then validates and normalizes the result.
+"""
+
+import json
+import re
+
+from agents.phases import get_commit_message
+
+MAX_PHASES = 12
+MAX_TASKS_PER_PHASE = 10
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+class PlanFormatError(ValueError):
+    """Raised when model output cannot be turned into a valid plan."""
+
+
+def _extract_json_text(text):
+    """Cut the JSON document out of surrounding prose and code fences."""
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise PlanFormatError("No JSON object found in model output")
+
+    text = text[min(starts):]
+    end = max(text.rfind("}"), text.rfind("]"))
+    if end != -1 and _is_balanced(text[:end + 1]):
+        # Drop trailing prose after a complete document
+        return text[:end + 1]
+
+    # Keep an unterminated tail, _close_brackets() may be able to finish it
+    return text
+
+
+def _scan(text):
+    """Return (open bracket stack, in_string) after reading text."""
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]" and stack:
+            stack.pop()
+    return stack, in_string
+
+
+def _is_balanced(text):
+    stack, in_string = _scan(text)
+    return not stack and not in_string
+
+
+def _close_brackets(text):
+    """Terminate an open string and close any brackets left open by truncation."""
+    stack, in_string = _scan(text)
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    for opener in reversed(stack):
+        text += "}" if opener == "{" else "]"
+    return text
+
+
+def repair_json(text):
+    """
+    Parse almost-JSON model output.
+
+    Raises:
+        PlanFormatError: If the text cannot be repaired
+    """
+    candidate = _extract_json_text(text.translate(_SMART_QUOTES))
+
+    attempts = [
+        lambda t: t,
+        lambda t: _TRAILING_COMMA_RE.sub(r"\1", t),
+        lambda t: _TRAILING_COMMA_RE.sub(r"\1", _close_brackets(t)),
+    ]
+    for fix in attempts:
+        try:
+            # strict=False tolerates raw newlines inside strings
+            return json.loads(fix(candidate), strict=False)
+        except json.JSONDecodeError:
+            continue
+
+    raise PlanFormatError("Model output is not valid JSON")
+
+
+def _clean_task(task):
+    # Drop list markers the model sometimes keeps inside strings
+    return re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", str(task)).strip()
+
+
+def validate_plan(data):
+    """
+    Check a decoded plan and normalize it.
+
+    The plan must be {"phases": [...]} (or a bare list of phases) with at
+    least one phase. Each phase is an object with a non-empty name ("name",
+    or "phase") and at least one task; tasks may be a list or a
+    newline-separated string. Phase/task counts are capped at
+    MAX_PHASES/MAX_TASKS_PER_PHASE, "Phase N:" prefixes and list markers
+    are stripped, and a commit_msg not starting with "phase-N:" is replaced
+    with the default one.
+
+    Returns:
+        list: [{"name": str, "tasks": [str], "commit_msg": str}, ...]
+
+    Raises:
+        PlanFormatError: If the plan fails any of these checks
+    """
+    # A bare list of phases is accepted as {"phases": [...]}
+    if isinstance(data, list):
+        data = {"phases": data}
+
+    if not isinstance(data, dict) or not isinstance(data.get("phases"), list):
+        raise PlanFormatError("Plan must be an object with a 'phases' array")
+
+    plan = []
+    for raw in data["phases"][:MAX_PHASES]:
+        if not isinstance(raw, dict):
+            raise PlanFormatError("Each phase must be an object")
+
+        name = str(raw.get("name") or raw.get("phase") or "").strip()
+        # "Phase 2: Backend" -> "Backend"
+        name = re.sub(r"^phase\s*\d+\s*[:\-]\s*", "", name, flags=re.IGNORECASE)
+        if not name:
+            raise PlanFormatError("Phase is missing a name")
+
+        tasks = raw.get("tasks", [])
+        if isinstance(tasks, str):
+            tasks = tasks.split("\n")
+        if not isinstance(tasks, list):
+            raise PlanFormatError(f"Tasks for phase '{name}' must be a list")
+        tasks = [t for t in (_clean_task(t) for t in tasks) if t][:MAX_TASKS_PER_PHASE]
+        if not tasks:
+            raise PlanFormatError(f"Phase '{name}' has no tasks")
+
+        # The verifier looks for "phase-N" in the commit, fall back to the default message if the model got it wrong
+        number = len(plan) + 1
+        commit_msg = str(raw.get("commit_msg") or "").strip()
+        if not commit_msg.lower().startswith(f"phase-{number}:"):
+            commit_msg = get_commit_message(number, name)
+
+        plan.append({"name": name, "tasks": tasks, "commit_msg": commit_msg})
+
+    if not plan:
+        raise PlanFormatError("Plan has no phases")
+
+    return plan
+
+
+def parse_plan(text):
+    """Repair, validate and normalize raw model output into a plan."""
+    return validate_plan(repair_json(text))
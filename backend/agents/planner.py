@@ -1,10 +1,9 @@
-from groq import Groq
-from config import GROQ_API_KEY, MODEL_NAME
+from agents.llm import complete, complete_async, PRIORITY_PLANNING
+from agents.plan_schema import parse_plan
 
-client = Groq(api_key=GROQ_API_KEY)
 
-def generate_phases(project, tech, features, platform):
-    prompt = f"""
+def _build_prompt(project, tech, features, platform):
+    return f"""
 Return ONLY execution phases.
 No explanations. No markdown.
 
@@ -18,14 +17,90 @@ Core Features: {features}
 Platform: {platform}
 """
 
-    res = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-        max_tokens=200
-    )
 
+def _build_plan_prompt(project, tech, features, platform):
+    return f"""
+Plan the execution of this project as ONE JSON object. No markdown, no prose.
+
+Schema:
+{{"phases": [{{"name": "<short phase name>", "tasks": ["<task>", "..."], "commit_msg": "phase-<n>: <phase name> complete"}}]}}
+
+Rules:
+- 3 to 8 phases, in build order
+- 4 to 6 concrete developer tasks per phase, each a clear action to build the project
+- commit_msg of phase n must start with "phase-<n>:"
+- Tasks are ONLY about building the project below, never about execution_orecal
+
+Project Idea:  {project}
+Tech Stack: {tech}
+Core Features: {features}
+Platform: {platform}
+"""
+
+
+def _parse_phases(content):
     return [
-        l.strip() for l in res.choices[0].message.content.split("\n")
+        l.strip() for l in content.split("\n")
         if l.strip().startswith("Phase")
     ]
+
+
+def generate_phases(project, tech, features, platform, fresh=False):
+    content = complete(
+        [{"role": "user", "content": _build_prompt(project, tech, features, platform)}],
+        temperature=0.2,
+        max_tokens=200,
+        fresh=fresh,
+        priority=PRIORITY_PLANNING
+    )
+    return _parse_phases(content)
+
+
+async def generate_phases_async(project, tech, features, platform, fresh=False):
+    content = await complete_async(
+        [{"role": "user", "content": _build_prompt(project, tech, features, platform)}],
+        temperature=0.2,
+        max_tokens=200,
+        fresh=fresh,
+        priority=PRIORITY_PLANNING
+    )
+    return _parse_phases(content)
+
+
+def generate_plan(project, tech, features, platform, fresh=False):
+    """
+    Generate phases, tasks and commit messages in a single LLM call.
+
+    Returns:
+        list: [{"name": str, "tasks": [str], "commit_msg": str}, ...]
+
+    Raises:
+        PlanFormatError: If the reply cannot be repaired into a valid plan
+    """
+    content = complete(
+        [{"role": "user", "content": _build_plan_prompt(project, tech, features, platform)}],
+        temperature=0.2,
+        max_tokens=2000,
+        fresh=fresh,
+        json_mode=True,
+        priority=PRIORITY_PLANNING
+    )
+    return parse_plan(content)
+
+
+async def generate_plan_async(project, tech, features, platform, fresh=False):
+    """Async variant of generate_plan()."""
+    content = await complete_async(
+        [{"role": "user", "content": _build_plan_prompt(project, tech, features, platform)}],
+        temperature=0.2,
+        max_tokens=2000,
+        fresh=fresh,
+        json_mode=True,
+        priority=PRIORITY_PLANNING
+    )
+    return parse_plan(content)
+
+
+def plan_to_phase_lines(plan):
+    """Render a structured plan as the classic "Phase N: name" lines."""
+    return [f"Phase {i+1}: {phase['name']}" for i, phase in enumerate(plan)]
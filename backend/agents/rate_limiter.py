@@ -0,0 +1,302 @@
+"""
+Outbound scheduler for LLM calls.
+
+The API, the CLI and batch jobs share one Groq quota. Every completion goes
+through LLMScheduler.run() / run_async(), which:
+
+- keeps token buckets for requests/minute and tokens/minute, corrected from
+  Groq's x-ratelimit-* response headers
+- admits waiting calls by priority class (interactive chat before planning,
+  planning before background expansion and verification)
+- adapts the number of in-flight calls with AIMD: +1/limit per success,
+  halved on every 429
+- retries throttled and transient failures with full-jitter backoff,
+  honouring retry-after when Groq sends it
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+
+from config import LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES
+from utils.context import estimate_tokens as estimate_text_tokens
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PLANNING = 1
+PRIORITY_BACKGROUND = 2
+
+# Poll interval for waiters, also the longest a waiter sleeps between checks
+_POLL_SECONDS = 0.05
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value):
+    """Parse Groq reset values like "2m59.56s", "7.66s" or "150ms" into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def _header_int(headers, name):
+    try:
+        return int(float(headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(messages, max_tokens):
+    """Rough request cost: estimated prompt tokens (utils/context.py) plus the completion budget."""
+    return sum(estimate_text_tokens(str(m.get("content", ""))) for m in messages) + max_tokens
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.base_rate = self.rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is available (0 if it is available now)."""
+        self._refill(now)
+        # A request bigger than the bucket only needs a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+    def give_back(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def observe(self, remaining, reset_seconds, now):
+        """Align with the server's view of the window."""
+        if remaining is None:
+            return
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+        if reset_seconds and remaining < self.capacity:
+            # Refill at the pace the server will actually reset at
+            self.rate = max(self.base_rate / 10, (self.capacity - remaining) / reset_seconds)
+        else:
+            self.rate = self.base_rate
+
+
+class RetryableError(Exception):
+    """Raised by a call wrapper to ask the scheduler for another attempt."""
+
+    def __init__(self, original, throttled=False, retry_after=None, headers=None):
+        super().__init__(str(original))
+        self.original = original
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.headers = headers or {}
+
+
+class LLMScheduler:
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_retries=LLM_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._waiting = [0, 0, 0]
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    # -----------------------------
+    # Admission
+    # -----------------------------
+    def _try_acquire(self, priority, cost):
+        """Admit a call if allowed. Returns 0 when admitted, else seconds to wait. Lock held."""
+        now = time.monotonic()
+
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        # Strict priority: never overtake a waiting call of a higher class
+        if any(self._waiting[p] for p in range(priority)):
+            return _POLL_SECONDS
+
+        if self.in_flight >= max(1, int(self.limit)):
+            return _POLL_SECONDS
+
+        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(cost, now))
+        if wait > 0:
+            return wait
+
+        self.requests.take(1)
+        self.tokens.take(cost)
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self, priority, cost):
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    wait = self._try_acquire(priority, cost)
+                    if wait == 0:
+                        return
+                    self._cond.wait(timeout=min(wait, _POLL_SECONDS * 5))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    async def acquire_async(self, priority, cost):
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(priority, cost)
+                if wait == 0:
+                    return
+                await asyncio.sleep(min(wait, _POLL_SECONDS))
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def release(self, cost, headers=None, used_tokens=None, throttled=False, retry_after=None):
+        """Return a slot, feed back rate-limit headers and adjust concurrency."""
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+
+            if throttled:
+                # Multiplicative decrease, and stop everyone until the window resets
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            else:
+                # Additive increase: about +1 per limit's worth of successes
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+            if used_tokens is not None:
+                # Correct the estimate with what the call really used
+                if used_tokens > cost:
+                    self.tokens.take(used_tokens - cost)
+                else:
+                    self.tokens.give_back(cost - used_tokens)
+
+            if headers:
+                self.requests.observe(
+                    _header_int(headers, "x-ratelimit-remaining-requests"),
+                    parse_duration(headers.get("x-ratelimit-reset-requests")),
+                    now
+                )
+                self.tokens.observe(
+                    _header_int(headers, "x-ratelimit-remaining-tokens"),
+                    parse_duration(headers.get("x-ratelimit-reset-tokens")),
+                    now
+                )
+
+            self._cond.notify_all()
+
+    # -----------------------------
+    # Retry loop
+    # -----------------------------
+    def _backoff(self, attempt, error):
+        if error.retry_after:
+            return error.retry_after
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+    def run(self, call, priority=PRIORITY_BACKGROUND, cost=1):
+        """
+        Run call() under the scheduler.
+
+        call must return (result, headers, used_tokens) and raise
+        RetryableError for failures worth another attempt.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(priority, cost)
+            try:
+                result, headers, used_tokens = call()
+            except RetryableError as e:
+                self.release(cost, e.headers, throttled=e.throttled, retry_after=e.retry_after)
+                if attempt == self.max_retries:
+                    raise e.original
+                time.sleep(self._backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(cost)
+                raise
+
+            self.release(cost, headers, used_tokens)
+            return result
+
+    async def run_async(self, call, priority=PRIORITY_BACKGROUND, cost=1):
+        """Async variant of run(); call is a coroutine function."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(priority, cost)
+            try:
+                result, headers, used_tokens = await call()
+            except RetryableError as e:
+                self.release(cost, e.headers, throttled=e.throttled, retry_after=e.retry_after)
+                if attempt == self.max_retries:
+                    raise e.original
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(cost)
+                raise
+
+            self.release(cost, headers, used_tokens)
+            return result
+
+    async def start_async(self, call, priority=PRIORITY_BACKGROUND, cost=1):
+        """
+        Like run_async() for calls that keep going after they return (streams).
+
+        Returns (result, done). The slot stays taken until
+        done(used_tokens=None) is called; the rate limit headers are the
+        ones call() returned with its first response.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(priority, cost)
+            try:
+                result, headers = await call()
+            except RetryableError as e:
+                self.release(cost, e.headers, throttled=e.throttled, retry_after=e.retry_after)
+                if attempt == self.max_retries:
+                    raise e.original
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(cost)
+                raise
+
+            def done(used_tokens=None):
+                self.release(cost, headers, used_tokens)
+
+            return result, done
+
+
+scheduler = LLMScheduler()
@@ -1,142 +1,270 @@
-import requests
 import base64
+from concurrent.futures import ThreadPoolExecutor
 
-def get_repo_structure(repo_url):
+from config import REPO_ANALYSIS_MODE
+from agents.repo_ingest import ingest_repo, pick_contents, index_rows, refresh_index, ArchiveError
+from agents.repo_tree import rank_tree_response
+from utils.context import ContextBuilder, ContextMemo
+from utils.github_client import get_github, parse_repo_url
+from state.analysis_store import get_analysis_store
+
+# Parallel GitHub fetches per analysis
+MAX_FETCH_WORKERS = 6
+
+# Token budget for key file excerpts in the API summary
+FILE_CONTEXT_TOKENS = 600
+FILE_EXCERPT_TOKENS = 125
+
+KEY_FILES = ['package.json', 'README.md', 'requirements.txt', 'pom.xml', 'index.html']
+
+
+class RequestMemo(ContextMemo):
     """
-    Fetch repository structure from GitHub API.
-    repo_url: https://github.com/username/repo
+    Per-analysis GET memo: concurrent callers asking for the same path share
+    one in-flight request, so no URL is fetched twice within an analysis.
     """
-    try:
-        # Parse repo URL
-        parts = repo_url.rstrip('/').split('/')
-        owner = parts[-2]
-        repo = parts[-1]
-        
-        # Try multiple branch names
-        branches = ['main', 'master', 'HEAD']
-        
-        for branch in branches:
-            api_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
-            response = requests.get(api_url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                tree = data.get('tree', [])
-                
-                # Filter important files
-                important_files = []
-                for item in tree:
-                    path = item['path']
-                    # Focus on code files, ignore node_modules, build, etc
-                    if any(path.startswith(ignore) for ignore in ['node_modules/', 'build/', 'dist/', '.git/']):
-                        continue
-                    if item['type'] == 'blob' and any(path.endswith(ext) for ext in ['.js', '.jsx', '.py', '.java', '.ts', '.tsx', '.json', '.md', '.html', '.css']):
-                        important_files.append(path)
-                
-                return important_files[:20], None  # Limit to 20 files
-        
-        # If all branches fail, try getting repo info
-        api_url = f"https://api.github.com/repos/{owner}/{repo}"
-        response = requests.get(api_url, timeout=10)
-        
-        if response.status_code == 200:
-            repo_data = response.json()
-            return [], f"Repository found: {repo_data.get('description', 'No description')}. Language: {repo_data.get('language', 'Unknown')}"
-        
-        return None, f"Could not access repository (Status: {response.status_code})"
-        
-    except Exception as e:
-        return None, str(e)
+
+    def __init__(self, github=None):
+        super().__init__()
+        self.github = github or get_github()
+
+    def get(self, path, **kwargs):
+        key = (path, repr(sorted((kwargs.get("headers") or {}).items())))
+        return super().get(key, lambda: self.github.get(path, **kwargs))
+
+
+def _tree_path(owner, repo):
+    # HEAD resolves to the default branch, no need to guess main/master
+    return f"/repos/{owner}/{repo}/git/trees/HEAD?recursive=1"
 
 
-def get_file_content(repo_url, file_path):
+def _fetch_tree(memo, owner, repo, limit=20):
+    """
+    Stream the recursive tree and rank its entries (agents/repo_tree.py).
+    The summary's "present" lists the KEY_FILES found anywhere in the tree.
+    The ranked summary is cached under the tree's ETag, so an unchanged
+    tree costs a 304 instead of a full download.
+
+    Returns:
+        tuple: (tree summary or None, status code)
+    """
+    return memo.github.get_parsed(
+        _tree_path(owner, repo),
+        lambda response: rank_tree_response(response, limit=limit, watch=KEY_FILES),
+        variant=f"ranked:{limit}:{','.join(KEY_FILES)}"
+    )
+
+
+def get_file_content(repo_url, file_path, memo=None):
     """
     Fetch content of a specific file from GitHub.
     """
     try:
-        parts = repo_url.rstrip('/').split('/')
-        owner = parts[-2]
-        repo = parts[-1]
-        
-        api_url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
-        response = requests.get(api_url, timeout=10)
-        
+        owner, repo = parse_repo_url(repo_url)
+        memo = memo or RequestMemo()
+
+        response = memo.get(f"/repos/{owner}/{repo}/contents/{file_path}")
+
         if response.status_code != 200:
             return None
-        
+
         data = response.json()
         content = base64.b64decode(data['content']).decode('utf-8')
         return content[:2000]  # Limit to first 2000 chars
-        
-    except Exception as e:
+
+    except Exception:
         return None
 
 
-def analyze_repo(repo_url):
-    """
-    Analyze a GitHub repository and return summary.
-    """
-    files, error = get_repo_structure(repo_url)
-    
-    if error and not files:
-        # Try to get basic repo info
-        try:
-            parts = repo_url.rstrip('/').split('/')
-            owner = parts[-2]
-            repo = parts[-1]
-            api_url = f"https://api.github.com/repos/{owner}/{repo}"
-            response = requests.get(api_url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return f"""📁 Repository: {data.get('name', 'Unknown')}
+def _format_repo_info(data):
+    return f"""📁 Repository: {data.get('name', 'Unknown')}
 📝 Description: {data.get('description', 'No description')}
 💻 Language: {data.get('language', 'Unknown')}
 ⭐ Stars: {data.get('stargazers_count', 0)}
 🔀 Forks: {data.get('forks_count', 0)}
 
 Note: Could not access detailed file structure. Repository might be empty or private."""
-        except:
-            pass
-        
-        return f"Error accessing repository: {error}"
-    
-    if not files and error:
-        return error
-    
-    if not files:
-        return "Repository appears to be empty."
-    
-    # Get content of key files
-    key_files = ['package.json', 'README.md', 'requirements.txt', 'pom.xml', 'index.html']
-    file_contents = {}
-    
-    for key_file in key_files:
-        if key_file in files:
-            content = get_file_content(repo_url, key_file)
-            if content:
-                file_contents[key_file] = content
-    
-    # Build summary
-    summary = f"📁 Repository Structure ({len(files)} files):\n\n"
-    
-    # Group by extension
-    extensions = {}
-    for f in files:
-        ext = f.split('.')[-1] if '.' in f else 'other'
-        extensions[ext] = extensions.get(ext, 0) + 1
-    
+
+
+def _excerpts(file_contents):
+    """Key file excerpts sharing FILE_CONTEXT_TOKENS, in KEY_FILES order."""
+    builder = ContextBuilder(FILE_CONTEXT_TOKENS)
+    for rank, (filename, content) in enumerate(file_contents.items()):
+        builder.add(filename, lambda tokens, content=content: content, priority=rank,
+                    max_tokens=FILE_EXCERPT_TOKENS)
+    return builder.build()
+
+
+def _build_summary(tree, file_contents):
+    files = tree["files"]
+    summary = f"📁 Repository Structure ({tree['kept']} files):\n\n"
+
     summary += "File types:\n"
-    for ext, count in sorted(extensions.items(), key=lambda x: x[1], reverse=True):
+    for ext, count in sorted(tree["types"].items(), key=lambda x: x[1], reverse=True)[:10]:
         summary += f"  • {ext}: {count} files\n"
-    
+
     summary += f"\n📄 Key files found:\n"
     for f in files[:10]:
         summary += f"  • {f}\n"
-    
+
+    # Where the rest of the repo lives
+    skipped = sorted(tree["directories"].items(), key=lambda x: x[1]["files"], reverse=True)[:5]
+    if skipped:
+        summary += f"\n📂 Other directories:\n"
+        for directory, stats in skipped:
+            summary += f"  • {directory}/: {stats['files']} more files\n"
+
+    if tree["truncated"]:
+        summary += "\n(GitHub truncated the tree listing for this repository)\n"
+
+    if file_contents:
+        summary += f"\n📝 File contents:\n"
+        for filename, excerpt in _excerpts(file_contents).items():
+            summary += f"\n--- {filename} ---\n{excerpt}\n"
+
+    return summary
+
+
+def _build_archive_summary(index):
+    files = index["files"]
+    summary = f"📁 Repository Structure ({len(files)} text files, {index['total_bytes'] // 1024} KB):\n\n"
+
+    summary += "File types:\n"
+    for ext, stats in sorted(index["types"].items(), key=lambda x: x[1]["files"], reverse=True)[:10]:
+        summary += f"  • {ext}: {stats['files']} files ({stats['bytes'] // 1024} KB)\n"
+
+    file_contents = pick_contents(index)
+
+    summary += f"\n📄 Key files found:\n"
+    for f in file_contents:
+        summary += f"  • {f}\n"
+
     if file_contents:
         summary += f"\n📝 File contents:\n"
-        for filename, content in file_contents.items():
-            summary += f"\n--- {filename} ---\n{content[:500]}...\n"
-    
+        for filename, excerpt in file_contents.items():
+            summary += f"\n--- {filename} ---\n{excerpt}\n"
+
+    return summary
+
+
+def _head_tree_sha(owner, repo):
+    """Tree SHA of HEAD; revalidated against the response cache, so usually a 304."""
+    try:
+        response = get_github().get(f"/repos/{owner}/{repo}/git/trees/HEAD")
+        if response.status_code == 200:
+            return response.json().get('sha')
+    except Exception:
+        pass
+    return None
+
+
+def _analyze_archive(repo_url, owner, repo, store, tree_sha):
+    """
+    Summarize from the archive index. With stored blob rows only added or
+    modified blobs are fetched; otherwise the archive is downloaded.
+    """
+    refreshed = None
+    rows = store.get_blobs(owner, repo) if store and tree_sha else {}
+    if rows:
+        try:
+            refreshed = refresh_index(owner, repo, rows)
+        except Exception as e:
+            print(f"⚠️  Warning: incremental refresh failed, downloading the archive: {e}")
+
+    if refreshed:
+        index, changed, removed = refreshed
+    else:
+        index = ingest_repo(repo_url)
+        changed, removed = index_rows(index), None
+
+    if not index["files"]:
+        return None
+
+    summary = _build_archive_summary(index)
+    if store and tree_sha:
+        store.save_analysis(owner, repo, tree_sha, "archive", summary,
+                            blobs=changed, removed=removed, replace=refreshed is None)
     return summary
+
+
+def analyze_repo(repo_url):
+    """
+    Analyze a GitHub repository and return summary.
+
+    Summaries are stored per repo with the tree SHA they were built from
+    (state/analysis_store.py): an unchanged repo is answered from the store.
+
+    In "archive" mode the whole repository is downloaded once as a tarball
+    and summarized from the in-memory index (agents/repo_ingest.py); later
+    refreshes only fetch changed blobs. If the archive is unavailable, or
+    in "api" mode, the contents API pipeline below is used.
+    """
+    try:
+        owner, repo = parse_repo_url(repo_url)
+    except IndexError as e:
+        return f"Error accessing repository: {e}"
+
+    store = get_analysis_store()
+    tree_sha = _head_tree_sha(owner, repo) if store else None
+    if tree_sha:
+        cached = store.get_analysis(owner, repo)
+        if cached and cached["tree_sha"] == tree_sha:
+            return cached["summary"]
+
+    if REPO_ANALYSIS_MODE == "archive":
+        try:
+            summary = _analyze_archive(repo_url, owner, repo, store, tree_sha)
+            if summary:
+                return summary
+        except ArchiveError as e:
+            print(f"⚠️  Warning: archive ingestion failed, using the contents API: {e}")
+
+    summary = _analyze_with_api(repo_url)
+    if tree_sha:
+        # The tree resolved, so this is a real summary and not an access error
+        store.save_analysis(owner, repo, tree_sha, "api", summary)
+    return summary
+
+
+def _analyze_with_api(repo_url):
+    """
+    Runs as a two-step pipeline: the recursive tree is fetched, then every
+    key file in it is fetched in parallel. The repo info is only requested
+    when the tree is unavailable. A RequestMemo makes sure no URL is
+    requested twice.
+    """
+    try:
+        owner, repo = parse_repo_url(repo_url)
+    except IndexError as e:
+        return f"Error accessing repository: {e}"
+
+    memo = RequestMemo()
+
+    # Step 1: the tree
+    try:
+        tree, status = _fetch_tree(memo, owner, repo)
+    except Exception as e:
+        tree, status = None, str(e)
+
+    if tree is None:
+        # Empty or private repo: the repo info is all there is (one more call, only on this path)
+        try:
+            info = memo.get(f"/repos/{owner}/{repo}")
+            if info.status_code == 200:
+                return _format_repo_info(info.json())
+            status = info.status_code
+        except Exception as e:
+            status = str(e)
+        return f"Error accessing repository: Could not access repository (Status: {status})"
+
+    if not tree["files"]:
+        return "Repository appears to be empty."
+
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as pool:
+        # Step 2: key files in parallel, matched against the whole tree, not just the top-ranked files
+        found = set(tree["present"])
+        present = [key_file for key_file in KEY_FILES if key_file in found]
+        contents = pool.map(lambda path: get_file_content(repo_url, path, memo), present)
+        file_contents = {path: content for path, content in zip(present, contents) if content}
+
+    return _build_summary(tree, file_contents)
@@ -0,0 +1,405 @@
+"""
+Tarball-based repository ingestion.
+
+Downloads the repository archive in one request and streams it through
+tarfile (mode "r|*") without writing anything to disk. Every text file is
+indexed with its size and type; file contents are kept in memory up to a
+per-file and a total byte budget so the summarizer can pick from the
+whole repo instead of a handful of key files.
+
+The archive URL defaults to GitHub's /repos/{owner}/{repo}/tarball/{ref}
+endpoint and can be pointed at a locally served archive with the
+REPO_ARCHIVE_URL template, e.g. http://localhost:8000/{owner}/{repo}.tar.gz
+Only URLs under GITHUB_API_URL are fetched with the GitHub token; any
+other host gets a plain, unauthenticated request.
+
+Indexes can be flattened to per-blob rows (keyed by git blob sha) and
+refreshed later by fetching only the blobs that were added or modified.
+"""
+
+import base64
+import hashlib
+import posixpath
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    GITHUB_CONNECT_TIMEOUT, GITHUB_READ_TIMEOUT, REPO_ARCHIVE_URL, REPO_ARCHIVE_MAX_BYTES, REPO_INGEST_MAX_FILE_BYTES, REPO_INGEST_MAX_TEXT_BYTES,
+    REPO_INCREMENTAL_MAX_BLOBS
+)
+from utils.context import ContextBuilder
+from utils.github_client import get_github, parse_repo_url
+from utils.json_stream import iter_array_items
+
+IGNORED_DIRS = {'node_modules', 'build', 'dist', '.git', 'vendor', '__pycache__', '.venv', 'venv'}
+
+# Picked first when choosing file contents for the summary
+MANIFEST_FILES = ['package.json', 'requirements.txt', 'pyproject.toml', 'setup.py', 'pom.xml',
+                  'build.gradle', 'Cargo.toml', 'go.mod', 'Gemfile', 'composer.json', 'Dockerfile']
+ENTRY_POINTS = ['main', 'app', 'index', 'server', 'cli', 'manage', '__main__']
+
+# Bytes sniffed to tell text from binary
+SNIFF_BYTES = 8192
+HASH_CHUNK_BYTES = 64 * 1024
+
+# Stored per repo for incremental refreshes (state/analysis_store.py)
+STORED_TEXT_FILES = 500
+STORED_TEXT_CHARS = 2000
+MAX_BLOB_WORKERS = 6
+
+
+class ArchiveError(Exception):
+    """The archive could not be downloaded or read."""
+
+
+class _LimitedReader:
+    """File-like wrapper that refuses to read past max_bytes."""
+
+    def __init__(self, raw, max_bytes):
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.read_bytes += len(chunk)
+        if self.read_bytes > self.max_bytes:
+            raise ArchiveError(f"Archive larger than {self.max_bytes} bytes")
+        return chunk
+
+
+def archive_url(owner, repo, ref="HEAD"):
+    if REPO_ARCHIVE_URL:
+        return REPO_ARCHIVE_URL.format(owner=owner, repo=repo, ref=ref)
+    return f"/repos/{owner}/{repo}/tarball/{ref}"
+
+
+def _is_github_api(url, github):
+    """Whether url is served by the GitHub API (relative paths are)."""
+    absolute = github.url(url)
+    return absolute == github.base_url or absolute.startswith(github.base_url + "/")
+
+
+def file_type(path):
+    """Extension without the dot, or the file name for Dockerfile/Makefile style files."""
+    name = posixpath.basename(path)
+    _, ext = posixpath.splitext(name)
+    return ext[1:].lower() if ext else name
+
+
+def _is_ignored(path):
+    return any(part in IGNORED_DIRS for part in path.split('/')[:-1])
+
+
+def _decode_text(data):
+    """Returns the decoded text, or None for binary content."""
+    if b'\0' in data[:SNIFF_BYTES]:
+        return None
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the per-file cap is still text
+        if e.start >= len(data) - 4:
+            return data[:e.start].decode('utf-8')
+        return None
+
+
+def new_index():
+    return {
+        "files": {},       # path -> {"size", "type", "lines", "truncated"}
+        "contents": {},    # path -> text (within the byte budgets)
+        "types": {},       # type -> {"files", "bytes"}
+        "blobs": {},       # path -> git blob sha, binary files included
+        "skipped": {"binary": 0, "ignored": 0, "over_budget": 0},
+        "total_bytes": 0,
+    }
+
+
+def add_file(index, path, size, sha, data, keep_text=True):
+    """
+    Add one file to the index.
+
+    Args:
+        data: The first bytes of the file (up to the per-file cap), or None
+            for a text file whose contents are not available
+        keep_text: Store the decoded text in index["contents"]
+    """
+    index["blobs"][path] = sha
+    text = _decode_text(data) if data is not None else ""
+    if text is None:
+        index["skipped"]["binary"] += 1
+        return
+
+    kind = file_type(path)
+    index["files"][path] = {
+        "size": size,
+        "type": kind,
+        "lines": text.count('\n') + (1 if text and not text.endswith('\n') else 0),
+        "truncated": data is None or size > len(data),
+    }
+    stats = index["types"].setdefault(kind, {"files": 0, "bytes": 0})
+    stats["files"] += 1
+    stats["bytes"] += size
+    index["total_bytes"] += size
+
+    if data is None:
+        return
+    if keep_text:
+        index["contents"][path] = text
+    else:
+        index["skipped"]["over_budget"] += 1
+
+
+def _read_member(handle, size, max_file_bytes):
+    """
+    Read the head of a tar member and hash the whole of it like git does.
+
+    Returns:
+        tuple: (first max_file_bytes bytes, git blob sha)
+    """
+    digest = hashlib.sha1(b"blob %d\0" % size)
+    data = handle.read(max_file_bytes) if handle else b''
+    digest.update(data)
+    while handle:
+        chunk = handle.read(HASH_CHUNK_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+    return data, digest.hexdigest()
+
+
+def index_archive(fileobj, max_file_bytes=REPO_INGEST_MAX_FILE_BYTES,
+                  max_text_bytes=REPO_INGEST_MAX_TEXT_BYTES):
+    """
+    Index a (possibly compressed) tar stream.
+
+    Args:
+        fileobj: Readable binary stream, read sequentially once
+        max_file_bytes: Bytes kept per file
+        max_text_bytes: Bytes of file contents kept in total
+
+    Returns:
+        dict: Index as built by new_index()
+    """
+    index = new_index()
+    text_bytes = 0
+
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+
+                # GitHub archives wrap everything in "<owner>-<repo>-<sha>/"
+                parts = member.name.split('/', 1)
+                if len(parts) < 2 or not parts[1]:
+                    continue
+                path = parts[1]
+
+                if _is_ignored(path):
+                    index["skipped"]["ignored"] += 1
+                    continue
+
+                data, sha = _read_member(archive.extractfile(member), member.size, max_file_bytes)
+                keep_text = text_bytes + len(data) <= max_text_bytes
+                add_file(index, path, member.size, sha, data, keep_text=keep_text)
+                if keep_text and path in index["contents"]:
+                    text_bytes += len(data)
+    except tarfile.TarError as e:
+        raise ArchiveError(f"Could not read archive: {e}")
+
+    return index
+
+
+def ingest_repo(repo_url, ref="HEAD"):
+    """
+    Download the repository archive once and index it.
+
+    Raises:
+        ArchiveError: If the archive is unavailable or unreadable
+    """
+    owner, repo = parse_repo_url(repo_url)
+    url = archive_url(owner, repo, ref)
+    try:
+        github = get_github()
+        if _is_github_api(url, github):
+            response = github.get(url, stream=True)
+        else:
+            # Never send the GitHub token to another host
+            import requests
+            response = requests.get(url, stream=True, timeout=(GITHUB_CONNECT_TIMEOUT, GITHUB_READ_TIMEOUT))
+    except Exception as e:
+        raise ArchiveError(f"Archive download failed: {e}")
+
+    with response:
+        if response.status_code != 200:
+            raise ArchiveError(f"Archive download failed (Status: {response.status_code})")
+        # Undo any transfer Content-Encoding, tarfile handles the gzip layer itself
+        response.raw.decode_content = True
+        try:
+            return index_archive(_LimitedReader(response.raw, REPO_ARCHIVE_MAX_BYTES))
+        except ArchiveError:
+            raise
+        except Exception as e:
+            raise ArchiveError(f"Archive download failed: {e}")
+
+
+# -----------------------------
+# Incremental refresh
+# -----------------------------
+
+def index_rows(index, text_files=STORED_TEXT_FILES, text_chars=STORED_TEXT_CHARS):
+    """
+    Flatten an index into per-blob rows for the analysis store.
+    Only the text of the files most likely to be summarized is kept.
+
+    Returns:
+        dict: {path: {"sha", "size", "type", "lines", "text"}}, type None for binary files
+    """
+    with_text = sorted(index["contents"], key=lambda path: _content_priority(path, index["files"][path]))
+    with_text = set(with_text[:text_files])
+
+    rows = {}
+    for path, sha in index["blobs"].items():
+        info = index["files"].get(path)
+        rows[path] = {
+            "sha": sha,
+            "size": info["size"] if info else 0,
+            "type": info["type"] if info else None,
+            "lines": info["lines"] if info else 0,
+            "text": index["contents"][path][:text_chars] if path in with_text else None,
+        }
+    return rows
+
+
+def index_from_rows(rows):
+    """Rebuild an index from stored rows."""
+    index = new_index()
+    for path, row in rows.items():
+        index["blobs"][path] = row["sha"]
+        if row["type"] is None:
+            index["skipped"]["binary"] += 1
+            continue
+        index["files"][path] = {
+            "size": row["size"],
+            "type": row["type"],
+            "lines": row["lines"],
+            "truncated": row["text"] is None or row["size"] > len(row["text"]),
+        }
+        stats = index["types"].setdefault(row["type"], {"files": 0, "bytes": 0})
+        stats["files"] += 1
+        stats["bytes"] += row["size"]
+        index["total_bytes"] += row["size"]
+        if row["text"] is not None:
+            index["contents"][path] = row["text"]
+    return index
+
+
+def _tree_blobs(response):
+    """Blob entries of a streamed tree response (path, sha, size only) and its top-level members."""
+    meta = {}
+    blobs = [
+        {"path": entry["path"], "sha": entry["sha"], "size": entry.get("size")}
+        for entry in iter_array_items(response.iter_content(chunk_size=HASH_CHUNK_BYTES), "tree", meta)
+        if entry.get("type") == "blob" and not _is_ignored(entry["path"])
+    ]
+    return {"blobs": blobs, "truncated": bool(meta.get("truncated"))}
+
+
+def tree_blobs(owner, repo):
+    """
+    The blob entries of the recursive HEAD tree, skipping ignored
+    directories. Cached under the tree's ETag, so an unchanged tree is a 304.
+
+    Returns:
+        dict: {"blobs": [{"path", "sha", "size"}], "truncated"}
+    """
+    tree, status = get_github().get_parsed(f"/repos/{owner}/{repo}/git/trees/HEAD?recursive=1",
+                                           _tree_blobs, variant="blobs")
+    if tree is None:
+        raise ArchiveError(f"Tree unavailable (Status: {status})")
+    return tree
+
+
+def fetch_blob(owner, repo, sha, max_file_bytes=REPO_INGEST_MAX_FILE_BYTES):
+    """The first max_file_bytes bytes of a blob."""
+    # Blobs are immutable, so the response cache can always revalidate them
+    response = get_github().get(f"/repos/{owner}/{repo}/git/blobs/{sha}")
+    if response.status_code != 200:
+        raise ArchiveError(f"Blob {sha} unavailable (Status: {response.status_code})")
+    return base64.b64decode(response.json()["content"])[:max_file_bytes]
+
+
+def refresh_index(owner, repo, rows, max_changes=REPO_INCREMENTAL_MAX_BLOBS):
+    """
+    Bring stored rows up to date with the current tree, fetching only added
+    or modified blobs.
+
+    Returns:
+        tuple or None: (index, changed rows, removed paths), or None when the
+        change set is too large (or the tree truncated) and a full ingest is cheaper
+    """
+    tree = tree_blobs(owner, repo)
+    if tree["truncated"]:
+        return None
+    seen = set()
+    changed = []
+    for entry in tree["blobs"]:
+        seen.add(entry["path"])
+        old = rows.get(entry["path"])
+        if old is None or old["sha"] != entry["sha"]:
+            changed.append(entry)
+            if len(changed) > max_changes:
+                return None
+
+    with ThreadPoolExecutor(max_workers=MAX_BLOB_WORKERS) as pool:
+        contents = list(pool.map(lambda entry: fetch_blob(owner, repo, entry["sha"]), changed))
+
+    fresh = new_index()
+    for entry, data in zip(changed, contents):
+        add_file(fresh, entry["path"], entry.get("size") or len(data), entry["sha"], data)
+    changed_rows = index_rows(fresh, text_files=len(changed))
+
+    removed = [path for path in rows if path not in seen]
+    current = {path: row for path, row in rows.items() if path in seen}
+    current.update(changed_rows)
+    return index_from_rows(current), changed_rows, removed
+
+
+def _content_priority(path, info):
+    """Sort key for choosing contents: manifests, README, entry points, then shallow small files."""
+    name = posixpath.basename(path)
+    stem = posixpath.splitext(name)[0].lower()
+    depth = path.count('/')
+
+    if name in MANIFEST_FILES and depth == 0:
+        rank = 0
+    elif stem == 'readme' and depth == 0:
+        rank = 1
+    elif stem in ENTRY_POINTS and depth <= 1:
+        rank = 2
+    elif info["type"] in ('md', 'txt', 'lock', 'json', 'yml', 'yaml', 'csv', 'svg'):
+        rank = 4
+    else:
+        rank = 3
+    return rank, depth, info["size"], path
+
+
+def pick_contents(index, max_files=8, tokens_per_file=375, max_tokens=2000):
+    """
+    Choose file contents for the summary from the whole index, within a
+    shared token budget (utils/context.py).
+
+    Returns:
+        dict: {path: text excerpt}, most important first
+    """
+    candidates = sorted(
+        (path for path in index["files"] if index["contents"].get(path, "").strip()),
+        key=lambda path: _content_priority(path, index["files"][path])
+    )[:max_files]
+
+    builder = ContextBuilder(max_tokens)
+    for rank, path in enumerate(candidates):
+        builder.add(path, lambda tokens, path=path: index["contents"][path], priority=rank,
+                    max_tokens=tokens_per_file)
+    return {path: excerpt for path, excerpt in builder.build().items() if excerpt}
@@ -0,0 +1,165 @@
+"""
+Importance sampling of GitHub recursive trees.
+
+The ?recursive=1 tree of a large monorepo can hold 100k+ entries. Entries
+are streamed from the response (utils/json_stream.py) and scored one at a
+time: manifests, READMEs and entry points rank first, shallow paths beat
+deep ones, and files in directories holding a lot of source code get a
+boost once the whole tree has been seen. Only the best candidates are kept
+in a bounded heap; everything else is folded into per-directory aggregates.
+"""
+
+import heapq
+import posixpath
+
+from agents.repo_ingest import MANIFEST_FILES, ENTRY_POINTS, IGNORED_DIRS
+from utils.json_stream import iter_array_items
+
+CODE_EXTENSIONS = ['.js', '.jsx', '.py', '.java', '.ts', '.tsx', '.json', '.md', '.html', '.css',
+                   '.go', '.rs', '.rb', '.php', '.c', '.cc', '.cpp', '.h', '.cs', '.kt', '.swift']
+DOC_EXTENSIONS = ['.md', '.json', '.html', '.css']
+
+# Candidates kept before the final directory-weighted pick
+MAX_CANDIDATES = 2000
+# Directories deeper than this are aggregated into their ancestor
+AGGREGATE_DEPTH = 2
+# At most this many picked files per directory, so one big folder can't take every slot
+MAX_PER_DIRECTORY = 5
+
+
+def _top_dir(path):
+    return path.split('/', 1)[0] if '/' in path else '.'
+
+
+def _aggregate_dir(path):
+    parts = path.split('/')[:-1][:AGGREGATE_DEPTH]
+    return '/'.join(parts) or '.'
+
+
+def _is_ignored(path):
+    return any(part in IGNORED_DIRS for part in path.split('/')[:-1])
+
+
+def _base_score(path):
+    """Score from the path alone; None if the file is not worth summarizing."""
+    name = posixpath.basename(path)
+    stem, ext = posixpath.splitext(name)
+    depth = path.count('/')
+
+    if name in MANIFEST_FILES:
+        return (100 if depth == 0 else 60) - 5 * depth
+    if stem.lower() == 'readme':
+        return (90 if depth == 0 else 30) - 5 * depth
+    if ext not in CODE_EXTENSIONS:
+        return None
+    if stem.lower() in ENTRY_POINTS:
+        return 70 - 10 * depth
+    if ext in DOC_EXTENSIONS:
+        return 10 - 5 * depth
+    return 25 - 5 * depth
+
+
+def new_summary():
+    return {
+        "sha": None,
+        "truncated": False,
+        "total": 0,          # blobs seen
+        "kept": 0,           # blobs eligible for the summary
+        "types": {},         # extension -> count over eligible blobs
+        "directories": {},   # directory -> {"files", "bytes"} of entries not picked
+        "files": [],         # picked paths, most important first
+        "present": [],       # watched paths found anywhere in the tree
+    }
+
+
+def rank_tree(entries, limit=20, meta=None, watch=()):
+    """
+    Pick the `limit` most useful paths from tree entries.
+
+    Args:
+        entries: Iterable of GitHub tree entries ({"path", "type", "size", ...})
+        limit: Number of paths to pick
+        meta: Top-level tree members (sha, truncated), read after entries is exhausted
+        watch: Paths to look for in the full listing, whether or not they get picked
+
+    Returns:
+        dict: Summary as built by new_summary()
+    """
+    summary = new_summary()
+    heap = []            # (score, path, size) min-heap of the best candidates
+    source_bytes = {}    # top-level dir -> bytes of source code
+    directories = summary["directories"]
+    watch = set(watch)
+    present = set()
+
+    def aggregate(path, size):
+        stats = directories.setdefault(_aggregate_dir(path), {"files": 0, "bytes": 0})
+        stats["files"] += 1
+        stats["bytes"] += size
+
+    for entry in entries:
+        if entry.get('type') != 'blob':
+            continue
+        path = entry['path']
+        size = entry.get('size') or 0
+        summary["total"] += 1
+        if path in watch:
+            present.add(path)
+
+        score = None if _is_ignored(path) else _base_score(path)
+        if score is None:
+            aggregate(path, size)
+            continue
+
+        summary["kept"] += 1
+        ext = path.rsplit('.', 1)[-1] if '.' in posixpath.basename(path) else 'other'
+        summary["types"][ext] = summary["types"].get(ext, 0) + 1
+        top = _top_dir(path)
+        source_bytes[top] = source_bytes.get(top, 0) + size
+
+        item = (score, path, size)
+        if len(heap) < MAX_CANDIDATES:
+            heapq.heappush(heap, item)
+        else:
+            dropped = heapq.heappushpop(heap, item)
+            aggregate(dropped[1], dropped[2])
+
+    # Directory weight is only known once the whole tree has been seen
+    largest = max(source_bytes.values(), default=0) or 1
+
+    def final_score(item):
+        score, path, _ = item
+        return score + 20 * source_bytes.get(_top_dir(path), 0) / largest
+
+    ranked = sorted(heap, key=final_score, reverse=True)
+    picked = set()
+    per_directory = {}
+    for _, path, _ in ranked:
+        parent = posixpath.dirname(path)
+        if len(picked) < limit and per_directory.get(parent, 0) < MAX_PER_DIRECTORY:
+            picked.add(path)
+            per_directory[parent] = per_directory.get(parent, 0) + 1
+
+    # Few directories: fill the remaining slots regardless of the cap
+    for _, path, size in ranked:
+        if path in picked:
+            continue
+        if len(picked) < limit:
+            picked.add(path)
+        else:
+            aggregate(path, size)
+
+    summary["files"] = [path for _, path, _ in ranked if path in picked]
+    summary["present"] = sorted(present)
+
+    if meta is not None:
+        summary["sha"] = meta.get("sha")
+        summary["truncated"] = bool(meta.get("truncated"))
+    return summary
+
+
+def rank_tree_response(response, limit=20, chunk_size=64 * 1024, watch=()):
+    """Stream a (stream=True) tree response through rank_tree()."""
+    meta = {}
+    entries = iter_array_items(response.iter_content(chunk_size=chunk_size), "tree", meta)
+    return rank_tree(entries, limit=limit, meta=meta, watch=watch)
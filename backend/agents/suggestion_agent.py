@@ -1,20 +1,25 @@
-from groq import Groq
-from config import GROQ_API_KEY, MODEL_NAME
-from utils.git_utils import get_git_diff, is_git_repo, get_project_summary
+from agents.llm import complete, PRIORITY_INTERACTIVE
+from utils.context import ContextBuilder
+from utils.git_utils import is_git_repo, get_project_summary
+from utils.diff_reader import read_diff_context
 
-client = Groq(api_key=GROQ_API_KEY)
+# Token budget for the file list and diff in the prompt
+CONTEXT_TOKENS = 2500
 
-def get_suggestions(project, tech, features):
-    """Generates smart coding suggestions based on context and git diff."""
-    
-    git_context = "Not a git repository."
+
+def _build_prompt(project, tech, features):
+    builder = ContextBuilder(CONTEXT_TOKENS)
     if is_git_repo():
-        git_context = get_git_diff()
-        
-    project_summary = get_project_summary()
+        # Recent changes matter most for "what next"
+        builder.add("diff", lambda tokens: read_diff_context(max_tokens=tokens), priority=1, max_tokens=1500)
+    builder.add("files", lambda tokens: get_project_summary(max_tokens=tokens), priority=2, min_tokens=500)
+    context = builder.build()
+
+    git_context = context.get("diff") or "Not a git repository."
+    project_summary = context["files"]
 
-    prompt = f"""
-You are an expert developer assistant. 
+    return f"""
+You are an expert developer assistant.
 Based on the current project context and recent code changes, suggest the next 3 logical steps or code improvements.
 
 Project: {project}
@@ -30,11 +35,14 @@ Current Code Changes (Git Diff):
 Provide concise, actionable advice. Format as a bulleted list.
 """
 
-    res = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[{"role": "user", "content": prompt}],
+
+def get_suggestions(project, tech, features):
+    """Generates smart coding suggestions based on context and git diff."""
+    content = complete(
+        [{"role": "user", "content": _build_prompt(project, tech, features)}],
         temperature=0.4,
-        max_tokens=500
+        max_tokens=500,
+        priority=PRIORITY_INTERACTIVE
     )
+    return content.strip()
 
-    return res.choices[0].message.content.strip()
@@ -1,22 +1,38 @@
-from groq import Groq
-from config import GROQ_API_KEY, MODEL_NAME
+import asyncio
+from agents.llm import complete, complete_async, PRIORITY_BACKGROUND
+from agents.phases import get_phase_name, get_commit_message
+from utils.context import ContextBuilder, ContextMemo, CHARS_PER_TOKEN
 from utils.file_utils import get_file_tree
-from utils.git_utils import get_git_diff, is_git_repo
+from utils.git_utils import is_git_repo
+from utils.diff_reader import read_diff_context
 
-client = Groq(api_key=GROQ_API_KEY)
+# Upper bound on simultaneous expander calls for one plan
+MAX_EXPAND_WORKERS = 4
+# Token budget for the project context in each expander prompt
+CONTEXT_TOKENS = 900
+# Rough size of one file tree line, to turn tokens into a line budget
+TREE_LINE_CHARS = 24
 
-def expand_phase(phase_number, phase_name, project, tech, features):
-    # Get the current project structure and git diff for context
-    try:
-        file_tree = get_file_tree()
-    except Exception:
-        file_tree = "(No file context available)"
 
-    git_context = ""
+def _file_tree(max_tokens):
+    return get_file_tree(max_entries=max(10, max_tokens * CHARS_PER_TOKEN // TREE_LINE_CHARS))
+
+
+def _gather_context(memo=None):
+    """
+    Project structure and git diff for context, within CONTEXT_TOKENS.
+    Pass the same memo for every phase of a plan to load them once.
+    """
+    builder = ContextBuilder(CONTEXT_TOKENS, memo)
+    builder.add("tree", _file_tree, priority=1, max_tokens=500, title="Project File Structure")
     if is_git_repo():
-        git_context = f"\nRecent Code Changes (Git Diff):\n{get_git_diff()[:2000]}\n"
+        builder.add("diff", lambda tokens: read_diff_context(max_tokens=tokens), priority=2,
+                    min_tokens=200, title="Recent Code Changes (Git Diff)")
+    return builder.render()
 
-    prompt = f"""
+
+def _build_prompt(phase_name, project, tech, features, context=""):
+    return f"""
 You are an execution agent helping to build: {project}
 
 Generate 4 to 6 concrete developer tasks for this phase.
@@ -29,6 +45,8 @@ Project: {project}
 Tech stack: {tech}
 Core features: {features}
 
+{context}
+
 Each task must be on a new line.
 DO NOT use headings or explanations.
 
@@ -38,23 +56,84 @@ Example tasks:
 - Design database schema for users table
 """
 
-    res = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-        max_tokens=300
-    )
 
-    raw_lines = res.choices[0].message.content.split("\n")
+def _parse_tasks(content):
+    raw_lines = content.split("\n")
 
     # take any meaningful line as a task
-    tasks = [
+    return [
         line.strip()
         for line in raw_lines
         if line.strip() and not line.lower().startswith("phase")
     ]
 
-    commit_msg = f"phase-{phase_number}: {phase_name.lower()} complete"
 
-    return tasks, commit_msg
+def expand_phase(phase_number, phase_name, project, tech, features, context_memo=None):
+    context = _gather_context(context_memo)
+
+    content = complete(
+        [{"role": "user", "content": _build_prompt(phase_name, project, tech, features, context)}],
+        temperature=0.3,
+        max_tokens=300,
+        priority=PRIORITY_BACKGROUND
+    )
+
+    return _parse_tasks(content), get_commit_message(phase_number, phase_name)
+
+
+async def expand_phase_async(phase_number, phase_name, project, tech, features, context_memo=None):
+    # Context gathering forks git and walks the disk, keep it off the event loop
+    context = await asyncio.to_thread(_gather_context, context_memo)
+
+    content = await complete_async(
+        [{"role": "user", "content": _build_prompt(phase_name, project, tech, features, context)}],
+        temperature=0.3,
+        max_tokens=300,
+        priority=PRIORITY_BACKGROUND
+    )
+
+    return _parse_tasks(content), get_commit_message(phase_number, phase_name)
+
+
+async def expand_phases_async(phase_lines, project, tech, features, max_workers=MAX_EXPAND_WORKERS):
+    """
+    Expand several phases concurrently.
+
+    Args:
+        phase_lines: Planner output lines ("Phase 1: ...")
+        max_workers: Maximum number of expander calls in flight
+
+    Returns:
+        list: One entry per phase, in the original order. Each entry is a
+        (tasks, commit_msg) tuple, or an Exception if that phase failed.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    memo = ContextMemo()
+
+    async def _expand(i, phase_line):
+        async with semaphore:
+            return await expand_phase_async(i + 1, get_phase_name(phase_line), project, tech, features, memo)
+
+    return await asyncio.gather(
+        *(_expand(i, line) for i, line in enumerate(phase_lines)),
+        return_exceptions=True
+    )
+
+
+async def expand_phases_as_completed(phase_lines, project, tech, features, max_workers=MAX_EXPAND_WORKERS):
+    """
+    Expand phases concurrently, yielding (index, result) as each one finishes.
+    result is a (tasks, commit_msg) tuple, or an Exception if that phase failed.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    memo = ContextMemo()
+
+    async def _expand(i, phase_line):
+        async with semaphore:
+            try:
+                return i, await expand_phase_async(i + 1, get_phase_name(phase_line), project, tech, features, memo)
+            except Exception as e:
+                return i, e
 
+    for next_done in asyncio.as_completed([_expand(i, line) for i, line in enumerate(phase_lines)]):
+        yield await next_done
@@ -1,66 +1,116 @@
-import requests
-from groq import Groq
-from config import GITHUB_TOKEN, GROQ_API_KEY, MODEL_NAME
+import asyncio
+from utils.context import truncate_to_tokens
+from utils.github_client import get_github, parse_repo_url
+from agents.llm import complete, complete_async, PRIORITY_BACKGROUND
+
+# Token budget for the commit diff in the verification prompt
+DIFF_TOKENS = 1250
 
-def verify_phase(repo_url, phase_number):
-    parts = repo_url.rstrip("/").split("/")
-    owner, repo = parts[-2], parts[-1]
 
-    url = f"https://api.github.com/repos/{owner}/{repo}/commits"
+def _fetch_latest_commit(repo_url):
+    """
+    Fetch the latest commit message and its diff.
 
-    headers = {}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    Returns:
+        tuple: (commit_msg, diff_text, error)
+    """
+    owner, repo = parse_repo_url(repo_url)
+    github = get_github()
 
-    res = requests.get(url, headers=headers)
+    res = github.get(f"/repos/{owner}/{repo}/commits")
 
     if res.status_code != 200:
-        return False, f"GitHub API error: {res.status_code}"
+        return None, None, f"GitHub API error: {res.status_code}"
 
     latest_commit = res.json()[0]
     commit_msg = latest_commit["commit"]["message"]
     commit_sha = latest_commit["sha"]
 
     # Get the diff for this commit
-    diff_url = f"https://api.github.com/repos/{owner}/{repo}/commits/{commit_sha}"
-    headers["Accept"] = "application/vnd.github.v3.diff"
-    diff_res = requests.get(diff_url, headers=headers)
-    diff_text = diff_res.text[:5000] if diff_res.status_code == 200 else "(Diff unavailable)"
+    diff_res = github.get(
+        f"/repos/{owner}/{repo}/commits/{commit_sha}",
+        headers={"Accept": "application/vnd.github.v3.diff"}
+    )
+    diff_text = truncate_to_tokens(diff_res.text, DIFF_TOKENS) if diff_res.status_code == 200 else "(Diff unavailable)"
 
-    expected = f"phase-{phase_number}"
+    return commit_msg, diff_text, None
 
-    if expected in commit_msg.lower():
-        # AI-based semantic verification of the diff context
-        try:
-            client = Groq(api_key=GROQ_API_KEY)
-            
-            prompt = f"""
+
+def _build_prompt(phase_number, commit_msg, diff_text):
+    return f"""
             Verify if the following code changes (Git Diff) actually implement the goals for Phase {phase_number}.
-            
+
             Commit Message: {commit_msg}
             Git Diff (truncated):
             {diff_text}
-            
+
             Return 'YES' if it looks correct, or 'NO' if it looks unrelated or incomplete.
             Add a very brief 1-sentence explanation.
             """
-            
-            res = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[{"role": "user", "content": prompt}],
+
+
+def _judge(ai_opinion):
+    ai_opinion = ai_opinion.strip()
+
+    if ai_opinion.upper().startswith("NO"):
+        return False, f"Matched commit but AI rejected it: {ai_opinion}"
+
+    return True, f"Matched commit and AI verified: {ai_opinion}"
+
+
+def _fetch_or_error(repo_url):
+    try:
+        return _fetch_latest_commit(repo_url)
+    except Exception as e:
+        # Timeouts and connection errors surface as a failed verification
+        return None, None, f"GitHub API error: {e}"
+
+
+def verify_phase(repo_url, phase_number):
+    commit_msg, diff_text, error = _fetch_or_error(repo_url)
+    if error:
+        return False, error
+
+    expected = f"phase-{phase_number}"
+
+    if expected in commit_msg.lower():
+        # AI-based semantic verification of the diff context
+        try:
+            ai_opinion = complete(
+                [{"role": "user", "content": _build_prompt(phase_number, commit_msg, diff_text)}],
                 temperature=0.1,
-                max_tokens=100
+                max_tokens=100,
+                priority=PRIORITY_BACKGROUND
             )
-            ai_opinion = res.choices[0].message.content.strip()
-            
-            if ai_opinion.upper().startswith("NO"):
-                return False, f"Matched commit but AI rejected it: {ai_opinion}"
-            
-            return True, f"Matched commit and AI verified: {ai_opinion}"
-            
+            return _judge(ai_opinion)
+
         except Exception as e:
             # Fallback to simple matching if AI fails
             return True, f"Matched commit: '{commit_msg}' (AI verification skipped: {e})"
     else:
         return False, f"Latest commit was: '{commit_msg}' (expected '{expected}')"
 
+
+async def verify_phase_async(repo_url, phase_number):
+    """Async variant of verify_phase()."""
+    # GitHub calls are blocking, keep them off the event loop
+    commit_msg, diff_text, error = await asyncio.to_thread(_fetch_or_error, repo_url)
+    if error:
+        return False, error
+
+    expected = f"phase-{phase_number}"
+
+    if expected in commit_msg.lower():
+        try:
+            ai_opinion = await complete_async(
+                [{"role": "user", "content": _build_prompt(phase_number, commit_msg, diff_text)}],
+                temperature=0.1,
+                max_tokens=100,
+                priority=PRIORITY_BACKGROUND
+            )
+            return _judge(ai_opinion)
+
+        except Exception as e:
+            return True, f"Matched commit: '{commit_msg}' (AI verification skipped: {e})"
+    else:
+        return False, f"Latest commit was: '{commit_msg}' (expected '{expected}')"
@@ -1,9 +1,15 @@
+import asyncio
+import json
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
-from agents.planner import generate_phases
-from agents.task_expander import expand_phase
-from agents.conversation_agent import get_conversation_response
+from config import PLAN_MODE
+from agents.planner import generate_phases_async, generate_plan_async, plan_to_phase_lines
+from agents.task_expander import expand_phases_async, expand_phases_as_completed
+from agents.phases import get_phase_name
+from agents.conversation_agent import get_conversation_response_async, stream_conversation_response_async
 from state.store import Store
 
 app = FastAPI()
@@ -18,52 +24,131 @@ app.add_middleware(
 
 store = Store()
 
+PLAN_REPLY = "Here's your execution plan:\n\nNow, please share your GitHub repository URL so I can review your code and help you get started!"
+
+
+def get_plan_request(message, history):
+    """
+    Decide whether a chat message asks for a plan.
+
+    Returns:
+        str or None: The project description to plan for, or None
+    """
+    # Check if user is asking to generate a plan (keywords)
+    generate_keywords = ["generate", "create plan", "roadmap", "show me", "build plan", "execution plan"]
+    should_generate_plan = any(keyword in message.lower() for keyword in generate_keywords)
+    
+    # If user wants a plan and we have project info in history
+    if not (should_generate_plan and len(history) > 0):
+        return None
+    
+    # Extract project info from conversation
+    project_info = message
+    for msg in history:
+        if msg.get("role") == "user":
+            project_info = msg.get("content", "")
+    return project_info
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def make_phase_entry(index, phase_line, tasks, commit_msg):
+    """Shape one expanded phase for the dashboard."""
+    return {
+        "number": index+1,
+        "name": get_phase_name(phase_line),
+        "tasks": tasks,
+        "commit_msg": commit_msg,
+        "status": "active" if index == 0 else "pending"
+    }
+
+
+async def build_phase_data(phases, project):
+    """
+    Expand the planned phases concurrently and shape them for the dashboard.
+    Phases whose expansion fails are logged and left out.
+    """
+    # Expansion mode costs one call per phase, limit to first 3 for performance
+    phases = phases[:3]
+    results = await expand_phases_async(phases, project, "", "")
+
+    phase_data = []
+    for i, (phase_line, result) in enumerate(zip(phases, results)):
+        if isinstance(result, Exception):
+            print(f"Error expanding phase {i+1}: {result}")
+            continue
+
+        tasks, commit_msg = result
+        phase_data.append(make_phase_entry(i, phase_line, tasks, commit_msg))
+
+    return phase_data
+
+
+async def generate_structured_plan(project):
+    """
+    Build the whole plan in one LLM call when PLAN_MODE is "structured".
+
+    Returns:
+        tuple: (phase_lines, phase_data), or (None, None) if the mode is off
+        or the model output could not be used
+    """
+    if PLAN_MODE != "structured":
+        return None, None
+
+    try:
+        plan = await generate_plan_async(project, "", "", "")
+    except Exception as e:
+        print(f"Structured planning failed, falling back to phase expansion: {e}")
+        return None, None
+
+    phases = plan_to_phase_lines(plan)
+    phase_data = [
+        make_phase_entry(i, line, phase["tasks"], phase["commit_msg"])
+        for i, (line, phase) in enumerate(zip(phases, plan))
+    ]
+    return phases, phase_data
+
+
+async def plan_project(project):
+    """
+    Generate and expand a plan, structured mode first.
+
+    Returns:
+        tuple: (phase_lines, phase_data), or (None, None) if planning failed
+    """
+    phases, phase_data = await generate_structured_plan(project)
+    if phases:
+        return phases, phase_data
+
+    phases = await generate_phases_async(project, "", "", "")
+    if not phases:
+        return None, None
+
+    return phases, await build_phase_data(phases, project)
+
 @app.post("/chat")
-def chat(data: dict):
+async def chat(data: dict):
     message = data.get("message", "")
     history = data.get("history", [])
     
     try:
-        # Check if user is asking to generate a plan (keywords)
-        generate_keywords = ["generate", "create plan", "roadmap", "show me", "build plan", "execution plan"]
-        should_generate_plan = any(keyword in message.lower() for keyword in generate_keywords)
+        project_info = get_plan_request(message, history)
         
-        # If user wants a plan and we have project info in history
-        if should_generate_plan and len(history) > 0:
-            # Extract project info from conversation
-            project_info = message
-            for msg in history:
-                if msg.get("role") == "user":
-                    project_info = msg.get("content", "")
-            
+        if project_info is not None:
             # Generate phases
-            phases = generate_phases(project_info, "", "", "")
+            phases, phase_data = await plan_project(project_info)
             
             if phases:
-                phase_data = []
-                for i, phase_line in enumerate(phases[:3]):
-                    try:
-                        phase_name = phase_line.split(":", 1)[1].strip() if ":" in phase_line else phase_line
-                        tasks, commit_msg = expand_phase(i+1, phase_name, project_info, "", "")
-                        
-                        phase_data.append({
-                            "number": i+1,
-                            "name": phase_name,
-                            "tasks": tasks,
-                            "commit_msg": commit_msg,
-                            "status": "active" if i == 0 else "pending"
-                        })
-                    except Exception as e:
-                        print(f"Error expanding phase {i+1}: {e}")
-                        continue
-                
                 return {
-                    "reply": f"Here's your execution plan:\n\nNow, please share your GitHub repository URL so I can review your code and help you get started!",
+                    "reply": PLAN_REPLY,
                     "phases": phase_data
                 }
         
         # Otherwise, use conversational agent
-        reply = get_conversation_response(message, history)
+        reply = await get_conversation_response_async(message, history)
         
         return {"reply": reply}
         
@@ -73,37 +158,139 @@ def chat(data: dict):
         traceback.print_exc()
         return {"reply": f"I encountered an error. Could you rephrase that?"}
 
+@app.post("/chat/stream")
+async def chat_stream(data: dict):
+    """
+    Streaming variant of /chat as Server-Sent Events.
+
+    Emits "token" events ({"text": ...}) while the reply is generated and a
+    final "done" event carrying the full reply plus "phases" when a plan was
+    built. Failures are reported as an "error" event.
+    """
+    message = data.get("message", "")
+    history = data.get("history", [])
+
+    async def events():
+        try:
+            project_info = get_plan_request(message, history)
+            
+            if project_info is not None:
+                phases, phase_data = await plan_project(project_info)
+                
+                if phases:
+                    yield sse_event("token", {"text": PLAN_REPLY})
+                    yield sse_event("done", {"reply": PLAN_REPLY, "phases": phase_data})
+                    return
+            
+            reply = []
+            async for delta in stream_conversation_response_async(message, history):
+                reply.append(delta)
+                yield sse_event("token", {"text": delta})
+            
+            yield sse_event("done", {"reply": "".join(reply)})
+            
+        except Exception as e:
+            print(f"Error in /chat/stream endpoint: {e}")
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"reply": "I encountered an error. Could you rephrase that?"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/start-project")
-def start_project(data: dict):
+async def start_project(data: dict):
     idea = data.get("idea", "")
     
-    # Generate phases from the idea
-    phases = generate_phases(idea, "", "", "")
+    # Generate phases from the idea and expand them into tasks
+    phases, phase_data = await plan_project(idea)
     
     if not phases:
         return {"error": "Failed to generate phases"}
     
-    store.save_plan(phases)
-    
-    # Expand phases to get tasks (limit to first 3 for performance)
-    phase_data = []
-    for i, phase_line in enumerate(phases[:3]):
-        try:
-            phase_name = phase_line.split(":", 1)[1].strip() if ":" in phase_line else phase_line
-            tasks, commit_msg = expand_phase(i+1, phase_name, idea, "", "")
-            
-            phase_data.append({
-                "number": i+1,
-                "name": phase_name,
-                "tasks": tasks,
-                "commit_msg": commit_msg,
-                "status": "active" if i == 0 else "pending"
-            })
-        except Exception as e:
-            print(f"Error expanding phase {i+1}: {e}")
-            continue
+    await asyncio.to_thread(store.save_plan, phases)
     
     return {
         "message": f"Execution plan generated for: {idea}",
         "phases": phase_data
     }
+
+@app.post("/start-project/stream")
+async def start_project_stream(data: dict):
+    """
+    Streaming variant of /start-project as newline-delimited JSON.
+
+    Emits a "plan" line with the phase list as soon as the planner returns,
+    then one "phase" line per phase in completion order (or "phase_error"),
+    and a final "done" line.
+    """
+    idea = data.get("idea", "")
+
+    async def lines():
+        def line(payload):
+            return json.dumps(payload) + "\n"
+
+        def plan_line(phases):
+            return line({
+                "type": "plan",
+                "message": f"Execution plan generated for: {idea}",
+                "phases": [
+                    {"number": i+1, "name": get_phase_name(p), "status": "active" if i == 0 else "pending"}
+                    for i, p in enumerate(phases)
+                ]
+            })
+
+        # Structured mode already has every phase's tasks, send them all at once
+        phases, phase_data = await generate_structured_plan(idea)
+        if phases:
+            await asyncio.to_thread(store.save_plan, phases)
+            yield plan_line(phases)
+            for entry in phase_data:
+                yield line({"type": "phase", "phase": entry})
+            yield line({"type": "done"})
+            return
+
+        try:
+            phases = await generate_phases_async(idea, "", "", "")
+        except Exception as e:
+            print(f"Error in /start-project/stream endpoint: {e}")
+            yield line({"type": "error", "error": "Failed to generate phases"})
+            return
+
+        if not phases:
+            yield line({"type": "error", "error": "Failed to generate phases"})
+            return
+
+        await asyncio.to_thread(store.save_plan, phases)
+
+        # Expansion mode: limit to first 3 for performance
+        phases = phases[:3]
+        yield plan_line(phases)
+
+        async for i, result in expand_phases_as_completed(phases, idea, "", ""):
+            if isinstance(result, Exception):
+                print(f"Error expanding phase {i+1}: {result}")
+                yield line({"type": "phase_error", "number": i+1, "error": str(result)})
+                continue
+
+            tasks, commit_msg = result
+            yield line({"type": "phase", "phase": make_phase_entry(i, phases[i], tasks, commit_msg)})
+
+        yield line({"type": "done"})
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/analytics")
+def analytics(include_archive: bool = True, weeks: int = 12):
+    """
+    Velocity, phase duration percentiles and weekly trend over the current
+    session and (unless include_archive is false) every archived one.
+    A plain def: FastAPI runs it in the threadpool, off the event loop.
+    """
+    # NumPy is only imported on the first request, not at server start
+    from utils.analytics import load_columns, build_report
+
+    return build_report(load_columns(include_archive), weeks)
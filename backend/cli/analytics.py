@@ -0,0 +1,88 @@
+"""
+Velocity, phase duration and trend reports (utils/analytics.py) over the
+current session and every archived one.
+
+Usage (from backend/):
+    python -m cli.run analytics [--current-only] [--weeks N] [--json]
+"""
+
+import argparse
+import json
+import sys
+
+from utils.analytics import load_columns, build_report
+from utils.task_manager import format_duration
+from utils.ui import console, print_info, Table, box
+
+
+def _duration(seconds):
+    return format_duration(seconds) if seconds is not None else "—"
+
+
+def _value(value, suffix=""):
+    return f"{value}{suffix}" if value is not None else "—"
+
+
+def print_report(report):
+    totals, velocity = report["totals"], report["velocity"]
+    rate = totals["task_completion_rate"]
+    console.print(f"Sessions: [bold]{totals['sessions']:,}[/bold]   "
+                  f"Phases completed: [bold]{totals['phase_completions']:,}[/bold]   "
+                  f"Tasks: {totals['tasks_completed']:,}/{totals['total_tasks']:,}"
+                  + (f" ({rate:.0%})" if rate is not None else ""))
+    sessions = velocity["sessions"]
+    console.print(f"Velocity: [bold]{_value(velocity['tasks_per_hour'])}[/bold] tasks/hour   "
+                  f"[dim]per session: " + ", ".join(f"{p} {_value(v)}" for p, v in sessions.items()) + "[/dim]")
+    console.print()
+
+    table = Table(title="⏱️  Phase Durations", box=box.ROUNDED, border_style="cyan", show_header=True)
+    table.add_column("Phase", style="bold", justify="right")
+    table.add_column("Completions", justify="right")
+    table.add_column("Mean", justify="right")
+    percentile_keys = [k for k in (report["phase_durations"][0] if report["phase_durations"] else {})
+                       if k.startswith("p") and k.endswith("_seconds")]
+    for key in percentile_keys:
+        table.add_column(key.split("_")[0], justify="right")
+    for row in report["phase_durations"]:
+        table.add_row(str(row["phase"]), f"{row['completions']:,}", _duration(row["mean_seconds"]),
+                      *[_duration(row[key]) for key in percentile_keys])
+    console.print(table)
+
+    trend = report["trend"]
+    table = Table(title="📈 Weekly Trend", box=box.ROUNDED, border_style="cyan", show_header=True)
+    table.add_column("Week of", style="dim")
+    table.add_column("Phases", justify="right")
+    table.add_column("Tasks", justify="right")
+    table.add_column("Hours", justify="right")
+    table.add_column("Tasks/hour", justify="right")
+    for week in trend["weeks"]:
+        table.add_row(week["week"], f"{week['phases']:,}", f"{week['tasks']:,}",
+                      _value(week["hours"]), _value(week["tasks_per_hour"]))
+    console.print(table)
+    change = trend["velocity_change_per_week"]
+    if change is not None:
+        console.print(f"Velocity trend: [bold]{change:+}[/bold] tasks/hour per week")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="analytics", description="Velocity and phase duration reports")
+    parser.add_argument("--current-only", action="store_true", help="Leave out archived sessions")
+    parser.add_argument("--weeks", type=int, default=12, help="Weeks shown in the trend (default 12)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    columns = load_columns(include_archive=not args.current_only)
+    if not columns["phase"].size:
+        print_info("No completed phases to analyze yet.")
+        return 0
+
+    report = build_report(columns, args.weeks)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Query the archive of past sessions (state/archive.py).
+
+Listing, searching and stats read only the archive index; `show` reads
+one session's bytes.
+
+Usage (from backend/):
+    python -m cli.run archive list [--project NAME] [--status STATUS] [--since YYYY-MM-DD] [--limit N]
+    python -m cli.run archive show <id> [--json]
+    python -m cli.run archive stats
+    python -m cli.run archive reindex
+"""
+
+import argparse
+import json
+import sys
+
+from state.archive import get_archive
+from utils.ui import console, print_error, print_info, print_success, print_phases_list, Table, box
+
+
+def _date(value):
+    return (value or "")[:16].replace("T", " ")
+
+
+def cmd_list(archive, args):
+    rows = archive.list_sessions(args.project, args.status, args.since, args.limit)
+    if not rows:
+        print_info("No archived sessions match.")
+        return 0
+
+    table = Table(title="🗄️  Archived Sessions", box=box.ROUNDED, border_style="cyan", show_header=True)
+    table.add_column("ID", style="bold", justify="right")
+    table.add_column("Project", style="white")
+    table.add_column("Tech", style="dim")
+    table.add_column("Status")
+    table.add_column("Phases", justify="right")
+    table.add_column("Started", style="dim")
+    table.add_column("Archived", style="dim")
+    for row in rows:
+        status_style = "green" if row["status"] == "completed" else "yellow"
+        table.add_row(
+            str(row["id"]), row["project"], row["tech"],
+            f"[{status_style}]{row['status']}[/{status_style}]",
+            f"{row['completed_phases']}/{row['phases']}",
+            _date(row["started_at"]), _date(row["archived_at"])
+        )
+    console.print(table)
+    return 0
+
+
+def cmd_show(archive, args):
+    session = archive.get(args.id)
+    if session is None:
+        print_error(f"No archived session #{args.id}")
+        return 1
+    if args.json:
+        print(json.dumps(session, indent=2))
+        return 0
+
+    console.print(f"[bold]{session.get('project', '')}[/bold]  [dim]({session.get('tech', '')}, "
+                  f"{session.get('platform', '')})[/dim]")
+    if session.get("repo_url"):
+        console.print(f"   {session['repo_url']}", style="dim")
+    print_phases_list(session.get("phases", []), current_phase=session.get("current_phase", 0))
+    return 0
+
+
+def cmd_stats(archive, args):
+    stats = archive.stats()
+    if not stats:
+        print_error("The archive index is unavailable.")
+        return 1
+    console.print(f"Sessions: [bold]{stats['sessions']:,}[/bold]  "
+                  f"({', '.join(f'{s}: {n:,}' for s, n in sorted(stats['by_status'].items())) or 'none'})")
+    console.print(f"Phases completed: {stats['completed_phases']:,} of {stats['phases']:,}")
+    console.print(f"Compressed size: {stats['bytes'] / 1024:,.1f} KB")
+    return 0
+
+
+def cmd_reindex(archive, args):
+    count = archive.rebuild_index()
+    print_success(f"Indexed {count:,} archived sessions.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="archive", description="Query archived sessions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="List archived sessions, newest first")
+    list_parser.add_argument("--project", help="Match project names containing this (case-insensitive)")
+    list_parser.add_argument("--status", help="Only sessions with this status (e.g. completed)")
+    list_parser.add_argument("--since", help="Only sessions archived on or after this date (YYYY-MM-DD)")
+    list_parser.add_argument("--limit", type=int, default=50, help="Maximum sessions shown (default 50)")
+    list_parser.set_defaults(handler=cmd_list)
+
+    show_parser = commands.add_parser("show", help="Show one archived session")
+    show_parser.add_argument("id", type=int)
+    show_parser.add_argument("--json", action="store_true", help="Print the full session as JSON")
+    show_parser.set_defaults(handler=cmd_show)
+
+    commands.add_parser("stats", help="Totals over the whole archive").set_defaults(handler=cmd_stats)
+    commands.add_parser("reindex", help="Rebuild the index from the segment files").set_defaults(handler=cmd_reindex)
+
+    args = parser.parse_args(argv)
+    return args.handler(get_archive(), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Import-time budget check for the API and CLI entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+fails if the module's cumulative import time exceeds its budget, or if it
+pulls in a module that should only load on first use (the LLM and HTTP
+stacks).
+
+Usage (from backend/):
+    python -m cli.import_budget
+    python -m cli.import_budget --module cli.run --budget-ms 150
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# module -> (budget in ms, top-level packages that must not be imported)
+BUDGETS = {
+    "cli.run": (250, ["groq", "httpx", "requests"]),
+    "api": (1000, ["groq", "httpx", "requests"]),
+}
+
+
+def measure_imports(module):
+    """
+    Import module in a fresh interpreter.
+
+    Returns:
+        dict: {imported module name: cumulative import time in microseconds}
+    """
+    env = dict(os.environ)
+    # The check must pass on a machine without credentials
+    env.pop("GROQ_API_KEY", None)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            continue  # header line
+        timings[fields[2].strip()] = cumulative
+    return timings
+
+
+def check_module(module, budget_ms, forbidden):
+    """Returns a list of violation messages (empty when within budget)."""
+    timings = measure_imports(module)
+    problems = []
+
+    total_ms = timings.get(module, 0) / 1000
+    if total_ms > budget_ms:
+        problems.append(f"{module}: import took {total_ms:.0f}ms (budget {budget_ms}ms)")
+
+    for name in forbidden:
+        if name in timings:
+            problems.append(f"{module}: imports '{name}' eagerly ({timings[name] / 1000:.0f}ms)")
+
+    print(f"{'❌' if problems else '✅'} {module}: {total_ms:.0f}ms / {budget_ms}ms")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import-time budgets of the entry points")
+    parser.add_argument("--module", help="Check only this module")
+    parser.add_argument("--budget-ms", type=int, help="Override the module's budget")
+    args = parser.parse_args(argv)
+
+    checks = BUDGETS
+    if args.module:
+        checks = {args.module: BUDGETS.get(args.module, (args.budget_ms or 250, []))}
+
+    problems = []
+    for module, (budget_ms, forbidden) in checks.items():
+        problems += check_module(module, args.budget_ms or budget_ms, forbidden)
+
+    for problem in problems:
+        print(f"   {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
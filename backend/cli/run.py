@@ -1,7 +1,8 @@
-from state.store import STATE, load_state, save_state, clear_state, archive_state
-from agents.planner import generate_phases
-from agents.task_expander import expand_phase
-from agents.verifier import verify_phase
+import sys
+
+from state.store import STATE, load_state, save_state, set_value, transaction, clear_state, archive_state
+from config import PLAN_MODE
+from agents.phases import get_commit_message
 from utils.ui import (
     console, print_header, print_success, print_error, print_warning, print_info,
     print_phase_header, print_tasks_table, print_phases_list, ask_input, ask_confirm,
@@ -15,14 +16,12 @@ from utils.task_manager import (
 )
 from utils.rollback import (
     record_phase_completion, get_phase_history, rollback_to_phase, retry_current_phase,
-    can_rollback, get_rollback_choices, undo_last_verification
+    can_rollback, get_rollback_choices, undo_last_verification, checkout_phase, redo, can_redo
 )
-from agents.suggestion_agent import get_suggestions
 from utils.git_utils import is_git_repo, get_current_branch, create_branch
-from utils.github import (
-    create_issue, create_pull_request, create_label, 
-    add_labels_to_issue, create_milestone
-)
+
+# The LLM agents, the verifier and the GitHub helpers are imported where they
+# are used: resuming a session with saved tasks shouldn't load groq/requests.
 
 
 
@@ -99,6 +98,45 @@ def handle_startup_state():
         return False
 
 
+def generate_plan_phases(fresh=False):
+    """
+    Plan the project and return the phase lines.
+
+    In structured mode the whole plan (tasks and commit messages included)
+    comes from one LLM call and the tasks are kept in STATE["planned_tasks"],
+    so phases don't need an expander call later. Falls back to the phase
+    list planner if structured output can't be used.
+    """
+    from agents.planner import generate_phases, generate_plan, plan_to_phase_lines
+
+    STATE["planned_tasks"] = {}
+
+    if PLAN_MODE == "structured":
+        try:
+            plan = generate_plan(
+                STATE["project"],
+                STATE["tech"],
+                STATE["features"],
+                STATE["platform"],
+                fresh=fresh
+            )
+            STATE["planned_tasks"] = {
+                str(i): {"tasks": phase["tasks"], "commit_msg": phase["commit_msg"]}
+                for i, phase in enumerate(plan)
+            }
+            return plan_to_phase_lines(plan)
+        except Exception as e:
+            print_warning(f"Structured planning failed ({e}). Falling back to phase list.")
+
+    return generate_phases(
+        STATE["project"],
+        STATE["tech"],
+        STATE["features"],
+        STATE["platform"],
+        fresh=fresh
+    )
+
+
 def main():
     print_welcome()
 
@@ -127,16 +165,13 @@ def main():
     # INTERACTIVE PLANNING LOOP
     # Skip this if resuming an existing session
     if not should_resume:
+        regenerate = False
         while True:
-            STATE["phases"] = generate_phases(
-                STATE["project"],
-                STATE["tech"],
-                STATE["features"],
-                STATE["platform"]
-            )
+            STATE["phases"] = generate_plan_phases(fresh=regenerate)
 
             if not STATE["phases"]:
                 print_error("Failed to generate phases. Retrying...")
+                regenerate = True
                 continue
 
             console.print()
@@ -158,6 +193,8 @@ def main():
             elif choice == 'R':
                 console.print()
                 print_info("Regenerating plan...")
+                # Bypass the response cache, otherwise we'd get the same plan back
+                regenerate = True
                 continue
             elif choice == 'E':
                 console.print()
@@ -174,6 +211,8 @@ def main():
                 
                 if new_phases:
                     STATE["phases"] = new_phases
+                    # Planned tasks belonged to the generated phases
+                    STATE["planned_tasks"] = {}
                     # Plan approved via manual edit, save state
                     STATE["status"] = "in_progress"
                     save_state()
@@ -252,16 +291,22 @@ def main():
 
         # Generate REAL tasks (Context Aware) - only if not already saved
         existing_tasks = get_tasks(idx)
+        planned = STATE.get("planned_tasks", {}).get(str(idx))
         
         if not existing_tasks:
-            # First time seeing this phase, generate tasks
-            task_strings, expected_commit = expand_phase(
-                phase_number,
-                phase_name,
-                STATE["project"],
-                STATE["tech"],
-                STATE["features"]
-            )
+            if planned:
+                # Tasks came with the structured plan, no expander call needed
+                task_strings, expected_commit = planned["tasks"], planned["commit_msg"]
+            else:
+                # First time seeing this phase, generate tasks
+                from agents.task_expander import expand_phase
+                task_strings, expected_commit = expand_phase(
+                    phase_number,
+                    phase_name,
+                    STATE["project"],
+                    STATE["tech"],
+                    STATE["features"]
+                )
 
             if not task_strings:
                 print_error("No tasks generated. This should not happen.")
@@ -273,14 +318,11 @@ def main():
         else:
             # Resuming phase, use existing tasks
             tasks = existing_tasks
-            # Regenerate commit message
-            _, expected_commit = expand_phase(
-                phase_number,
-                phase_name,
-                STATE["project"],
-                STATE["tech"],
-                STATE["features"]
-            )
+            # Rebuild commit message locally, no need to re-run the expander
+            if planned:
+                expected_commit = planned["commit_msg"]
+            else:
+                expected_commit = get_commit_message(phase_number, phase_name)
 
         # Display tasks with status
         print_tasks_table(tasks, title=f"📝 Phase {phase_number} Tasks", show_status=True)
@@ -294,6 +336,7 @@ def main():
 
         # Create GitHub Issues if requested (only if tasks were just generated)
         if create_issues and not existing_tasks:
+            from utils.github import create_issue, create_label, create_milestone
             print_info("Creating GitHub Issues...")
             
             # Create Milestone for the phase (optional but good)
@@ -332,7 +375,9 @@ def main():
         print_task_commands()
         console.print()
 
-        # Task management command loop
+        # Task management command loop; navigation commands leave it to
+        # reload the (possibly different) current phase
+        navigated = False
         while True:
             cmd = console.input('[cyan]> [/cyan]').strip()
 
@@ -441,6 +486,7 @@ def main():
                             print_success(f"Successfully rolled back to Phase {target_idx + 1}")
                             # This breaks the task command loop AND the main execution loop for the current phase
                             # Since current_phase in STATE is updated, the next iteration of the main loop will be the target phase
+                            navigated = True
                             break
                         else:
                             print_error("Rollback failed.")
@@ -453,6 +499,7 @@ def main():
                     if retry_current_phase():
                         print_success(f"Phase {phase_number} reset.")
                         # Break command loop to refresh tasks for the same phase index
+                        navigated = True
                         break
                 console.print()
 
@@ -466,12 +513,38 @@ def main():
                 if ask_confirm("Are you sure you want to undo the last verification?", default=True):
                     if undo_last_verification():
                         print_success("Last verification undone.")
+                        navigated = True
                         break
                 console.print()
 
+            elif cmd.startswith("checkout "):
+                try:
+                    target_idx = int(cmd.split()[1]) - 1
+                except (ValueError, IndexError):
+                    print_error("Usage: checkout <number>")
+                    continue
+                
+                # Restores the saved phase as is: no planner or expander call
+                if checkout_phase(target_idx):
+                    print_success(f"Checked out Phase {target_idx + 1} (type 'redo' to come back)")
+                    navigated = True
+                    break
+                print_error(f"No snapshot of Phase {target_idx + 1}; only completed phases can be checked out.")
+
+            elif cmd == "redo":
+                if not can_redo():
+                    print_error("Nothing to redo.")
+                    continue
+                
+                if redo():
+                    print_success("Redone.")
+                    navigated = True
+                    break
+                print_error("Redo failed.")
+
             elif cmd == "history":
                 console.print()
-                history = get_phase_history()
+                history = get_phase_history(completions_only=True)
                 print_phase_history(history, idx)
                 console.print()
 
@@ -479,6 +552,7 @@ def main():
                 console.print()
                 print_info("Analyzing context and generating suggestions...")
                 with console.status("[bold blue]Thinking..."):
+                    from agents.suggestion_agent import get_suggestions
                     suggestions = get_suggestions(STATE["project"], STATE["tech"], STATE["features"])
                 
                 console.print(Panel(suggestions, title="💡 Smart Suggestions", border_style="yellow", box=box.ROUNDED))
@@ -489,17 +563,17 @@ def main():
                 print_error(f'Unknown command: {cmd}. Type "help" for available commands.')
                 console.print()
 
+        if navigated:
+            continue
+
         # -----------------------------
         # GITHUB VERIFICATION
         # -----------------------------
+        from agents.verifier import verify_phase
         success, message = verify_phase(STATE["repo_url"], phase_number)
 
         console.print()
         if success:
-            # Complete phase timer
-            time_spent = complete_phase_timer(idx)
-            
-            # Record in history before moving forward
             # Extract commit SHA if possible (usually in the message)
             commit_sha = ""
             if "matched commit" in message.lower() and "[" in message:
@@ -508,7 +582,14 @@ def main():
                 except:
                     pass
 
-            record_phase_completion(idx, phase_name, commit_sha, time_spent)
+            # Timer, history and progress are saved together, in one write
+            with transaction():
+                # Complete phase timer
+                time_spent = complete_phase_timer(idx)
+                # Record in history before moving forward
+                record_phase_completion(idx, phase_name, commit_sha, time_spent)
+                # Save progress after each phase completion
+                set_value(["current_phase"], STATE["current_phase"] + 1)
             
             print_success("Phase verified successfully!")
             console.print(f"   {message}", style="dim")
@@ -517,15 +598,12 @@ def main():
                 console.print(f"   [dim]Time spent: {time_spent}[/dim]")
             
             console.print()
-            
-            STATE["current_phase"] += 1
-            # Save progress after each phase completion
-            save_state()
 
             # Suggest Pull Request
             if is_git_repo():
                 console.print()
                 if ask_confirm(f"Phase {phase_number} complete! Would you like to create a Pull Request?", default=True):
+                    from utils.github import create_pull_request
                     current_branch = get_current_branch()
                     pr_title = f"Phase {phase_number}: {phase_name}"
                     pr_body = f"Completed all tasks for Phase {phase_number}.\n\nTasks:\n"
@@ -556,9 +634,14 @@ def main():
     console.print()
     
     # Mark as completed and save final state
-    STATE["status"] = "completed"
-    save_state()
+    set_value(["status"], "completed")
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["archive"]:
+        from cli.archive import main as archive_main
+        sys.exit(archive_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["analytics"]:
+        from cli.analytics import main as analytics_main
+        sys.exit(analytics_main(sys.argv[2:]))
     main()
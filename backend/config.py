@@ -7,5 +7,66 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "llama3-8b-8192")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
-if not GROQ_API_KEY:
-    raise RuntimeError("GROQ_API_KEY missing")
+
+def require_groq_api_key():
+    """
+    Return the Groq API key, raising if it is missing.
+    Checked when the first LLM client is built, not at import, so commands
+    that never call the LLM work without it.
+    """
+    if not GROQ_API_KEY:
+        raise RuntimeError("GROQ_API_KEY missing")
+    return GROQ_API_KEY
+
+# Connection pool size of the shared async Groq client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+
+# LLM response cache (see agents/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# "structured": one JSON call for the whole plan, "expand": planner + one expander call per phase
+PLAN_MODE = os.getenv("PLAN_MODE", "structured")
+
+# Outbound LLM scheduler (see agents/rate_limiter.py), defaults match Groq's free tier
+LLM_RPM = int(os.getenv("LLM_RPM", "30"))
+LLM_TPM = int(os.getenv("LLM_TPM", "6000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+# GitHub API access (see utils/github_client.py)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_CONNECT_TIMEOUT = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "5"))
+GITHUB_READ_TIMEOUT = float(os.getenv("GITHUB_READ_TIMEOUT", "20"))
+GITHUB_CACHE_ENABLED = os.getenv("GITHUB_CACHE_ENABLED", "1") != "0"
+GITHUB_CACHE_MAX_BYTES = int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Repository analysis (see agents/repo_ingest.py)
+# "archive": download the tarball once and index every text file, "api": per-file contents API
+REPO_ANALYSIS_MODE = os.getenv("REPO_ANALYSIS_MODE", "archive")
+# Optional archive URL template, e.g. http://localhost:8000/{owner}/{repo}.tar.gz
+REPO_ARCHIVE_URL = os.getenv("REPO_ARCHIVE_URL", "")
+REPO_ARCHIVE_MAX_BYTES = int(os.getenv("REPO_ARCHIVE_MAX_BYTES", str(100 * 1024 * 1024)))
+REPO_INGEST_MAX_FILE_BYTES = int(os.getenv("REPO_INGEST_MAX_FILE_BYTES", str(256 * 1024)))
+REPO_INGEST_MAX_TEXT_BYTES = int(os.getenv("REPO_INGEST_MAX_TEXT_BYTES", str(16 * 1024 * 1024)))
+# Persistent per-repo analysis store (see state/analysis_store.py)
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "1") != "0"
+# Above this many changed blobs a fresh archive download is cheaper than per-blob fetches
+REPO_INCREMENTAL_MAX_BLOBS = int(os.getenv("REPO_INCREMENTAL_MAX_BLOBS", "100"))
+
+# Session storage: "json" (session.json + journal, see state/store.py) or "sqlite" (state/session_db.py)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "json")
+
+# Session state journal (see state/store.py)
+# Compact the journal into a fresh session.json snapshot after this many records / bytes
+STATE_JOURNAL_MAX_RECORDS = int(os.getenv("STATE_JOURNAL_MAX_RECORDS", "200"))
+STATE_JOURNAL_MAX_BYTES = int(os.getenv("STATE_JOURNAL_MAX_BYTES", str(256 * 1024)))
+# fsync every journal record; off trades the last few records on power loss for speed
+STATE_JOURNAL_FSYNC = os.getenv("STATE_JOURNAL_FSYNC", "1") != "0"
+# Seconds to wait and coalesce state changes made outside transactions into one write; 0 writes at once
+STATE_FLUSH_DEBOUNCE = float(os.getenv("STATE_FLUSH_DEBOUNCE", "0"))
+
+# Archived sessions (see state/archive.py): start a new compressed segment file past this size
+ARCHIVE_SEGMENT_MAX_BYTES = int(os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024)))
@@ -0,0 +1,155 @@
+"""
+Persistent per-repository analysis store.
+
+Keeps the last summary of every analyzed repository together with the
+tree SHA it was built from, so asking about the same repo again costs one
+conditional request instead of a full analysis. Per-blob rows (path, git
+blob sha, stats and a text excerpt) let a changed repository be refreshed
+by fetching only the blobs that were added or modified.
+
+Stored in .oracle_data/analysis.sqlite3.
+"""
+
+import sqlite3
+import threading
+import time
+
+from config import ANALYSIS_CACHE_ENABLED
+from state.store import STORAGE_DIR
+from state.sqlite_util import connect
+
+STORE_FILE = STORAGE_DIR / "analysis.sqlite3"
+
+
+class AnalysisStore:
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+
+    def _db(self):
+        if self._conn is not None or self._disabled:
+            return self._conn
+
+        try:
+            conn = connect(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " owner TEXT NOT NULL,"
+                " repo TEXT NOT NULL,"
+                " tree_sha TEXT NOT NULL,"
+                " mode TEXT NOT NULL,"
+                " summary TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (owner, repo))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " owner TEXT NOT NULL,"
+                " repo TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " sha TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " type TEXT,"
+                " lines INTEGER NOT NULL,"
+                " text TEXT,"
+                " PRIMARY KEY (owner, repo, path))"
+            )
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️  Warning: Repository analysis store disabled: {e}")
+            self._disabled = True
+
+        return self._conn
+
+    def get_analysis(self, owner, repo):
+        """
+        Returns:
+            dict or None: {"tree_sha", "mode", "summary", "updated_at"}
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT tree_sha, mode, summary, updated_at FROM analyses WHERE owner = ? AND repo = ?",
+                    (owner.lower(), repo.lower())
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+
+        if row is None:
+            return None
+        tree_sha, mode, summary, updated_at = row
+        return {"tree_sha": tree_sha, "mode": mode, "summary": summary, "updated_at": updated_at}
+
+    def get_blobs(self, owner, repo):
+        """
+        Returns:
+            dict: {path: {"sha", "size", "type", "lines", "text"}}
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return {}
+            try:
+                rows = conn.execute(
+                    "SELECT path, sha, size, type, lines, text FROM blobs WHERE owner = ? AND repo = ?",
+                    (owner.lower(), repo.lower())
+                ).fetchall()
+            except sqlite3.Error:
+                return {}
+
+        return {
+            path: {"sha": sha, "size": size, "type": kind, "lines": lines, "text": text}
+            for path, sha, size, kind, lines, text in rows
+        }
+
+    def save_analysis(self, owner, repo, tree_sha, mode, summary, blobs=None, removed=None, replace=False):
+        """
+        Store a summary and update the blob rows in one transaction.
+
+        Args:
+            blobs: {path: row} to insert or update
+            removed: Paths whose rows should be dropped
+            replace: Drop every existing blob row of the repo first (full re-ingest)
+        """
+        key = (owner.lower(), repo.lower())
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO analyses (owner, repo, tree_sha, mode, summary, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        key + (tree_sha, mode, summary, time.time())
+                    )
+                    if replace:
+                        conn.execute("DELETE FROM blobs WHERE owner = ? AND repo = ?", key)
+                    if removed:
+                        conn.executemany(
+                            "DELETE FROM blobs WHERE owner = ? AND repo = ? AND path = ?",
+                            [key + (path,) for path in removed]
+                        )
+                    if blobs:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO blobs (owner, repo, path, sha, size, type, lines, text)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            [key + (path, row["sha"], row["size"], row["type"], row["lines"], row["text"])
+                             for path, row in blobs.items()]
+                        )
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to save repository analysis: {e}")
+
+
+_store = AnalysisStore() if ANALYSIS_CACHE_ENABLED else None
+
+
+def get_analysis_store():
+    """The process-wide store, or None when ANALYSIS_CACHE_ENABLED=0."""
+    return _store
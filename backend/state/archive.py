@@ -0,0 +1,488 @@
+"""
+Compressed, indexed archive of finished sessions.
+
+archive_state() used to leave one pretty-printed JSON file per session in
+.oracle_data/archive/, so listing or searching them meant opening every
+file. Sessions are now appended, as compact JSON, to gzip segment files:
+
+    .oracle_data/archive/sessions-00001.jsonl.gz
+    .oracle_data/archive/sessions-00002.jsonl.gz   (after ARCHIVE_SEGMENT_MAX_BYTES)
+
+Each session is its own gzip member ({"archived_at", "session"} as one
+line of JSON), so one can be read by seeking to its offset and
+decompressing just those bytes, and `zcat` over a segment prints one
+session per line. Segments are only ever appended to; every append is a
+single O_APPEND write, so concurrent archivers never interleave.
+
+A small SQLite index (archive/index.sqlite3) keeps one row per session
+(project, status, phase counts, dates and where its bytes are) and one
+numeric row per phase completion (duration, task counts). Listing,
+searching, statistics and analytics read only the index; rebuild_index() recreates
+it from the segments if it is lost. Old per-session JSON files are moved
+into the segments the first time the archive is used.
+"""
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+from config import ARCHIVE_SEGMENT_MAX_BYTES
+from state.store import ARCHIVE_DIR
+from state.fsutil import fsync_file
+from state.sqlite_util import connect
+
+INDEX_FILE = ARCHIVE_DIR / "index.sqlite3"
+SEGMENT_PATTERN = re.compile(r"^sessions-(\d{5})\.jsonl\.gz$")
+
+# Columns returned by list_sessions()
+INDEX_COLUMNS = ["id", "project", "tech", "status", "phases", "completed_phases",
+                 "started_at", "last_activity", "archived_at"]
+
+# Old JSON archives moved per write
+LEGACY_BATCH = 500
+
+INSERT_SQL = (
+    "INSERT INTO sessions (project, tech, status, phases, completed_phases, started_at,"
+    " last_activity, archived_at, segment, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_PHASES_SQL = (
+    "INSERT INTO phase_stats (session_id, phase, duration_seconds, tasks_completed, total_tasks, completed_at)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def _segment_name(number):
+    return f"sessions-{number:05d}.jsonl.gz"
+
+
+def _dates(session):
+    """(started_at, last_activity) ISO strings from the session's timers and history."""
+    timers = (session.get("phase_time_tracking") or {}).values()
+    started = [t["started_at"] for t in timers if isinstance(t, dict) and t.get("started_at")]
+    activity = [t["completed_at"] for t in timers if isinstance(t, dict) and t.get("completed_at")]
+    activity += [h.get("completed_at") or h.get("timestamp") for h in session.get("phase_history") or []]
+    activity = [a for a in activity if a] + started
+    return (min(started) if started else None), (max(activity) if activity else None)
+
+
+def _index_row(session, archived_at):
+    started_at, last_activity = _dates(session)
+    completed = sum(1 for h in session.get("phase_history") or [] if "action" not in h)
+    return (session.get("project") or "", session.get("tech") or "", session.get("status") or "",
+            len(session.get("phases") or []), completed, started_at, last_activity, archived_at)
+
+
+def _parse_time_spent(text):
+    """Seconds from a "1h 23m" / "45m" string (entries from before duration_seconds)."""
+    match = re.match(r"^\s*(?:(\d+)h)?\s*(?:(\d+)m)?\s*$", text or "")
+    if not match or not any(match.groups()):
+        return None
+    return int(match.group(1) or 0) * 3600 + int(match.group(2) or 0) * 60
+
+
+def _epoch(value):
+    try:
+        return datetime.fromisoformat(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def phase_rows(session):
+    """
+    One numeric row per phase completion in the session's history.
+
+    Returns:
+        list: (phase, duration_seconds, tasks_completed, total_tasks, completed_at epoch);
+        unknown durations and dates are None
+    """
+    timers = session.get("phase_time_tracking") or {}
+    rows = []
+    for entry in session.get("phase_history") or []:
+        if "action" in entry or not isinstance(entry.get("phase"), int):
+            continue
+        duration = entry.get("duration_seconds")
+        if duration is None:
+            timer = timers.get(str(entry["phase"])) or {}
+            started, completed = _epoch(timer.get("started_at")), _epoch(timer.get("completed_at"))
+            duration = completed - started if started is not None and completed is not None \
+                else _parse_time_spent(entry.get("time_spent"))
+        rows.append((entry["phase"], duration, entry.get("tasks_completed") or 0,
+                     entry.get("total_tasks") or 0, _epoch(entry.get("completed_at"))))
+    return rows
+
+
+def _encode(session, archived_at):
+    """One gzip member holding {"archived_at", "session"} as a line of compact JSON."""
+    record = {"archived_at": archived_at, "session": session}
+    text = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+    return gzip.compress(text.encode("utf-8"), mtime=0)
+
+
+def _insert(conn, session, archived_at, location):
+    """
+    Index one archived session and its phase completions.
+
+    Args:
+        location: (segment, offset, length) of its gzip member
+
+    Returns:
+        int: The archive id
+    """
+    archive_id = conn.execute(INSERT_SQL, _index_row(session, archived_at) + tuple(location)).lastrowid
+    conn.executemany(INSERT_PHASES_SQL, [(archive_id,) + row for row in phase_rows(session)])
+    return archive_id
+
+
+def _members(data):
+    """
+    Split a segment into its gzip members.
+
+    Yields:
+        tuple: (offset, length, decompressed bytes); stops at a torn tail
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=31)  # gzip framing
+        try:
+            text = decompressor.decompress(view[offset:])
+        except zlib.error:
+            return
+        if not decompressor.eof:
+            return
+        length = len(data) - offset - len(decompressor.unused_data)
+        yield offset, length, text
+        offset += length
+
+
+class SessionArchive:
+    def __init__(self, directory=ARCHIVE_DIR, segment_max_bytes=ARCHIVE_SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+        self._migrated = False
+
+    def _db(self):
+        if self._conn is not None or self._disabled:
+            return self._conn
+
+        try:
+            conn = connect(self.directory / INDEX_FILE.name)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id INTEGER PRIMARY KEY,"
+                " project TEXT NOT NULL,"
+                " tech TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " phases INTEGER NOT NULL,"
+                " completed_phases INTEGER NOT NULL,"
+                " started_at TEXT,"
+                " last_activity TEXT,"
+                " archived_at TEXT NOT NULL,"
+                " segment INTEGER NOT NULL,"
+                " offset INTEGER NOT NULL,"
+                " length INTEGER NOT NULL,"
+                " UNIQUE (segment, offset))"
+            )
+            # Numbers only, so analytics never touch the segments
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS phase_stats ("
+                " session_id INTEGER NOT NULL,"
+                " phase INTEGER NOT NULL,"
+                " duration_seconds REAL,"
+                " tasks_completed INTEGER NOT NULL,"
+                " total_tasks INTEGER NOT NULL,"
+                " completed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_project ON sessions (project COLLATE NOCASE)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_archived ON sessions (archived_at)")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️  Warning: Session archive index disabled: {e}")
+            self._disabled = True
+
+        return self._conn
+
+    def available(self):
+        with self._lock:
+            return self._db() is not None
+
+    def exists(self):
+        """Whether the index is on disk; unlike every other method, creates nothing."""
+        return (self.directory / INDEX_FILE.name).exists()
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+
+    def _segments(self):
+        """Segment numbers on disk, oldest first."""
+        if not self.directory.exists():
+            return []
+        return sorted(int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(self.directory)) if m)
+
+    def _append(self, data):
+        """
+        Append one gzip member to the current segment, starting a new one
+        when it is full.
+
+        Returns:
+            tuple: (segment number, offset)
+        """
+        segments = self._segments()
+        number = segments[-1] if segments else 1
+        path = self.directory / _segment_name(number)
+        if path.exists() and path.stat().st_size and path.stat().st_size + len(data) > self.segment_max_bytes:
+            number += 1
+            path = self.directory / _segment_name(number)
+
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "ab", buffering=0) as f:
+            f.write(data)
+            # O_APPEND: the write landed at the end, wherever that was
+            end = f.seek(0, os.SEEK_CUR)
+            fsync_file(f)
+        return number, end - len(data)
+
+    def add(self, session, archived_at=None):
+        """
+        Archive a session.
+
+        Returns:
+            int: Its archive id, or None if the archive can't be written
+        """
+        archived_at = archived_at or datetime.now().isoformat(timespec="seconds")
+        data = _encode(session, archived_at)
+
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            self._migrate_legacy(conn)
+            try:
+                segment, offset = self._append(data)
+                with conn:
+                    return _insert(conn, session, archived_at, (segment, offset, len(data)))
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Warning: Failed to archive session: {e}")
+                return None
+
+    def _migrate_legacy(self, conn):
+        """Move old one-file-per-session archives (YYYYmmdd_HHMMSS_project.json) into the segments."""
+        if self._migrated:
+            return
+        self._migrated = True
+
+        legacy = sorted(self.directory.glob("*.json"))
+        moved = 0
+        for start in range(0, len(legacy), LEGACY_BATCH):
+            batch = []
+            for path in legacy[start:start + LEGACY_BATCH]:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        session = json.load(f)
+                    match = re.match(r"^(\d{8}_\d{6})_", path.name)
+                    archived = (datetime.strptime(match.group(1), "%Y%m%d_%H%M%S") if match
+                                else datetime.fromtimestamp(path.stat().st_mtime))
+                except (OSError, ValueError) as e:
+                    print(f"⚠️  Warning: Could not move {path.name} into the archive: {e}")
+                    continue
+                archived_at = archived.isoformat(timespec="seconds")
+                batch.append((path, session, archived_at, _encode(session, archived_at)))
+            if not batch:
+                continue
+
+            # One write and one transaction per batch
+            try:
+                segment, offset = self._append(b"".join(data for _, _, _, data in batch))
+                with conn:
+                    for _, session, archived_at, data in batch:
+                        _insert(conn, session, archived_at, (segment, offset, len(data)))
+                        offset += len(data)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Warning: Could not move old archives into the archive: {e}")
+                break
+            for path, _, _, _ in batch:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            moved += len(batch)
+        if moved:
+            print(f"✅ Moved {moved:,} archived sessions into {self.directory}")
+
+    # -----------------------------
+    # Queries (index only)
+    # -----------------------------
+
+    def list_sessions(self, project=None, status=None, since=None, limit=50):
+        """
+        Archived sessions, newest first, without reading any segment.
+
+        Args:
+            project: Substring of the project name (case-insensitive)
+            status: Exact status ("completed", "in_progress"...)
+            since: Only sessions archived at or after this ISO date
+            limit: Maximum rows, None for all
+
+        Returns:
+            list: dicts with INDEX_COLUMNS
+        """
+        where, params = [], []
+        if project:
+            where.append("project LIKE ? COLLATE NOCASE")
+            params.append(f"%{project}%")
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if since:
+            where.append("archived_at >= ?")
+            params.append(since)
+        sql = f"SELECT {', '.join(INDEX_COLUMNS)} FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY archived_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return []
+            self._migrate_legacy(conn)
+            try:
+                return [dict(zip(INDEX_COLUMNS, row)) for row in conn.execute(sql, params)]
+            except sqlite3.Error:
+                return []
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"sessions", "phases", "completed_phases", "bytes", "by_status": {status: count}}
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return {}
+            self._migrate_legacy(conn)
+            try:
+                sessions, phases, completed, size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(phases), 0), COALESCE(SUM(completed_phases), 0),"
+                    " COALESCE(SUM(length), 0) FROM sessions"
+                ).fetchone()
+                by_status = dict(conn.execute("SELECT status, COUNT(*) FROM sessions GROUP BY status"))
+            except sqlite3.Error:
+                return {}
+        return {"sessions": sessions, "phases": phases, "completed_phases": completed,
+                "bytes": size, "by_status": by_status}
+
+    def phase_stats(self):
+        """
+        Every archived phase completion, from the index only.
+
+        Returns:
+            list: (archive id, phase, duration_seconds, tasks_completed, total_tasks, completed_at epoch)
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return []
+            self._migrate_legacy(conn)
+            try:
+                return conn.execute(
+                    "SELECT session_id, phase, duration_seconds, tasks_completed, total_tasks, completed_at"
+                    " FROM phase_stats"
+                ).fetchall()
+            except sqlite3.Error:
+                return []
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+
+    def get(self, archive_id):
+        """
+        The archived session, reading only its own bytes.
+
+        Returns:
+            dict or None: The session, or None if the id is unknown or unreadable
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT segment, offset, length FROM sessions WHERE id = ?", (archive_id,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if row is None:
+            return None
+
+        segment, offset, length = row
+        try:
+            with open(self.directory / _segment_name(segment), "rb") as f:
+                f.seek(offset)
+                return json.loads(gzip.decompress(f.read(length)))["session"]
+        except (OSError, EOFError, ValueError, zlib.error) as e:
+            print(f"⚠️  Warning: Archived session {archive_id} is unreadable: {e}")
+            return None
+
+    def rebuild_index(self):
+        """
+        Recreate the index by scanning every segment (after the index was lost).
+
+        Returns:
+            int: Number of sessions indexed
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return 0
+            records = []
+            for number in self._segments():
+                path = self.directory / _segment_name(number)
+                try:
+                    data = path.read_bytes()
+                except OSError as e:
+                    print(f"⚠️  Warning: Could not read {path.name}: {e}")
+                    continue
+                for offset, length, text in _members(data):
+                    try:
+                        record = json.loads(text)
+                    except ValueError:
+                        continue
+                    records.append((record, (number, offset, length)))
+            try:
+                with conn:
+                    conn.execute("DELETE FROM sessions")
+                    conn.execute("DELETE FROM phase_stats")
+                    for record, location in records:
+                        _insert(conn, record["session"], record["archived_at"], location)
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to rebuild the archive index: {e}")
+                return 0
+            return len(records)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    """The process-wide session archive."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = SessionArchive()
+        return _archive
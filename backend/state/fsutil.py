@@ -0,0 +1,24 @@
+"""
+Durable file writes shared by the session store, its snapshots and the
+session archive.
+"""
+
+import os
+
+from config import STATE_JOURNAL_FSYNC
+
+
+def fsync_file(f):
+    """Flush f and, unless STATE_JOURNAL_FSYNC is off, fsync it."""
+    f.flush()
+    if STATE_JOURNAL_FSYNC:
+        os.fsync(f.fileno())
+
+
+def write_atomic(path, text):
+    """Write text to path via a temp file + fsync + rename, so path is always complete."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        fsync_file(f)
+    os.replace(tmp, path)
@@ -0,0 +1,430 @@
+"""
+SQLite session backend (STATE_BACKEND=sqlite).
+
+The session is kept in .oracle_data/session.sqlite3 (WAL mode) as rows
+instead of one JSON blob:
+
+- sessions: the scalar fields (project, status, current_phase...) plus a
+  JSON column for anything else (planned_tasks, create_issues)
+- phases: one row per phase index with its name and timer
+- tasks: one row per task, keyed by (phase, position)
+- history: one row per history event, indexed by action
+
+state/store.py applies every set/append/delete operation to STATE first
+and then hands a batch of them to apply_many(), which rewrites only the
+rows they touched, in one transaction: toggling a task is a single-row
+write, a new task or history entry a single INSERT. History queries go
+through the (session_id, action, id) index, so they cost time
+proportional to what they return.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from state.store import STORAGE_DIR
+from state.sqlite_util import connect
+
+DB_FILE = STORAGE_DIR / "session.sqlite3"
+
+# STATE keys stored as columns of the sessions table
+SESSION_COLUMNS = ["project", "tech", "features", "platform", "repo_url", "status", "current_phase"]
+# STATE keys with tables of their own
+TABLE_KEYS = {"phases", "phase_tasks", "phase_time_tracking", "phase_history"}
+# Task fields stored as columns; anything else goes to the extra JSON column
+TASK_COLUMNS = ["task", "completed", "started_at"]
+# history.action of phase completion entries (which have no "action" key)
+COMPLETION = "complete"
+
+
+def _history_row(session_id, entry):
+    action = entry.get("action", COMPLETION)
+    phase = entry.get("phase", entry.get("rolled_back_to", entry.get("to_phase")))
+    at = entry.get("completed_at") or entry.get("timestamp")
+    return session_id, action, phase, at, json.dumps(entry)
+
+
+def _task_row(session_id, phase, position, task):
+    extra = {k: v for k, v in task.items() if k not in TASK_COLUMNS}
+    return (session_id, phase, position, task.get("task", ""), int(bool(task.get("completed"))),
+            task.get("started_at"), json.dumps(extra) if extra else None)
+
+
+class SessionDB:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+        self._session_id = None
+
+    def _db(self):
+        if self._conn is not None or self._disabled:
+            return self._conn
+
+        try:
+            conn = connect(self.path, "foreign_keys=ON")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id INTEGER PRIMARY KEY,"
+                " project TEXT, tech TEXT, features TEXT, platform TEXT, repo_url TEXT,"
+                " status TEXT, current_phase INTEGER NOT NULL DEFAULT 0,"
+                " extra TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS phases ("
+                " session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,"
+                " idx INTEGER NOT NULL,"
+                " name TEXT,"
+                " started_at TEXT,"
+                " completed_at TEXT,"
+                " tracked INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (session_id, idx))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,"
+                " phase INTEGER NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " task TEXT NOT NULL,"
+                " completed INTEGER NOT NULL DEFAULT 0,"
+                " started_at TEXT,"
+                " extra TEXT,"
+                " PRIMARY KEY (session_id, phase, position))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,"
+                " action TEXT NOT NULL,"
+                " phase INTEGER,"
+                " at TEXT,"
+                " data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS history_action ON history (session_id, action, id)")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️  Warning: SQLite session store disabled: {e}")
+            self._disabled = True
+
+        return self._conn
+
+    def _current(self, conn):
+        """Id of the current session (the newest row), or None."""
+        if self._session_id is None:
+            row = conn.execute("SELECT id FROM sessions ORDER BY id DESC LIMIT 1").fetchone()
+            self._session_id = row[0] if row else None
+        return self._session_id
+
+    @property
+    def available(self):
+        with self._lock:
+            return self._db() is not None
+
+    # -----------------------------
+    # Whole session
+    # -----------------------------
+
+    def load(self):
+        """
+        Returns:
+            dict or None: The current session in STATE layout
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            try:
+                session_id = self._current(conn)
+                if session_id is None:
+                    return None
+                row = conn.execute(
+                    f"SELECT {', '.join(SESSION_COLUMNS)}, extra FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+                phases = conn.execute(
+                    "SELECT idx, name, started_at, completed_at, tracked FROM phases"
+                    " WHERE session_id = ? ORDER BY idx", (session_id,)
+                ).fetchall()
+                tasks = conn.execute(
+                    "SELECT phase, task, completed, started_at, extra FROM tasks"
+                    " WHERE session_id = ? ORDER BY phase, position", (session_id,)
+                ).fetchall()
+                history = conn.execute(
+                    "SELECT data FROM history WHERE session_id = ? ORDER BY id", (session_id,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to load session: {e}")
+                return None
+
+        state = dict(zip(SESSION_COLUMNS, row[:-1]))
+        state.update(json.loads(row[-1]) if row[-1] else {})
+        state["phases"] = [name for _, name, _, _, _ in phases if name is not None]
+        state["phase_time_tracking"] = {
+            str(idx): {"started_at": started_at, "completed_at": completed_at}
+            for idx, _, started_at, completed_at, tracked in phases if tracked
+        }
+        state["phase_tasks"] = {}
+        for phase, task, completed, started_at, extra in tasks:
+            item = {"task": task, "completed": bool(completed), "started_at": started_at}
+            if extra:
+                item.update(json.loads(extra))
+            state["phase_tasks"].setdefault(str(phase), []).append(item)
+        state["phase_history"] = [json.loads(data) for data, in history]
+        return state
+
+    def save(self, state):
+        """Replace the current session with state (a full snapshot)."""
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    session_id = self._current(conn)
+                    if session_id is None:
+                        session_id = conn.execute(
+                            "INSERT INTO sessions (updated_at) VALUES (?)", (time.time(),)
+                        ).lastrowid
+                        self._session_id = session_id
+                    self._write_session(conn, session_id, state)
+                    for table in ("phases", "tasks", "history"):
+                        conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+                    self._write_phases(conn, session_id, state)
+                    self._write_tasks(conn, session_id, state.get("phase_tasks", {}))
+                    conn.executemany(
+                        "INSERT INTO history (session_id, action, phase, at, data) VALUES (?, ?, ?, ?, ?)",
+                        [_history_row(session_id, entry) for entry in state.get("phase_history", [])]
+                    )
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to save state: {e}")
+
+    def clear(self):
+        """Delete the current session and everything that belongs to it."""
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    session_id = self._current(conn)
+                    if session_id is not None:
+                        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._session_id = None
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to clear state: {e}")
+
+    # -----------------------------
+    # Row writers
+    # -----------------------------
+
+    def _write_session(self, conn, session_id, state):
+        extra = {k: v for k, v in state.items() if k not in SESSION_COLUMNS and k not in TABLE_KEYS}
+        conn.execute(
+            f"UPDATE sessions SET {', '.join(f'{c} = ?' for c in SESSION_COLUMNS)}, extra = ?, updated_at = ?"
+            " WHERE id = ?",
+            [state.get(c) for c in SESSION_COLUMNS] + [json.dumps(extra), time.time(), session_id]
+        )
+
+    def _write_phases(self, conn, session_id, state):
+        """Rewrite phase names and timers (a handful of rows)."""
+        names = state.get("phases", [])
+        timers = {int(k): v for k, v in state.get("phase_time_tracking", {}).items()}
+        conn.execute("DELETE FROM phases WHERE session_id = ?", (session_id,))
+        conn.executemany(
+            "INSERT INTO phases (session_id, idx, name, started_at, completed_at, tracked) VALUES (?, ?, ?, ?, ?, ?)",
+            [(session_id, idx, names[idx] if idx < len(names) else None,
+              timers.get(idx, {}).get("started_at"), timers.get(idx, {}).get("completed_at"), int(idx in timers))
+             for idx in sorted(set(range(len(names))) | set(timers))]
+        )
+
+    def _write_timer(self, conn, session_id, state, phase_key):
+        timer = state.get("phase_time_tracking", {}).get(phase_key)
+        conn.execute(
+            "INSERT INTO phases (session_id, idx, started_at, completed_at, tracked) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (session_id, idx) DO UPDATE SET"
+            " started_at = excluded.started_at, completed_at = excluded.completed_at, tracked = excluded.tracked",
+            (session_id, int(phase_key), (timer or {}).get("started_at"), (timer or {}).get("completed_at"),
+             int(timer is not None))
+        )
+
+    def _write_tasks(self, conn, session_id, phase_tasks, phase_key=None):
+        """Insert the task rows of every phase, or of phase_key only."""
+        keys = [phase_key] if phase_key is not None else list(phase_tasks)
+        conn.executemany(
+            "INSERT INTO tasks (session_id, phase, position, task, completed, started_at, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [_task_row(session_id, int(key), position, task)
+             for key in keys for position, task in enumerate(phase_tasks.get(key, []))]
+        )
+
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+
+    def apply_many(self, ops, state):
+        """
+        Persist operations that have already been applied to state, in one
+        transaction, writing only the rows they touched. Each touched row
+        is written once, from its final value in state.
+
+        Args:
+            ops: [(op, path)] in the order they were applied
+        """
+        session_row = False
+        phases = False              # names changed: rewrite the phase rows
+        timers = set()              # phase keys whose timer changed
+        task_phases = set()         # phase keys whose task list was replaced or shrank
+        task_appends = {}           # phase key -> tasks appended
+        task_rows = set()           # (phase key, position) of edited tasks
+        history_appends = 0
+        full = False
+
+        for op, path in ops:
+            key = path[0]
+            if key == "phase_tasks":
+                if len(path) == 1:
+                    task_phases.update(state.get("phase_tasks", {}))
+                    task_phases.add(None)  # phases that vanished
+                elif len(path) >= 4 or (len(path) == 3 and op == "set"):
+                    task_rows.add((path[1], path[2]))
+                elif len(path) == 2 and op == "append":
+                    task_appends[path[1]] = task_appends.get(path[1], 0) + 1
+                else:
+                    task_phases.add(path[1])
+            elif key == "phase_time_tracking":
+                if len(path) >= 2:
+                    timers.add(path[1])
+                else:
+                    phases = True
+            elif key == "phases":
+                phases = True
+            elif key == "phase_history":
+                if op == "append" and len(path) == 1:
+                    history_appends += 1
+                else:
+                    full = True
+            else:
+                session_row = True
+
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    session_id = self._current(conn)
+                    if session_id is None or full:
+                        full = True  # first write of a session, or history rewritten
+                    else:
+                        if session_row:
+                            self._write_session(conn, session_id, state)
+                        if phases:
+                            self._write_phases(conn, session_id, state)
+                        else:
+                            for phase_key in timers:
+                                self._write_timer(conn, session_id, state, phase_key)
+                        self._write_task_changes(conn, session_id, state, task_phases, task_appends, task_rows)
+                        if history_appends:
+                            conn.executemany(
+                                "INSERT INTO history (session_id, action, phase, at, data) VALUES (?, ?, ?, ?, ?)",
+                                [_history_row(session_id, entry)
+                                 for entry in state["phase_history"][-history_appends:]]
+                            )
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to save state change: {e}")
+                return
+
+        if full:
+            self.save(state)
+
+    def _write_task_changes(self, conn, session_id, state, task_phases, task_appends, task_rows):
+        phase_tasks = state.get("phase_tasks", {})
+        if None in task_phases:
+            conn.execute("DELETE FROM tasks WHERE session_id = ?", (session_id,))
+            self._write_tasks(conn, session_id, phase_tasks)
+            return
+
+        # A phase's list was replaced or lost an item: positions shift, rewrite the phase
+        for phase_key in task_phases:
+            conn.execute("DELETE FROM tasks WHERE session_id = ? AND phase = ?", (session_id, int(phase_key)))
+            self._write_tasks(conn, session_id, phase_tasks, phase_key)
+
+        # New tasks at the end of a phase: one INSERT each
+        for phase_key, count in task_appends.items():
+            if phase_key in task_phases:
+                continue
+            tasks = phase_tasks.get(phase_key, [])
+            conn.executemany(
+                "INSERT OR REPLACE INTO tasks (session_id, phase, position, task, completed, started_at, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [_task_row(session_id, int(phase_key), position, tasks[position])
+                 for position in range(max(len(tasks) - count, 0), len(tasks))]
+            )
+
+        # One task edited: a single-row write
+        for phase_key, position in task_rows:
+            tasks = phase_tasks.get(phase_key, [])
+            if phase_key in task_phases or position >= len(tasks):
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks (session_id, phase, position, task, completed, started_at, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _task_row(session_id, int(phase_key), position, tasks[position])
+            )
+
+    # -----------------------------
+    # History queries
+    # -----------------------------
+
+    def history(self, action=None):
+        """
+        History entries, oldest first, optionally only those of one action
+        (COMPLETION for phase completions).
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return []
+            try:
+                session_id = self._current(conn)
+                if action is None:
+                    rows = conn.execute(
+                        "SELECT data FROM history WHERE session_id = ? ORDER BY id", (session_id,)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        "SELECT data FROM history WHERE session_id = ? AND action = ? ORDER BY id",
+                        (session_id, action)
+                    ).fetchall()
+            except sqlite3.Error:
+                return []
+        return [json.loads(data) for data, in rows]
+
+    def count_history(self, action):
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return 0
+            try:
+                return conn.execute(
+                    "SELECT COUNT(*) FROM history WHERE session_id = ? AND action = ?",
+                    (self._current(conn), action)
+                ).fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_session_db():
+    """The process-wide SQLite session store."""
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = SessionDB()
+        return _db
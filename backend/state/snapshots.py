@@ -0,0 +1,189 @@
+"""
+Copy-on-write snapshots of the session at phase boundaries.
+
+Rolling back used to delete the later phases' tasks and timers for good.
+Instead, every phase completion now records a snapshot of the session,
+and rollback, undo, redo and `checkout <phase>` restore one.
+
+A snapshot is a small manifest of content hashes: one for the phase
+list, one for the planned tasks and one per phase for its tasks and its
+timer. Each part is stored once, as an immutable object under
+.oracle_data/snapshots/ named after its hash, so consecutive snapshots
+share every part that didn't change and taking one writes only the new
+parts. Restoring compares hashes and only touches the parts that differ,
+in one transaction; phases whose tasks are restored never go back to the
+task expander.
+
+Refs live in the session itself:
+
+    STATE["snapshots"] = {"phases": {phase_index: manifest}, "redo": [manifest, ...]}
+
+The phase history is never restored: it records what happened.
+"""
+
+import copy
+import hashlib
+import json
+import shutil
+import threading
+
+from state.store import STATE, STORAGE_DIR, set_value, append_value, delete_value, transaction
+from state.fsutil import write_atomic
+
+OBJECTS_DIR = STORAGE_DIR / "snapshots"
+
+# Manifests kept on the redo stack
+MAX_REDO = 20
+
+# Session parts stored as one object each, and per phase
+WHOLE_PARTS = ("phases", "planned_tasks")
+PHASE_PARTS = ("phase_tasks", "phase_time_tracking")
+# Small values kept in the manifest itself
+INLINE_KEYS = ("current_phase", "status")
+
+_objects = {}  # hash -> decoded object, objects never change
+_objects_lock = threading.Lock()
+
+
+class SnapshotError(Exception):
+    """A snapshot object is missing or unreadable."""
+
+
+# -----------------------------
+# Object storage
+# -----------------------------
+
+def _hash(obj):
+    text = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest(), text
+
+
+def _put(obj):
+    """Store obj (if it isn't already) and return its hash."""
+    sha, text = _hash(obj)
+    with _objects_lock:
+        if sha in _objects:
+            return sha
+    path = OBJECTS_DIR / f"{sha}.json"
+    if not path.exists():
+        OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, text)
+    with _objects_lock:
+        _objects[sha] = json.loads(text)
+    return sha
+
+
+def _get(sha):
+    """A copy of the object stored under sha."""
+    with _objects_lock:
+        obj = _objects.get(sha)
+    if obj is None:
+        try:
+            with open(OBJECTS_DIR / f"{sha}.json", "r", encoding="utf-8") as f:
+                obj = json.load(f)
+        except (IOError, OSError, json.JSONDecodeError) as e:
+            raise SnapshotError(f"Snapshot object {sha[:12]} is unreadable: {e}")
+        with _objects_lock:
+            _objects[sha] = obj
+    return copy.deepcopy(obj)
+
+
+def clear_objects():
+    """Delete every stored object (the session they belong to is gone)."""
+    with _objects_lock:
+        _objects.clear()
+    if OBJECTS_DIR.exists():
+        shutil.rmtree(OBJECTS_DIR, ignore_errors=True)
+
+
+# -----------------------------
+# Snapshots
+# -----------------------------
+
+def _manifest(state):
+    """The manifest describing state, with the objects it needs stored."""
+    manifest = {key: state.get(key) for key in INLINE_KEYS}
+    for key in WHOLE_PARTS:
+        manifest[key] = _put(state.get(key) or ({} if key == "planned_tasks" else []))
+    for key in PHASE_PARTS:
+        manifest[key] = {phase_key: _put(value) for phase_key, value in (state.get(key) or {}).items()}
+    return manifest
+
+
+def take_snapshot():
+    """
+    Snapshot the current session.
+
+    Returns:
+        str: Hash of the snapshot's manifest
+    """
+    return _put(_manifest(STATE))
+
+
+def restore(sha):
+    """
+    Make the session match a snapshot, writing only the parts that differ
+    (as one transaction).
+
+    Raises:
+        SnapshotError: If the snapshot can't be read; the session is left untouched
+    """
+    target = _get(sha)
+    current = _manifest(STATE)
+
+    # Read everything before changing anything
+    changes = []
+    for key in WHOLE_PARTS:
+        if target[key] != current[key]:
+            changes.append(([key], _get(target[key])))
+    for key in PHASE_PARTS:
+        for phase_key, part in target[key].items():
+            if current[key].get(phase_key) != part:
+                changes.append(([key, phase_key], _get(part)))
+
+    with transaction():
+        for path, value in changes:
+            set_value(path, value)
+        for key in PHASE_PARTS:
+            for phase_key in current[key]:
+                if phase_key not in target[key]:
+                    delete_value([key, phase_key])
+        for key in INLINE_KEYS:
+            if STATE.get(key) != target[key]:
+                set_value([key], target[key])
+
+
+# -----------------------------
+# Refs
+# -----------------------------
+
+def phase_snapshot(phase_index):
+    """Manifest hash recorded when the phase was completed, or None."""
+    return STATE.get("snapshots", {}).get("phases", {}).get(str(phase_index))
+
+
+def record_phase_snapshot(phase_index):
+    """Snapshot the session as the phase completes; new progress clears the redo stack."""
+    set_value(["snapshots", "phases", str(phase_index)], take_snapshot())
+    if STATE["snapshots"].get("redo"):
+        set_value(["snapshots", "redo"], [])
+
+
+def push_redo():
+    """Snapshot the session onto the redo stack before navigating away from it."""
+    append_value(["snapshots", "redo"], take_snapshot())
+    if len(STATE["snapshots"]["redo"]) > MAX_REDO:
+        delete_value(["snapshots", "redo", 0])
+
+
+def pop_redo():
+    """
+    Returns:
+        str: The most recent redo manifest hash (removed from the stack), or None
+    """
+    redo = STATE.get("snapshots", {}).get("redo")
+    if not redo:
+        return None
+    sha = redo[-1]
+    delete_value(["snapshots", "redo", len(redo) - 1])
+    return sha
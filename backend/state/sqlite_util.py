@@ -0,0 +1,52 @@
+"""
+SQLite helpers shared by the on-disk stores and caches.
+
+Every store under .oracle_data/ (session, archive index, analyses, GitHub
+responses, LLM replies) opens its file the same way, and the two caches
+trim themselves back under a byte budget the same way.
+"""
+
+import sqlite3
+
+# Rows deleted per eviction query
+EVICT_BATCH = 64
+
+
+def connect(path, *pragmas):
+    """
+    Open the database at path (creating its directory) in WAL mode, usable
+    from any thread. Each connection is guarded by its owner's lock.
+
+    Args:
+        path: Database file
+        pragmas: Extra PRAGMA statements, e.g. "foreign_keys=ON"
+
+    Raises:
+        sqlite3.Error: If the database can't be opened
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for pragma in pragmas:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def evict_lru(conn, table, total_bytes, max_bytes):
+    """
+    Drop the least recently used rows of a cache table (key, size and
+    last_used columns) until it is back under 90% of its budget. The caller
+    commits.
+
+    Returns:
+        int: Bytes left in the table
+    """
+    target = int(max_bytes * 0.9)
+    while total_bytes > target:
+        rows = conn.execute(f"SELECT key, size FROM {table} ORDER BY last_used LIMIT {EVICT_BATCH}").fetchall()
+        if not rows:
+            return 0
+        conn.executemany(f"DELETE FROM {table} WHERE key = ?", [(k,) for k, _ in rows])
+        total_bytes -= sum(size for _, size in rows)
+    return total_bytes
@@ -1,8 +1,43 @@
+"""
+Session state persistence.
+
+STATE lives in memory and is persisted as a snapshot (session.json) plus
+an append-only journal (session.journal). Mutations go through
+set_value(), append_value() and delete_value(): each one updates STATE
+and appends one small JSON record to the journal, so a keypress costs
+O(change) instead of re-serializing the whole session. Once the journal
+grows past STATE_JOURNAL_MAX_RECORDS / STATE_JOURNAL_MAX_BYTES it is
+compacted: save_state() writes a new snapshot atomically (temp file,
+fsync, rename) and starts an empty journal.
+
+The snapshot carries a generation number and the journal starts with the
+generation it applies to, so a crash between writing a snapshot and
+resetting the journal never replays records twice. load_state() replays
+the journal over the snapshot and stops at the first torn record: the
+last consistent state always survives a crash.
+
+Several changes that belong to one user action are grouped with
+`with transaction():` and written once, as a single journal line (or
+SQLite transaction) so a crash keeps all of them or none. Setting
+STATE_FLUSH_DEBOUNCE additionally coalesces bursts of changes made
+outside transactions into one write.
+
+With STATE_BACKEND=sqlite the same operations are written as row updates
+to .oracle_data/session.sqlite3 instead (state/session_db.py); an existing
+session.json is migrated on the first load_state().
+"""
+
+import atexit
+import copy
 import json
-import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 
+from config import STATE_BACKEND, STATE_JOURNAL_MAX_RECORDS, STATE_JOURNAL_MAX_BYTES, STATE_FLUSH_DEBOUNCE
+from state.fsutil import fsync_file, write_atomic
+
 # STATE dictionary holds all session information
 STATE = {
     "project": "",
@@ -15,91 +50,517 @@ STATE = {
     "status": "setup",  # Possible values: 'setup', 'in_progress', 'completed'
     "phase_tasks": {},  # Format: {phase_index: [{"task": "...", "completed": bool, "started_at": timestamp}]}
     "phase_time_tracking": {},  # Format: {phase_index: {"started_at": timestamp, "completed_at": timestamp}}
-    "phase_history": []  # Format: [{"phase": 0, "completed_at": timestamp, "commit": "sha", "tasks_snapshot": [...]}]
+    "phase_history": [],  # Format: [{"phase": 0, "completed_at": timestamp, "commit": "sha", "tasks_snapshot": [...]}]
+    "planned_tasks": {}  # Format: {phase_index: {"tasks": [...], "commit_msg": "..."}} from structured planning
 }
 
 # Storage configuration
 # Store session data in .oracle_data/ folder in project root
 STORAGE_DIR = Path(".oracle_data")
 STATE_FILE = STORAGE_DIR / "session.json"
+JOURNAL_FILE = STORAGE_DIR / "session.journal"
 ARCHIVE_DIR = STORAGE_DIR / "archive"
 
+# Snapshot key holding the generation; never part of STATE
+GENERATION_KEY = "_journal_generation"
+
+_journal = {
+    "generation": 0,   # generation of the snapshot on disk
+    "ready": False,    # journal on disk belongs to that snapshot, records can be appended
+    "records": 0,
+    "bytes": 0,
+}
+_journal_lock = threading.RLock()
+
+
+# -----------------------------
+# Journal operations
+# -----------------------------
+
+def apply_op(state, op, path, value=None):
+    """
+    Apply one journal operation to a state dict.
+
+    Args:
+        op: "set", "append" or "delete"
+        path: Keys from the top of state down to the target; str keys for
+            dicts (missing ones are created), int indexes for lists
+        value: New value for "set", item for "append"
+    """
+    container = state
+    for key in path[:-1]:
+        if isinstance(container, dict):
+            container = container.setdefault(key, {})
+        else:
+            container = container[key]
+    last = path[-1]
+
+    if op == "set":
+        container[last] = value
+    elif op == "append":
+        target = container.setdefault(last, []) if isinstance(container, dict) else container[last]
+        target.append(value)
+    elif op == "delete":
+        if isinstance(container, dict):
+            container.pop(last, None)
+        else:
+            del container[last]
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+def _inverse(state, op, path):
+    """The operation undoing op at path (computed before op is applied), for transaction rollback."""
+    container = state
+    for depth, key in enumerate(path[:-1]):
+        if isinstance(container, dict) and key not in container:
+            # apply_op creates the missing dicts, removing the outermost undoes it all
+            return ("delete", path[:depth + 1], None)
+        container = container[key]
+    last = path[-1]
+
+    if op == "append":
+        target = container.get(last) if isinstance(container, dict) else container[last]
+        return ("delete", path, None) if target is None else ("delete", path + [len(target)], None)
+    exists = last in container if isinstance(container, dict) else 0 <= last < len(container)
+    if not exists:
+        return ("delete", path, None) if op == "set" else None
+    old = copy.deepcopy(container[last])
+    if op == "delete" and isinstance(container, list):
+        return ("insert", path, old)
+    return ("set", path, old)
+
+
+def _undo(state, op, path, value):
+    if op == "insert":
+        container = state
+        for key in path[:-1]:
+            container = container[key]
+        container.insert(path[-1], value)
+    else:
+        apply_op(state, op, path, value)
+
+
+def _sqlite():
+    """The SQLite session store when STATE_BACKEND=sqlite and it is usable, else None."""
+    if STATE_BACKEND != "sqlite":
+        return None
+    from state.session_db import get_session_db
+    db = get_session_db()
+    return db if db.available else None
+
+
+# Changes applied to STATE but not yet on disk: (op, path, journal record as JSON text)
+_pending = []
+# Inverse operations of the open transaction(s), newest last
+_undo_log = []
+_tx = {"depth": 0, "timer": None, "save": False}
+
+
+def _record(op, path, value=None):
+    with _journal_lock:
+        if _tx["depth"]:
+            inverse = _inverse(STATE, op, path)
+        apply_op(STATE, op, path, value)
+
+        record = {"op": op, "path": path}
+        if op != "delete":
+            record["value"] = value
+        # Encoded now: later in-place changes to the same objects get records
+        # of their own and must not show up in this one
+        _pending.append((op, path, json.dumps(record, separators=(",", ":"))))
+
+        if _tx["depth"]:
+            if inverse is not None:
+                _undo_log.append(inverse)
+        else:
+            _schedule_flush()
+
+
+def _schedule_flush():
+    if STATE_FLUSH_DEBOUNCE <= 0:
+        flush_state()
+        return
+    # Interactive use: coalesce bursts of changes into one write
+    if _tx["timer"] is None:
+        timer = threading.Timer(STATE_FLUSH_DEBOUNCE, flush_state)
+        timer.daemon = True
+        _tx["timer"] = timer
+        timer.start()
+
+
+def flush_state():
+    """
+    Write every pending change to disk in one go (one journal line, or one
+    SQLite transaction). Inside a transaction this waits for it to end.
+    """
+    with _journal_lock:
+        if _tx["depth"]:
+            return
+        if _tx["timer"] is not None:
+            _tx["timer"].cancel()
+            _tx["timer"] = None
+        if not _pending:
+            return
+        batch = _pending[:]
+        del _pending[:]
+
+        db = _sqlite()
+        if db is not None:
+            db.apply_many([(op, path) for op, path, _ in batch], STATE)
+            return
+
+        if not _journal["ready"]:
+            # No journal for the current snapshot yet (fresh session or
+            # foreign files on disk): a snapshot captures these changes
+            save_state()
+            return
+
+        records = [record for _, _, record in batch]
+        # One line per batch, so a torn write drops the whole batch or nothing
+        line = (records[0] if len(records) == 1 else '{"batch":[' + ",".join(records) + "]}") + "\n"
+        try:
+            with open(JOURNAL_FILE, "a", encoding="utf-8") as f:
+                f.write(line)
+                fsync_file(f)
+        except (IOError, OSError) as e:
+            print(f"⚠️  Warning: Failed to journal state change: {e}")
+            # The write may have left part of a line behind, and replay stops
+            # there: keep the batch and write a full snapshot next time instead
+            _journal["ready"] = False
+            _pending[:0] = batch
+            return
+
+        _journal["records"] += len(records)
+        _journal["bytes"] += len(line)
+        if _journal["records"] >= STATE_JOURNAL_MAX_RECORDS or _journal["bytes"] >= STATE_JOURNAL_MAX_BYTES:
+            save_state()
+
+
+@contextmanager
+def transaction():
+    """
+    Group state changes into one write.
+
+    Changes made inside the block are applied to STATE immediately but only
+    flushed when the outermost block exits, as a single journal line or
+    SQLite transaction. If the block raises, STATE is rolled back and
+    nothing is written. Other threads' changes wait for the block to end.
+    save_state() and flush_state() called inside the block take effect when
+    it ends, so uncommitted changes never reach the disk.
+
+        with transaction():
+            set_value(["current_phase"], 2)
+            append_value(["phase_history"], entry)
+    """
+    with _journal_lock:
+        mark = (len(_pending), len(_undo_log))
+        _tx["depth"] += 1
+        try:
+            yield
+        except BaseException:
+            while len(_undo_log) > mark[1]:
+                _undo(STATE, *_undo_log.pop())
+            del _pending[mark[0]:]
+            raise
+        finally:
+            _tx["depth"] -= 1
+            if not _tx["depth"]:
+                del _undo_log[:]
+                if _tx["save"]:
+                    # Requested inside the block: snapshot what was committed
+                    _tx["save"] = False
+                    save_state()
+                else:
+                    _schedule_flush()
+
+
+atexit.register(flush_state)
+
+
+def set_value(path, value):
+    """Set STATE[path...] = value and journal the change."""
+    _record("set", list(path), value)
+
+
+def append_value(path, value):
+    """Append value to the list at STATE[path...] (created if missing) and journal the change."""
+    _record("append", list(path), value)
+
+
+def delete_value(path):
+    """Remove the dict key or list item at STATE[path...] and journal the change."""
+    _record("delete", list(path))
+
+
+def _replay(state, generation):
+    """
+    Apply the journal records written on top of snapshot generation.
+
+    Returns:
+        tuple: (records applied, bytes read, whether every record applied),
+            or None if the journal belongs to another snapshot
+    """
+    try:
+        f = open(JOURNAL_FILE, "r", encoding="utf-8")
+    except (IOError, OSError):
+        return None
+
+    records = size = 0
+    complete = True
+    with f:
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(header, dict) or header.get("generation") != generation:
+            return None
+
+        for line in f:
+            # A record cut short by a crash is never complete, stop there
+            if not line.endswith("\n"):
+                complete = False
+                break
+            try:
+                entry = json.loads(line)
+                batch = entry["batch"] if "batch" in entry else [entry]
+                for record in batch:
+                    apply_op(state, record["op"], record["path"], record.get("value"))
+            except (json.JSONDecodeError, KeyError, IndexError, TypeError, ValueError):
+                print("⚠️  Warning: Skipping the rest of a damaged state journal")
+                complete = False
+                break
+            records += len(batch)
+            size += len(line)
+    return records, size, complete
+
+
+# -----------------------------
+# Snapshots
+# -----------------------------
+
+def _is_valid(state):
+    # Validate that loaded data has required keys
+    return isinstance(state, dict) and "project" in state and "status" in state
+
 
 def load_state():
     """
-    Load session state from .oracle_data/session.json if it exists.
-    
+    Load the saved session: from SQLite, or from .oracle_data/session.json
+    with the journal replayed on top.
+
     Returns:
-        dict: The loaded state, or None if file doesn't exist or is invalid
+        dict: The loaded state, or None if there is none or it is invalid
     """
-    if not STATE_FILE.exists():
+    flush_state()
+    db = _sqlite()
+    if db is None:
+        return _load_json()
+
+    state = db.load()
+    if state is None and STATE_FILE.exists():
+        state = _migrate(db)
+    return state if _is_valid(state) else None
+
+
+def _migrate(db):
+    """Move session.json (and its journal) into the SQLite store."""
+    state = _load_json()
+    if state is None:
         return None
-    
+    db.save(state)
+    try:
+        STATE_FILE.rename(STATE_FILE.with_name(STATE_FILE.name + ".migrated"))
+        if JOURNAL_FILE.exists():
+            JOURNAL_FILE.unlink()
+    except (IOError, OSError) as e:
+        print(f"⚠️  Warning: Failed to retire migrated session.json: {e}")
+    print(f"✅ Session migrated to: {db.path}")
+    return state
+
+
+def _read_json():
+    """
+    Parse session.json and replay its journal, without touching the
+    journal bookkeeping.
+
+    Returns:
+        tuple: (state, generation, _replay() result), state None if there is no valid session
+    """
+    if not STATE_FILE.exists():
+        return None, 0, None
+
     try:
         with open(STATE_FILE, 'r') as f:
             loaded_data = json.load(f)
-            # Validate that loaded data has required keys
-            if "project" in loaded_data and "status" in loaded_data:
-                return loaded_data
-            return None
     except (json.JSONDecodeError, IOError):
         # If file is corrupted or unreadable, return None
+        return None, 0, None
+
+    if not _is_valid(loaded_data):
+        return None, 0, None
+
+    generation = loaded_data.pop(GENERATION_KEY, 0)
+    return loaded_data, generation, _replay(loaded_data, generation)
+
+
+def _load_json():
+    loaded_data, generation, replayed = _read_json()
+    if loaded_data is None:
         return None
 
+    with _journal_lock:
+        _journal["generation"] = generation
+        # Never append behind a torn or damaged record: the next change compacts instead
+        _journal["ready"] = replayed is not None and replayed[2]
+        _journal["records"], _journal["bytes"] = replayed[:2] if replayed else (0, 0)
+    return loaded_data
+
+
+def read_state():
+    """
+    Read the saved session without taking it over: nothing is flushed,
+    migrated or marked ready for appending. For processes that only look
+    at the CLI's session (the API's analytics).
+
+    Returns:
+        dict: The saved state, or None if there is none or it is invalid
+    """
+    if STATE_BACKEND == "sqlite":
+        from state.session_db import DB_FILE
+        if DB_FILE.exists():
+            db = _sqlite()
+            state = db.load() if db is not None else None
+            return state if _is_valid(state) else None
+    return _read_json()[0]
+
 
 def save_state():
     """
-    Save the current STATE to .oracle_data/session.json.
-    Creates the directory if it doesn't exist.
+    Snapshot the current STATE: to SQLite, or to .oracle_data/session.json
+    starting an empty journal (compaction). Creates the directory if it
+    doesn't exist. Inside a transaction the snapshot is taken when it ends.
     """
+    with _journal_lock:
+        if _tx["depth"]:
+            _tx["save"] = True
+            return
+        # The snapshot covers every pending change
+        del _pending[:]
+        if _tx["timer"] is not None:
+            _tx["timer"].cancel()
+            _tx["timer"] = None
+
+    db = _sqlite()
+    if db is not None:
+        db.save(STATE)
+        return
+
     # Create .oracle_data directory if it doesn't exist
     STORAGE_DIR.mkdir(exist_ok=True)
-    
-    try:
-        with open(STATE_FILE, 'w') as f:
-            json.dump(STATE, f, indent=2)
-    except IOError as e:
-        print(f"⚠️  Warning: Failed to save state: {e}")
+
+    with _journal_lock:
+        generation = _journal["generation"] + 1
+        try:
+            write_atomic(STATE_FILE, json.dumps({**STATE, GENERATION_KEY: generation}, indent=2))
+            # The snapshot is in place: records of older generations no longer apply
+            write_atomic(JOURNAL_FILE, json.dumps({"generation": generation}) + "\n")
+        except (IOError, OSError) as e:
+            print(f"⚠️  Warning: Failed to save state: {e}")
+            return
+
+        _journal.update(generation=generation, ready=True, records=0, bytes=0)
 
 
 def clear_state():
     """
-    Delete the session.json file.
+    Delete the saved session (session.json and its journal, or the SQLite
+    rows) and its phase snapshots.
     Used when user wants to start a completely fresh session.
     """
-    if STATE_FILE.exists():
-        try:
-            STATE_FILE.unlink()
-        except IOError as e:
-            print(f"⚠️  Warning: Failed to clear state: {e}")
+    from state.snapshots import clear_objects
+
+    with _journal_lock:
+        del _pending[:]
+    clear_objects()
+    db = _sqlite()
+    if db is not None:
+        db.clear()
+        return
+
+    with _journal_lock:
+        _journal["ready"] = False
+        for path in (STATE_FILE, JOURNAL_FILE):
+            if path.exists():
+                try:
+                    path.unlink()
+                except IOError as e:
+                    print(f"⚠️  Warning: Failed to clear state: {e}")
 
 
 def archive_state():
     """
-    Move the current session.json to archive/ with a timestamp.
+    Append the current session (snapshot with its journal replayed) to the
+    compressed session archive (state/archive.py) and clear it.
     Used when completing a project or starting a new one after completion.
     """
-    if not STATE_FILE.exists():
-        return
-    
-    # Create archive directory if needed
-    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # Generate timestamp-based archive filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    project_name = STATE.get("project", "unknown").replace(" ", "_")[:30]
-    archive_file = ARCHIVE_DIR / f"{timestamp}_{project_name}.json"
-    
-    try:
-        # Move session.json to archive
-        STATE_FILE.rename(archive_file)
-        print(f"✅ Session archived to: {archive_file}")
-    except IOError as e:
-        print(f"⚠️  Warning: Failed to archive state: {e}")
+    from state.archive import get_archive
+
+    db = _sqlite()
+    with _journal_lock:
+        if db is not None:
+            session = db.load()
+        else:
+            session = load_state() if STATE_FILE.exists() else None
+        if not session:
+            return
+
+        # Snapshot objects are deleted with the session
+        session.pop("snapshots", None)
+        archive_id = get_archive().add(session)
+        if archive_id is None:
+            # Archive unavailable: keep a plain JSON file, moved into it on next use
+            ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            project_name = (session.get("project") or "unknown").replace(" ", "_")[:30]
+            archive_file = ARCHIVE_DIR / f"{timestamp}_{project_name}.json"
+            try:
+                write_atomic(archive_file, json.dumps(session, indent=2))
+            except IOError as e:
+                print(f"⚠️  Warning: Failed to archive state: {e}")
+                return
+        clear_state()
+        print(f"✅ Session archived (#{archive_id})" if archive_id is not None
+              else f"✅ Session archived to: {archive_file}")
+
+
+# -----------------------------
+# History queries
+# -----------------------------
+
+def phase_history(completions_only=False):
+    """
+    Phase history entries, oldest first; completions_only drops the
+    rollback/retry/undo records. Served from an index with the SQLite backend.
+    """
+    db = _sqlite()
+    if db is not None:
+        from state.session_db import COMPLETION
+        return db.history(COMPLETION if completions_only else None)
+
+    history = STATE.get("phase_history", [])
+    return [entry for entry in history if "action" not in entry] if completions_only else history
+
+
+def count_completed_phases():
+    """Number of phase completion entries in the history."""
+    db = _sqlite()
+    if db is not None:
+        from state.session_db import COMPLETION
+        return db.count_history(COMPLETION)
+    return sum(1 for entry in STATE.get("phase_history", []) if "action" not in entry)
 
 
 class Store:
     def save_plan(self, phases):
-        STATE["phases"] = phases
-        save_state()
-
+        set_value(["phases"], phases)
@@ -0,0 +1,40 @@
+import pytest
+
+from state import archive as archive_module
+from state import store
+from state.archive import SessionArchive
+from utils.analytics import load_columns, build_report
+
+
+@pytest.fixture
+def empty_dir(tmp_path, monkeypatch):
+    """An empty working directory, no session in memory, no archive opened yet."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(store, "STATE_BACKEND", "json")
+    monkeypatch.setitem(store.STATE, "phase_history", [])
+    monkeypatch.setattr(archive_module, "_archive", None)
+    return tmp_path
+
+
+def test_no_archive_is_empty_and_creates_nothing(empty_dir):
+    columns = load_columns(include_archive=True)
+
+    assert columns["phase"].size == 0
+    assert list(empty_dir.iterdir()) == []
+
+
+def test_existing_archive_is_included(empty_dir):
+    session = {"project": "p", "status": "completed", "phases": ["a", "b"], "phase_history": [
+        {"phase": 0, "completed_at": "2026-01-05T10:00:00", "duration_seconds": 1800,
+         "tasks_completed": 2, "total_tasks": 2},
+        {"phase": 1, "completed_at": "2026-01-06T10:00:00", "duration_seconds": 3600,
+         "tasks_completed": 3, "total_tasks": 4},
+    ]}
+    SessionArchive().add(session)
+
+    report = build_report(load_columns(include_archive=True))
+
+    assert report["totals"]["phase_completions"] == 2
+    assert report["totals"]["tasks_completed"] == 5
+    assert report["velocity"]["tasks_per_hour"] == round(5 / 1.5, 2)
+    assert load_columns(include_archive=False)["phase"].size == 0
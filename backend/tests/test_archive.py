@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+
+from state.archive import SessionArchive, INDEX_FILE
+
+
+def _session(project, status="completed", phases=2):
+    history = [
+        {"phase": i, "completed_at": f"2026-01-0{i + 1}T10:00:00", "duration_seconds": 3600 * (i + 1),
+         "tasks_completed": 3, "total_tasks": 4}
+        for i in range(phases)
+    ]
+    return {"project": project, "tech": "python", "status": status,
+            "phases": [f"Phase {i + 1}" for i in range(phases)], "phase_history": history}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return SessionArchive(directory=tmp_path / "archive", segment_max_bytes=600)
+
+
+def test_append_and_read_back(archive):
+    ids = [archive.add(_session(f"project {i}"), archived_at=f"2026-02-{i + 1:02d}T00:00:00")
+           for i in range(5)]
+
+    assert ids == [1, 2, 3, 4, 5]
+    assert archive.get(3) == _session("project 2")
+    assert archive.get(99) is None
+    # Small segments: the archive rolled over to new files
+    assert len(archive._segments()) > 1
+    assert [row["project"] for row in archive.list_sessions(limit=2)] == ["project 4", "project 3"]
+    assert [row["id"] for row in archive.list_sessions(since="2026-02-04")] == [5, 4]
+
+
+def test_each_session_is_one_gzip_line(archive):
+    archive.add(_session("a"), archived_at="2026-02-01T00:00:00")
+    archive.add(_session("b"), archived_at="2026-02-02T00:00:00")
+
+    lines = gzip.decompress((archive.directory / "sessions-00001.jsonl.gz").read_bytes()).splitlines()
+    assert [json.loads(line)["session"]["project"] for line in lines] == ["a", "b"]
+
+
+def test_stats_and_phase_stats(archive):
+    archive.add(_session("a"))
+    archive.add(_session("b", status="in_progress", phases=1))
+
+    stats = archive.stats()
+    assert (stats["sessions"], stats["phases"], stats["completed_phases"]) == (2, 3, 3)
+    assert stats["by_status"] == {"completed": 1, "in_progress": 1}
+    durations = sorted(row[2] for row in archive.phase_stats())
+    assert durations == [3600, 3600, 7200]
+
+
+def test_reindex_after_losing_the_index(archive, tmp_path):
+    for i in range(4):
+        archive.add(_session(f"project {i}"), archived_at=f"2026-02-{i + 1:02d}T00:00:00")
+    before = archive.list_sessions()
+    archive._conn.close()
+    for suffix in ("", "-wal", "-shm"):
+        (archive.directory / (INDEX_FILE.name + suffix)).unlink(missing_ok=True)
+
+    fresh = SessionArchive(directory=archive.directory, segment_max_bytes=600)
+    assert fresh.list_sessions() == []
+    assert fresh.rebuild_index() == 4
+    assert fresh.list_sessions() == before
+    assert fresh.get(before[0]["id"]) == _session("project 3")
+    assert len(fresh.phase_stats()) == 8
+
+
+def test_reindex_stops_at_a_torn_segment_tail(archive):
+    archive.add(_session("a"))
+    archive.add(_session("b"))
+    segment = archive.directory / "sessions-00001.jsonl.gz"
+    data = segment.read_bytes()
+    segment.write_bytes(data[:-10])
+
+    assert archive.rebuild_index() == 1
+    assert archive.get(1)["project"] == "a"
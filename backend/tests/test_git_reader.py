@@ -0,0 +1,77 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from utils.git_reader import GitRepo, find_git_dir
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def _git(work_tree, *args):
+    env = {**os.environ, "GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1"}
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=work_tree, env=env, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A scratch repository with one commit, and a GitRepo reading it."""
+    _git(tmp_path, "init", "-q")
+    _write(tmp_path / "app.py", "".join(f"line {i}\n" for i in range(1, 21)))
+    _write(tmp_path / "README.md", "# Demo\n\nSome text.\n")
+    _write(tmp_path / "old.txt", "going away\n")
+    _write(tmp_path / "src" / "no_eol.txt", "first\nlast")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\0\0\0")
+    _git(tmp_path, "add", "-A")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+
+    git_repo = GitRepo(*find_git_dir(str(tmp_path)))
+    yield tmp_path, git_repo
+    git_repo.close()
+
+
+def _assert_matches_git(work_tree, git_repo):
+    staged, unstaged = git_repo.diff()
+    assert staged == _git(work_tree, "diff", "--cached", "--no-color", "--no-ext-diff")
+    assert unstaged == _git(work_tree, "diff", "--no-color", "--no-ext-diff")
+
+
+def test_diff_matches_git_diff(repo):
+    work_tree, git_repo = repo
+    # Staged: a new file and an edit
+    _write(work_tree / "new.py", "print('new')\n")
+    _write(work_tree / "README.md", "# Demo project\n\nSome text.\nMore text.\n")
+    _git(work_tree, "add", "new.py", "README.md")
+    # Unstaged: edits in two places, a deletion, a missing final newline and a binary change
+    lines = [f"line {i}\n" for i in range(1, 21)]
+    lines[2] = "line three\n"
+    lines[17] = "line eighteen\n"
+    _write(work_tree / "app.py", "".join(lines) + "line 21\n")
+    (work_tree / "old.txt").unlink()
+    _write(work_tree / "src" / "no_eol.txt", "first\nsecond\nlast")
+    (work_tree / "logo.png").write_bytes(b"\x89PNG\0\0\0\1")
+
+    _assert_matches_git(work_tree, git_repo)
+
+
+def test_diff_follows_later_changes(repo):
+    work_tree, git_repo = repo
+    assert git_repo.diff() == ("", "")
+
+    _write(work_tree / "app.py", "rewritten\n")
+    _assert_matches_git(work_tree, git_repo)
+
+    _git(work_tree, "add", "app.py")
+    _assert_matches_git(work_tree, git_repo)
+
+    _git(work_tree, "commit", "-q", "-m", "rewrite")
+    assert git_repo.diff() == ("", "")
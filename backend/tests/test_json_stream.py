@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from utils.json_stream import iter_array_items
+
+TREE = {
+    "sha": "abc",
+    "url": "https://api.github.com/repos/o/r/git/trees/abc",
+    "tree": [{"path": f"src/ü{i}.py", "type": "blob", "size": i * 1000} for i in range(50)],
+    "truncated": False,
+}
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, 100000])
+def test_items_and_members_across_chunk_boundaries(size):
+    # Bytes chunks split numbers and multi-byte characters
+    data = json.dumps(TREE, ensure_ascii=False, indent=1).encode("utf-8")
+    meta = {}
+
+    items = list(iter_array_items(_chunks(data, size), "tree", meta))
+
+    assert items == TREE["tree"]
+    assert meta == {"sha": "abc", "url": TREE["url"], "truncated": False}
+
+
+def test_items_from_str_chunks():
+    items = list(iter_array_items(_chunks('{"tree": [1, 22, 333]}', 2), "tree"))
+    assert items == [1, 22, 333]
+
+
+@pytest.mark.parametrize("text", ['{}', '{"tree": []}', '{"sha": "x"}'])
+def test_empty_or_missing_array(text):
+    assert list(iter_array_items([text], "tree")) == []
+
+
+def test_items_are_yielded_before_the_input_ends():
+    def chunks():
+        yield '{"tree": [{"path": "a"}, '
+        raise AssertionError("read past the first item")
+
+    assert next(iter_array_items(chunks(), "tree")) == {"path": "a"}
+
+
+@pytest.mark.parametrize("text", ['[1, 2]', '{"tree": [1, 2'])
+def test_invalid_input(text):
+    with pytest.raises(ValueError):
+        list(iter_array_items([text], "tree"))
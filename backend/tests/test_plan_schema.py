@@ -0,0 +1,31 @@
+import pytest
+
+from agents.plan_schema import repair_json, PlanFormatError
+
+PLAN = {"phases": [{"name": "Setup", "tasks": ["Init repo"], "commit_msg": "phase-1: setup"}]}
+
+
+@pytest.mark.parametrize("text", [
+    '{"phases": [{"name": "Setup", "tasks": ["Init repo"], "commit_msg": "phase-1: setup"}]}',
+    # Code fence and prose around it
+    'Here is the plan:\n```json\n{"phases": [{"name": "Setup", "tasks": ["Init repo"],'
+    ' "commit_msg": "phase-1: setup"}]}\n```\nGood luck!',
+    # Trailing commas
+    '{"phases": [{"name": "Setup", "tasks": ["Init repo",], "commit_msg": "phase-1: setup",},],}',
+    # Smart quotes
+    '{“phases”: [{“name”: “Setup”, “tasks”: [“Init repo”], “commit_msg”: “phase-1: setup”}]}',
+    # Cut off by max_tokens
+    '{"phases": [{"name": "Setup", "tasks": ["Init repo"], "commit_msg": "phase-1: setup',
+])
+def test_repair_json(text):
+    assert repair_json(text) == PLAN
+
+
+def test_repair_json_keeps_raw_newlines_in_strings():
+    assert repair_json('{"name": "two\nlines"}') == {"name": "two\nlines"}
+
+
+@pytest.mark.parametrize("text", ["No plan today.", '{"phases": [{"name": }]}'])
+def test_repair_json_rejects_what_it_cannot_fix(text):
+    with pytest.raises(PlanFormatError):
+        repair_json(text)
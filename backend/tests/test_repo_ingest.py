@@ -0,0 +1,98 @@
+import hashlib
+import io
+import tarfile
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from agents import repo_ingest
+from agents.repo_ingest import ingest_repo, ArchiveError, _LimitedReader
+
+FILES = {
+    "package.json": b'{"name": "demo"}\n',
+    "src/main.py": b"print('hi')\nprint('bye')\n",
+    "Dockerfile": b"FROM python:3\n",
+    "logo.png": b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR",
+    "node_modules/lib/index.js": b"module.exports = 1\n",
+}
+
+
+def _tarball(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, data in files.items():
+            # Wrapped in "<owner>-<repo>-<sha>/" like GitHub's archives
+            member = tarfile.TarInfo(f"o-r-0123abc/{path}")
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _blob_sha(data):
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+@pytest.fixture
+def served_archive(monkeypatch):
+    """Serve the tarball of FILES on localhost and point REPO_ARCHIVE_URL at it."""
+    body = _tarball(FILES)
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append((self.path, self.headers.get("Authorization")))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(repo_ingest, "REPO_ARCHIVE_URL",
+                        f"http://127.0.0.1:{server.server_port}/{{owner}}/{{repo}}.tar.gz")
+    yield body, requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_ingest_indexes_the_served_archive(served_archive):
+    _, requests_seen = served_archive
+
+    index = ingest_repo("https://github.com/o/r")
+
+    assert requests_seen == [("/o/r.tar.gz", None)]
+    assert set(index["files"]) == {"package.json", "src/main.py", "Dockerfile"}
+    assert index["files"]["src/main.py"] == {"size": len(FILES["src/main.py"]), "type": "py",
+                                             "lines": 2, "truncated": False}
+    assert index["files"]["Dockerfile"]["type"] == "Dockerfile"
+    assert index["types"]["json"] == {"files": 1, "bytes": len(FILES["package.json"])}
+    assert index["contents"]["package.json"] == FILES["package.json"].decode()
+    assert index["skipped"] == {"binary": 1, "ignored": 1, "over_budget": 0}
+    # Binary files keep their blob sha (for incremental refreshes) but are not indexed
+    assert index["blobs"]["logo.png"] == _blob_sha(FILES["logo.png"])
+    assert index["blobs"]["src/main.py"] == _blob_sha(FILES["src/main.py"])
+    assert index["total_bytes"] == sum(len(FILES[path]) for path in index["files"])
+
+
+def test_ingest_stops_at_the_archive_size_cap(served_archive, monkeypatch):
+    body, _ = served_archive
+    monkeypatch.setattr(repo_ingest, "REPO_ARCHIVE_MAX_BYTES", len(body) // 2)
+
+    with pytest.raises(ArchiveError, match="larger than"):
+        ingest_repo("https://github.com/o/r")
+
+
+def test_limited_reader_allows_exactly_the_cap():
+    reader = _LimitedReader(io.BytesIO(b"x" * 10), 10)
+    assert reader.read(6) + reader.read(6) == b"x" * 10
+
+    reader = _LimitedReader(io.BytesIO(b"x" * 11), 10)
+    reader.read(6)
+    with pytest.raises(ArchiveError):
+        reader.read(6)
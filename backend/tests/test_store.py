@@ -0,0 +1,185 @@
+import copy
+import json
+
+import pytest
+
+from state import store
+from state.fsutil import write_atomic
+from state.store import STATE, save_state, load_state, transaction, flush_state, set_value
+from utils.task_manager import save_tasks, delete_task, add_task, get_tasks
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    """A fresh JSON-backed session in an empty directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(store, "STATE_BACKEND", "json")
+    original = copy.deepcopy(STATE)
+    STATE.update(project="p", status="in_progress", phases=["Phase 1: a"], phase_tasks={})
+    save_state()
+    yield
+    flush_state()
+    STATE.clear()
+    STATE.update(original)
+
+
+def _reloaded_tasks(phase_index):
+    flush_state()
+    return [task["task"] for task in load_state()["phase_tasks"][str(phase_index)]]
+
+
+def test_mutate_then_append_in_transaction_reloads(session):
+    with transaction():
+        save_tasks(0, ["a", "b", "c"])
+        delete_task(0, 0)
+        add_task(0, "d")
+
+    assert [task["task"] for task in get_tasks(0)] == ["b", "c", "d"]
+    assert _reloaded_tasks(0) == ["b", "c", "d"]
+
+
+def test_mutate_then_append_within_debounce_reloads(session, monkeypatch):
+    monkeypatch.setattr(store, "STATE_FLUSH_DEBOUNCE", 5)
+    save_tasks(0, ["a", "b", "c"])
+    delete_task(0, 0)
+    add_task(0, "d")
+
+    assert _reloaded_tasks(0) == ["b", "c", "d"]
+
+
+def test_read_state_leaves_the_journal_alone(session, monkeypatch):
+    save_tasks(0, ["a", "b"])
+    journal = store.JOURNAL_FILE.read_bytes()
+    # As in a process that never loaded the session (the API)
+    monkeypatch.setitem(store._journal, "ready", False)
+
+    state = store.read_state()
+
+    assert [task["task"] for task in state["phase_tasks"]["0"]] == ["a", "b"]
+    assert store._journal["ready"] is False
+    assert store.JOURNAL_FILE.read_bytes() == journal
+
+
+class _TornFile:
+    """A journal file whose write stores half the text, then fails."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+    def write(self, text):
+        self.f.write(text[:len(text) // 2])
+        self.f.flush()
+        raise OSError("disk full")
+
+
+def test_failed_append_never_hides_later_changes(session, monkeypatch):
+    real_open = open
+
+    def torn_open(path, mode="r", *args, **kwargs):
+        f = real_open(path, mode, *args, **kwargs)
+        return _TornFile(f) if mode == "a" else f
+
+    monkeypatch.setattr(store, "open", torn_open, raising=False)
+    save_tasks(0, ["a"])
+    monkeypatch.delattr(store, "open")
+    add_task(0, "b")
+
+    assert _reloaded_tasks(0) == ["a", "b"]
+
+
+def test_failed_append_is_written_at_exit(session, monkeypatch):
+    def failing_open(path, mode="r", *args, **kwargs):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(store, "open", failing_open, raising=False)
+    save_tasks(0, ["a"])
+    monkeypatch.delattr(store, "open")
+    # What the atexit hook does
+    flush_state()
+
+    assert _reloaded_tasks(0) == ["a"]
+
+
+def test_save_state_inside_transaction_keeps_later_changes(session):
+    with transaction():
+        save_tasks(0, ["a"])
+        save_state()
+        add_task(0, "b")
+
+    assert _reloaded_tasks(0) == ["a", "b"]
+
+
+def test_save_state_inside_rolled_back_transaction_saves_nothing_uncommitted(session):
+    save_tasks(0, ["a"])
+    with pytest.raises(RuntimeError):
+        with transaction():
+            add_task(0, "b")
+            save_state()
+            raise RuntimeError("abort")
+
+    assert [task["task"] for task in get_tasks(0)] == ["a"]
+    assert _reloaded_tasks(0) == ["a"]
+
+
+def _journal_lines():
+    return store.JOURNAL_FILE.read_text(encoding="utf-8").splitlines()
+
+
+def test_journal_is_replayed_after_a_crash(session):
+    snapshot = store.STATE_FILE.read_bytes()
+    save_tasks(0, ["a", "b"])
+    set_value(["current_phase"], 1)
+
+    # Only the journal was written, the snapshot is the one from the fixture
+    assert store.STATE_FILE.read_bytes() == snapshot
+    assert len(_journal_lines()) == 3
+    state = load_state()
+    assert [task["task"] for task in state["phase_tasks"]["0"]] == ["a", "b"]
+    assert state["current_phase"] == 1
+
+
+def test_torn_journal_tail_keeps_the_records_before_it(session):
+    save_tasks(0, ["a"])
+    with open(store.JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"op":"append","path":["phase_tasks","0"],"val')
+
+    assert [task["task"] for task in load_state()["phase_tasks"]["0"]] == ["a"]
+    # Nothing is appended behind the torn record: the next change compacts
+    add_task(0, "b")
+    assert len(_journal_lines()) == 1
+    assert _reloaded_tasks(0) == ["a", "b"]
+
+
+def test_compaction_writes_a_snapshot_and_an_empty_journal(session, monkeypatch):
+    monkeypatch.setattr(store, "STATE_JOURNAL_MAX_RECORDS", 3)
+    generation = store._journal["generation"]
+    for phase in range(3):
+        set_value(["current_phase"], phase)
+
+    assert store._journal["generation"] == generation + 1
+    assert _journal_lines() == [json.dumps({"generation": generation + 1})]
+    snapshot = json.loads(store.STATE_FILE.read_text(encoding="utf-8"))
+    assert snapshot["current_phase"] == 2
+    assert snapshot[store.GENERATION_KEY] == generation + 1
+    assert load_state()["current_phase"] == 2
+
+
+def test_journal_of_an_older_generation_is_not_replayed(session):
+    add_task(0, "a")
+    # Crash between writing the new snapshot and resetting the journal:
+    # the snapshot already holds the journaled change
+    generation = store._journal["generation"]
+    write_atomic(store.STATE_FILE, json.dumps({**STATE, store.GENERATION_KEY: generation + 1}))
+
+    state = load_state()
+    assert [task["task"] for task in state["phase_tasks"]["0"]] == ["a"]
+    assert store._journal["generation"] == generation + 1
+    # The stale journal is never appended to; the next change writes a snapshot
+    add_task(0, "b")
+    assert _reloaded_tasks(0) == ["a", "b"]
@@ -0,0 +1,196 @@
+"""
+Vectorized analytics over phase completions.
+
+Every phase completion of the current session and of all archived
+sessions is loaded into NumPy columns (one element per completion):
+
+    session          archive id (0 for the current session)
+    phase            phase index
+    duration         seconds spent, NaN if unknown
+    tasks_completed  tasks done when the phase was verified
+    total_tasks      tasks the phase had
+    completed_at     epoch seconds, NaN if unknown
+
+Archived sessions come from the archive index (state/archive.py), so no
+segment is decompressed; without an index there are none, and nothing is
+created. Reports are computed with whole-array
+operations (sorting, bincount, reduceat), no per-row Python loop: 10,000
+sessions take a few tens of milliseconds.
+"""
+
+import numpy as np
+
+from state.archive import get_archive, phase_rows
+from state.store import STATE, read_state
+
+COLUMNS = ["session", "phase", "duration", "tasks_completed", "total_tasks", "completed_at"]
+CURRENT_SESSION = 0  # archive ids start at 1
+
+PERCENTILES = (50, 75, 90)
+DAY_SECONDS = 24 * 3600
+WEEK_SECONDS = 7 * DAY_SECONDS
+# The epoch is a Thursday; shift so weeks start on Monday
+WEEK_OFFSET = 3 * DAY_SECONDS
+
+
+def load_columns(include_archive=True):
+    """
+    Phase completions as NumPy columns.
+
+    Args:
+        include_archive: Add every archived session to the current one
+
+    Returns:
+        dict: {column name: np.ndarray}, see COLUMNS
+    """
+    rows = []
+    # Read-only: the session belongs to the CLI, this may be the API process
+    session = STATE if STATE.get("phase_history") else read_state()
+    if session:
+        rows += [(CURRENT_SESSION,) + row for row in phase_rows(session)]
+    # A plain GET must not create the archive: no index yet means no archived sessions
+    archive = get_archive()
+    if include_archive and archive.exists():
+        rows += archive.phase_stats()
+
+    # None (unknown) becomes NaN
+    table = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+    columns = {name: table[:, i] for i, name in enumerate(COLUMNS)}
+    columns["session"] = columns["session"].astype(np.int64)
+    columns["phase"] = columns["phase"].astype(np.int64)
+    return columns
+
+
+def _num(value, digits=2):
+    """JSON-friendly float: rounded, None for NaN/inf."""
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def _ratio(numerator, denominator):
+    """Element-wise numerator / denominator, NaN where the denominator is 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def _group_percentiles(keys, values, percentiles):
+    """
+    Percentiles of values per key, in one sort.
+
+    Returns:
+        tuple: (sorted unique keys, counts, means, {percentile: array per key})
+    """
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    means = np.add.reduceat(values, starts) / counts
+
+    # Linear interpolation between the closest ranks, like np.percentile
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100
+    positions = starts[:, None] + fractions[None, :] * (counts[:, None] - 1)
+    low = np.floor(positions).astype(np.int64)
+    high = np.ceil(positions).astype(np.int64)
+    result = values[low] + (values[high] - values[low]) * (positions - low)
+    return unique, counts, means, {p: result[:, i] for i, p in enumerate(percentiles)}
+
+
+def velocity(columns):
+    """
+    Tasks per hour over every timed completion, and its distribution across sessions.
+
+    Returns:
+        dict: {"tasks_per_hour", "sessions": {"p50", ...}}
+    """
+    timed = np.isfinite(columns["duration"]) & (columns["duration"] > 0)
+    tasks = columns["tasks_completed"][timed]
+    hours = columns["duration"][timed] / 3600
+
+    _, session_index = np.unique(columns["session"][timed], return_inverse=True)
+    per_session = _ratio(np.bincount(session_index, weights=tasks), np.bincount(session_index, weights=hours))
+    per_session = per_session[np.isfinite(per_session)]
+
+    return {
+        "tasks_per_hour": _num(_ratio(tasks.sum(), hours.sum())),
+        "sessions": {f"p{p}": _num(v) for p, v in
+                     zip(PERCENTILES, np.percentile(per_session, PERCENTILES) if per_session.size
+                         else [np.nan] * len(PERCENTILES))},
+    }
+
+
+def phase_durations(columns):
+    """
+    Duration statistics per phase index.
+
+    Returns:
+        list: {"phase" (1-based), "completions", "mean_seconds", "p50_seconds", ...} per phase
+    """
+    timed = np.isfinite(columns["duration"])
+    phases, counts, means, percentiles = _group_percentiles(
+        columns["phase"][timed], columns["duration"][timed], PERCENTILES
+    )
+    return [
+        {"phase": int(phase) + 1, "completions": int(counts[i]), "mean_seconds": _num(means[i]),
+         **{f"p{p}_seconds": _num(percentiles[p][i]) for p in PERCENTILES}}
+        for i, phase in enumerate(phases)
+    ]
+
+
+def weekly_trend(columns, weeks=12):
+    """
+    Completions, tasks, hours and velocity per calendar week (the last weeks
+    that had any), and the velocity's linear trend.
+
+    Returns:
+        dict: {"weeks": [{"week", "phases", "tasks", "hours", "tasks_per_hour"}],
+               "velocity_change_per_week": tasks/hour gained (or lost) per week}
+    """
+    duration = columns["duration"]
+    dated = np.isfinite(columns["completed_at"])
+    week = np.floor((columns["completed_at"][dated] + WEEK_OFFSET) / WEEK_SECONDS).astype(np.int64)
+    timed = np.isfinite(duration[dated]) & (duration[dated] > 0)
+
+    buckets, index = np.unique(week, return_inverse=True)
+    phases = np.bincount(index, minlength=buckets.size)
+    tasks = np.bincount(index, weights=columns["tasks_completed"][dated], minlength=buckets.size)
+    timed_tasks = np.bincount(index[timed], weights=columns["tasks_completed"][dated][timed], minlength=buckets.size)
+    hours = np.bincount(index[timed], weights=duration[dated][timed] / 3600, minlength=buckets.size)
+    rates = _ratio(timed_tasks, hours)
+
+    keep = slice(max(buckets.size - weeks, 0), None)
+    buckets, phases, tasks, hours, rates = buckets[keep], phases[keep], tasks[keep], hours[keep], rates[keep]
+
+    fitted = np.isfinite(rates)
+    slope = np.polyfit(buckets[fitted], rates[fitted], 1)[0] if fitted.sum() >= 2 else np.nan
+    starts = (buckets * WEEK_SECONDS - WEEK_OFFSET).astype("datetime64[s]").astype("datetime64[D]")
+    return {
+        "weeks": [
+            {"week": str(starts[i]), "phases": int(phases[i]), "tasks": int(tasks[i]),
+             "hours": _num(hours[i]), "tasks_per_hour": _num(rates[i])}
+            for i in range(buckets.size)
+        ],
+        "velocity_change_per_week": _num(slope, 3),
+    }
+
+
+def build_report(columns, weeks=12):
+    """
+    Everything above in one JSON-serializable dict.
+
+    Returns:
+        dict: {"totals", "velocity", "phase_durations", "trend"}
+    """
+    duration = columns["duration"]
+    timed = np.isfinite(duration)
+    return {
+        "totals": {
+            "sessions": int(np.unique(columns["session"]).size),
+            "phase_completions": int(columns["phase"].size),
+            "tasks_completed": int(columns["tasks_completed"].sum()),
+            "total_tasks": int(columns["total_tasks"].sum()),
+            "task_completion_rate": _num(_ratio(columns["tasks_completed"].sum(), columns["total_tasks"].sum()), 3),
+            "hours": _num(duration[timed].sum() / 3600),
+        },
+        "velocity": velocity(columns),
+        "phase_durations": phase_durations(columns),
+        "trend": weekly_trend(columns, weeks),
+    }
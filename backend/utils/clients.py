@@ -0,0 +1,42 @@
+"""
+Lazy registry of shared network clients.
+
+Modules register a factory at import time, which costs nothing, and the
+client is built on the first get_client() call. Importing an agent therefore
+never pulls in groq/httpx/requests or opens connections; only the first
+real call does.
+"""
+
+import threading
+
+_factories = {}
+_clients = {}
+_lock = threading.Lock()
+
+
+def register_client(name, factory):
+    """Register (or replace) the factory for a named client."""
+    with _lock:
+        _factories[name] = factory
+        # A replaced factory must not keep serving the old instance
+        _clients.pop(name, None)
+
+
+def get_client(name):
+    """Return the shared client, building it on first use."""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _factories[name]()
+            _clients[name] = client
+        return client
+
+
+def reset_clients():
+    """Forget every built client, they are rebuilt on next use."""
+    with _lock:
+        _clients.clear()
@@ -0,0 +1,165 @@
+"""
+Token-budgeted prompt context assembly shared by all agents.
+
+Agents used to build context their own way (a whole file tree, an
+unbounded diff, fixed character cuts). A ContextBuilder instead takes one
+token budget and a set of sources (tree, diff, file contents, history...),
+each with a priority and optional min/max share. Sources are loaded in
+priority order and each loader is told how many tokens it may use, so
+sources that can bound themselves (the diff reader, the file tree) never
+produce more than fits; anything longer is cut at a line boundary.
+
+A ContextMemo shared across one request (e.g. every phase of a plan)
+makes sure expensive sources are only loaded once.
+"""
+
+import threading
+from concurrent.futures import Future
+
+# Rough local estimate, same ratio as the LLM scheduler (agents/rate_limiter.py)
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "… (truncated)"
+
+
+def estimate_tokens(text):
+    """Approximate token count of text, no tokenizer needed."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, max_tokens, marker=TRUNCATION_MARKER):
+    """
+    Cut text to roughly max_tokens, at a line boundary where possible.
+
+    Returns:
+        str: text unchanged if it fits, otherwise its head plus marker
+    """
+    if max_tokens <= 0:
+        return ""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    head = text[:max(max_chars - len(marker) - 1, 0)]
+    newline = head.rfind("\n")
+    # Don't throw away more than a quarter of the budget to end on a full line
+    if newline >= len(head) * 3 // 4:
+        head = head[:newline + 1]
+    elif head:
+        head += "\n"
+    return head + marker
+
+
+def fit_history(history, max_tokens):
+    """
+    The most recent chat messages that fit in max_tokens, oldest first.
+
+    Args:
+        history: [{"role", "content"}] oldest first
+    """
+    kept = []
+    used = 0
+    for message in reversed(history):
+        cost = estimate_tokens(str(message.get("content", ""))) + 4  # role/formatting overhead
+        if used + cost > max_tokens:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+class ContextMemo:
+    """
+    Per-request memo for expensive context sources. Concurrent callers
+    asking for the same key share one load.
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+
+        if owner:
+            try:
+                future.set_result(loader())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+class ContextBuilder:
+    def __init__(self, budget_tokens, memo=None):
+        self.budget_tokens = budget_tokens
+        self.memo = memo
+        self._sources = []
+
+    def add(self, name, loader, priority, max_tokens=None, min_tokens=0, title=None):
+        """
+        Register a source.
+
+        Args:
+            name: Key in the built context (and memo key)
+            loader: Callable taking the token allowance and returning text
+            priority: Lower loads first and gets first pick of the budget
+            max_tokens: Cap on this source's share
+            min_tokens: Share kept free for this source while higher priorities load
+            title: Section heading used by render()
+        """
+        self._sources.append({
+            "name": name, "loader": loader, "priority": priority,
+            "max_tokens": max_tokens, "min_tokens": min_tokens, "title": title or name
+        })
+        return self
+
+    def _load(self, source, allowance):
+        def load():
+            return source["loader"](allowance) or ""
+        if self.memo is None:
+            return load()
+        return self.memo.get((source["name"], allowance), load)
+
+    def build(self):
+        """
+        Load every source within the budget.
+
+        Returns:
+            dict: {name: text} in the order sources were added
+        """
+        remaining = self.budget_tokens
+        reserved = sum(source["min_tokens"] for source in self._sources)
+        results = {}
+
+        for source in sorted(self._sources, key=lambda s: s["priority"]):
+            reserved -= source["min_tokens"]
+            allowance = remaining - reserved
+            if source["max_tokens"] is not None:
+                allowance = min(allowance, source["max_tokens"])
+            allowance = max(allowance, min(source["min_tokens"], remaining))
+
+            text = ""
+            if allowance > 0:
+                try:
+                    text = truncate_to_tokens(self._load(source, allowance), allowance)
+                except Exception as e:
+                    text = f"(unavailable: {e})"
+            results[source["name"]] = text
+            remaining -= estimate_tokens(text)
+
+        return {source["name"]: results[source["name"]] for source in self._sources}
+
+    def render(self):
+        """Built sources as "Title:\\ntext" sections, skipping empty ones."""
+        built = self.build()
+        sections = [
+            f"{source['title']}:\n{built[source['name']].rstrip()}"
+            for source in self._sources if built[source["name"]].strip()
+        ]
+        return "\n\n".join(sections)
@@ -0,0 +1,296 @@
+"""
+Bounded, streaming git diff reader for prompt context.
+
+get_git_diff() returns the complete staged and unstaged diffs, so a single
+regenerated lockfile or minified bundle can mean megabytes of reading and
+an over-long prompt. read_diff_context() instead:
+
+- starts with a `git diff --numstat` overview of every changed file
+- streams `git diff` line by line and stops (killing git) once the byte
+  budget is used up or it has scanned SCAN_FACTOR times the budget, so
+  memory stays bounded by the budget; hunks too big for what is left are
+  dropped with the rest of their file
+- skips binary, vendored, generated and lockfile paths
+- only ever emits whole hunks, never a hunk cut mid-line
+
+Results are cached on the repository state from utils/git_reader.py, so
+asking again before anything changed costs no fork.
+"""
+
+import fnmatch
+import os
+import subprocess
+import tempfile
+import threading
+
+from utils.context import CHARS_PER_TOKEN
+from utils.git_reader import get_repo, GitReaderError
+
+LOCKFILES = ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Pipfile.lock',
+             'Cargo.lock', 'composer.lock', 'Gemfile.lock', 'go.sum', 'uv.lock']
+VENDORED_DIRS = ['node_modules', 'vendor', 'third_party', 'dist', 'build', '.venv', 'venv', '__pycache__']
+GENERATED_PATTERNS = ['*.min.js', '*.min.css', '*.map', '*.pb.go', '*_pb2.py', '*.snap']
+
+# Files listed in the overview
+MAX_OVERVIEW_FILES = 20
+# Stop once less than this is left; no useful hunk fits
+MIN_HUNK_BYTES = 120
+# Stop after reading this many times the budget, however much is skipped
+SCAN_FACTOR = 16
+
+_cache = {}
+_cache_lock = threading.Lock()
+MAX_CACHED = 8
+
+
+def skip_reason(path):
+    """Why a path is left out of diff context, or None to include it."""
+    parts = path.split('/')
+    name = parts[-1]
+    if name in LOCKFILES:
+        return "lockfile"
+    if any(part in VENDORED_DIRS for part in parts[:-1]):
+        return "vendored"
+    if any(fnmatch.fnmatch(name, pattern) for pattern in GENERATED_PATTERNS):
+        return "generated"
+    return None
+
+
+def _exclude_pathspecs():
+    """Pathspecs that keep git from even diffing the skipped paths."""
+    specs = [f":(glob,exclude)**/{name}" for name in LOCKFILES]
+    specs += [f":(glob,exclude)**/{directory}/**" for directory in VENDORED_DIRS]
+    specs += [f":(glob,exclude)**/{pattern}" for pattern in GENERATED_PATTERNS]
+    return specs
+
+
+def _git(args):
+    return ["git", "-c", "core.quotePath=false", "diff", "--no-color", "--no-ext-diff", *args]
+
+
+def numstat(cached=False):
+    """
+    Returns:
+        list: (path, added or None, deleted or None) per changed file; None counts mean binary
+    """
+    try:
+        output = subprocess.run(
+            _git(["--numstat", "--cached"] if cached else ["--numstat"]),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        ).stdout.decode("utf-8", "replace")
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+
+    files = []
+    for line in output.splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        added, deleted, path = parts
+        if added == "-":
+            files.append((path, None, None))
+        else:
+            files.append((path, int(added), int(deleted)))
+    return files
+
+
+def format_overview(files):
+    """`--stat`-like summary: totals, then one line per file with the reason if it is skipped."""
+    if not files:
+        return "(no changes)\n"
+
+    added = sum(a or 0 for _, a, _ in files)
+    deleted = sum(d or 0 for _, _, d in files)
+    lines = [f" {len(files)} files changed, {added} insertions(+), {deleted} deletions(-)\n"]
+
+    # Biggest changes first
+    for path, a, d in sorted(files, key=lambda f: (f[1] or 0) + (f[2] or 0), reverse=True)[:MAX_OVERVIEW_FILES]:
+        reason = "binary" if a is None else skip_reason(path)
+        change = "binary" if a is None else f"+{a} -{d}"
+        lines.append(f" {path} | {change}" + (f" (skipped: {reason})\n" if reason else "\n"))
+    if len(files) > MAX_OVERVIEW_FILES:
+        lines.append(f" … {len(files) - MAX_OVERVIEW_FILES} more files\n")
+    return "".join(lines)
+
+
+def _read_line(stream, limit):
+    """
+    Read one line of at most limit bytes; the rest of a longer line is
+    discarded so a minified one-line file can't grow memory.
+
+    Returns:
+        tuple: (line bytes, whether it was cut)
+    """
+    line = stream.readline(limit)
+    if not line or line.endswith(b"\n"):
+        return line, False
+    # Drain the remainder of an over-long line
+    while True:
+        rest = stream.readline(64 * 1024)
+        if not rest or rest.endswith(b"\n"):
+            return line, True
+
+
+def stream_diff(cached=False, max_bytes=8000, order=None):
+    """
+    Stream `git diff` and keep whole hunks until max_bytes is used.
+
+    Args:
+        order: Paths in the order git should output them (git diff -O)
+
+    Returns:
+        tuple: (diff text, paths shown, whether output was cut short)
+    """
+    args = ["--cached"] if cached else []
+    order_file = None
+    if order:
+        with tempfile.NamedTemporaryFile("w", suffix=".order", delete=False, encoding="utf-8") as order_file:
+            order_file.write("".join(f"{path}\n" for path in order))
+        args.append(f"-O{order_file.name}")
+
+    try:
+        proc = subprocess.Popen(
+            _git(args + ["--", "."] + _exclude_pathspecs()),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        if order_file is not None:
+            os.unlink(order_file.name)
+        return "", set(), False
+
+    out = []
+    used = 0
+    shown = set()
+    header, header_emitted = [], False
+    hunk, hunk_size = [], 0
+    path, skip_file = None, False
+    truncated = False
+    read = 0
+
+    def flush_hunk():
+        """Emit the buffered hunk (and its file header) if it fits. Returns False when over budget."""
+        nonlocal used, header_emitted, hunk, hunk_size
+        if not hunk:
+            return True
+        cost = hunk_size + (0 if header_emitted else sum(len(line) for line in header))
+        if used + cost > max_bytes:
+            return False
+        if not header_emitted:
+            out.extend(header)
+            header_emitted = True
+            shown.add(path)
+        out.extend(hunk)
+        used += cost
+        hunk, hunk_size = [], 0
+        return True
+
+    try:
+        while used < max_bytes - MIN_HUNK_BYTES and read < max_bytes * SCAN_FACTOR:
+            raw, cut = _read_line(proc.stdout, max_bytes - used + 1)
+            if not raw:
+                break
+            read += len(raw)
+            line = raw.decode("utf-8", "replace")
+
+            if line.startswith("diff --git "):
+                if not flush_hunk():
+                    truncated = True
+                header, header_emitted = [line], False
+                hunk, hunk_size = [], 0
+                # "diff --git a/<path> b/<path>"
+                path = line.rstrip("\n").split(" b/", 1)[-1]
+                skip_file = skip_reason(path) is not None
+                continue
+
+            if skip_file:
+                continue
+
+            if line.startswith("Binary files "):
+                skip_file = True
+                continue
+
+            if line.startswith("@@"):
+                if not flush_hunk():
+                    truncated = True
+                hunk, hunk_size = [line], len(line)
+            elif hunk:
+                hunk.append(line)
+                hunk_size += len(line)
+            else:
+                header.append(line)  # index/mode/---/+++ lines
+
+            # A hunk that can no longer fit is dropped with the rest of its file
+            header_cost = 0 if header_emitted else sum(len(h) for h in header)
+            if cut or used + hunk_size + header_cost > max_bytes:
+                hunk, hunk_size = [], 0
+                skip_file = True
+                truncated = True
+        else:
+            truncated = True  # budget or scan limit reached with output left
+
+        if not flush_hunk():
+            truncated = True
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+        if order_file is not None:
+            os.unlink(order_file.name)
+
+    return "".join(out), shown, truncated
+
+
+def _section(cached, files, max_bytes):
+    if not files:
+        return "(no changes)\n", 0
+
+    # Smallest changes first, so one huge file can't crowd out the rest
+    order = [path for path, added, deleted in sorted(files, key=lambda f: (f[1] or 0) + (f[2] or 0))]
+    text, shown, truncated = stream_diff(cached, max_bytes, order=order)
+    if truncated:
+        hidden = [path for path, added, _ in files
+                  if path not in shown and added is not None and not skip_reason(path)]
+        text += f"… (diff truncated to fit the context budget; {len(hidden)} more files not shown)\n"
+    return text, len(text)
+
+
+def read_diff_context(max_tokens=1500):
+    """
+    Overview plus staged and unstaged diffs, within roughly max_tokens.
+
+    Returns:
+        str: Prompt-ready diff context
+    """
+    key = None
+    try:
+        repo = get_repo()
+        if repo is None:
+            return "Not a git repository."
+        key = (repo.git_dir, repo.state_key(), max_tokens)
+    except (GitReaderError, OSError):
+        pass  # uncached
+
+    if key is not None:
+        with _cache_lock:
+            if key in _cache:
+                return _cache[key]
+
+    budget = max_tokens * CHARS_PER_TOKEN
+    staged_files, unstaged_files = numstat(cached=True), numstat()
+    overview = f"--- Diff Overview (staged) ---\n{format_overview(staged_files)}" \
+               f"--- Diff Overview (unstaged) ---\n{format_overview(unstaged_files)}"
+    remaining = max(budget - len(overview), 0)
+
+    # Staged changes get half of the rest, whatever they leave goes to unstaged
+    staged, used = _section(True, staged_files, remaining // 2)
+    unstaged, _ = _section(False, unstaged_files, remaining - used)
+
+    context = f"{overview}\n--- Staged Changes ---\n{staged}\n--- Unstaged Changes ---\n{unstaged}"
+
+    if key is not None:
+        with _cache_lock:
+            if len(_cache) >= MAX_CACHED:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = context
+    return context
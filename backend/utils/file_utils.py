@@ -1,26 +1,276 @@
 import os
+import re
+import threading
+from collections import deque
 
-def get_file_tree(start_path=".", exclude_dirs=[".git", "__pycache__", "venv", ".venv", "node_modules", ".oracle_data", ".gemini", "brain"]):
+DEFAULT_EXCLUDE_DIRS = (".git", "__pycache__", "venv", ".venv", "node_modules", ".oracle_data", ".gemini", "brain")
+
+# Tree budgets: how deep to descend, how many lines in total, how many files per directory
+MAX_DEPTH = 4
+MAX_ENTRIES = 400
+MAX_FILES_PER_DIR = 25
+
+# Directory listings, validated against the directory's mtime:
+# abs path -> (mtime_ns, sorted subdirectory names, sorted file names)
+_listings = {}
+# Parsed .gitignore files: abs path -> (mtime_ns, rules)
+_ignore_files = {}
+# Entries left after exclusions and .gitignore: abs path -> (validation key, dirs, files)
+_visible = {}
+_cache_lock = threading.Lock()
+
+
+# -----------------------------
+# .gitignore matching
+# -----------------------------
+
+def _glob_to_regex(pattern):
+    """Translate a gitignore glob (with ** support) into a regex body."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return "".join(regex)
+
+
+def parse_gitignore(text):
+    """
+    Parse .gitignore contents.
+
+    Returns:
+        list: (compiled regex, negated, directories only, matches full relative path) per rule
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+        rules.append((re.compile(_glob_to_regex(line) + r"\Z"), negated, dir_only, anchored))
+    return rules
+
+
+def _load_gitignore(directory):
+    """
+    Rules of directory/.gitignore, re-parsed only when the file changes.
+
+    Returns:
+        tuple: (mtime_ns or None when there is no .gitignore, rules)
+    """
+    path = os.path.join(directory, ".gitignore")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, []
+
+    with _cache_lock:
+        cached = _ignore_files.get(path)
+    if cached and cached[0] == mtime:
+        return cached
+
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            rules = parse_gitignore(f.read())
+    except OSError:
+        rules = []
+    with _cache_lock:
+        _ignore_files[path] = (mtime, rules)
+    return mtime, rules
+
+
+def _is_ignored(rule_sets, rel_path, is_dir):
+    """
+    Args:
+        rule_sets: [(base relative path, rules, mtime)] from the outermost .gitignore inwards
+        rel_path: Path relative to the tree root, "/"-separated
+    """
+    ignored = False
+    name = rel_path.rsplit("/", 1)[-1]
+    for base, rules, _ in rule_sets:
+        if base and not rel_path.startswith(base + "/"):
+            continue
+        local = rel_path[len(base) + 1:] if base else rel_path
+        for regex, negated, dir_only, anchored in rules:
+            if dir_only and not is_dir:
+                continue
+            # Last matching rule wins
+            if regex.match(local if anchored else name):
+                ignored = not negated
+    return ignored
+
+
+# -----------------------------
+# Tree
+# -----------------------------
+
+def _list_dir(path):
+    """
+    Sorted (mtime, subdirectories, files) of path, from cache while the
+    directory's mtime is unchanged (entries added, removed or renamed bump it).
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, [], []
+
+    with _cache_lock:
+        cached = _listings.get(path)
+    if cached and cached[0] == mtime:
+        return cached
+
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                (dirs if is_dir else files).append(entry.name)
+    except OSError:
+        return None, [], []
+    dirs.sort()
+    files.sort()
+
+    with _cache_lock:
+        _listings[path] = (mtime, dirs, files)
+    return mtime, dirs, files
+
+
+def _visible_entries(path, rel, rule_sets, exclude):
+    """
+    (subdirectories, files) of path that are neither excluded nor ignored.
+    Cached while the directory and every .gitignore in effect are unchanged.
+    """
+    mtime, dirs, files = _list_dir(path)
+    key = (mtime, tuple((base, ignore_mtime) for base, _, ignore_mtime in rule_sets), exclude)
+    with _cache_lock:
+        cached = _visible.get(path)
+    if cached and cached[0] == key:
+        return cached[1], cached[2]
+
+    dirs = [d for d in dirs if d not in exclude and not _is_ignored(rule_sets, _join(rel, d), True)]
+    files = [f for f in files if not _is_ignored(rule_sets, _join(rel, f), False)]
+    with _cache_lock:
+        _visible[path] = (key, dirs, files)
+    return dirs, files
+
+
+def get_file_tree(start_path=".", exclude_dirs=None, max_depth=MAX_DEPTH,
+                  max_entries=MAX_ENTRIES, max_files_per_dir=MAX_FILES_PER_DIR):
     """
     Generates a string representation of the file directory tree.
-    
+
+    Honors .gitignore files (including nested ones). The line budget is
+    spent breadth-first, so every top-level directory shows up before any
+    one subtree is listed in full; directories past max_depth or the budget
+    are collapsed into a count, and files beyond max_files_per_dir into
+    "… N more files". Directory listings are cached and re-read only when a
+    directory's mtime changes.
+
     Args:
         start_path (str): The directory to start the tree from. Defaults to ".".
-        exclude_dirs (list): List of directory names to exclude from the tree.
-        
+        exclude_dirs (iterable): Directory names to exclude from the tree.
+            Defaults to DEFAULT_EXCLUDE_DIRS.
+        max_depth (int): Levels below start_path to expand.
+        max_entries (int): Approximate maximum number of lines in the tree.
+        max_files_per_dir (int): Files listed per directory before collapsing.
+
     Returns:
         str: A string representing the file tree.
     """
-    tree_str = ""
-    for root, dirs, files in os.walk(start_path):
-        # Filter out excluded directories
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        
-        level = root.replace(start_path, '').count(os.sep)
-        indent = ' ' * 4 * (level)
-        tree_str += '{}{}/\n'.format(indent, os.path.basename(root))
-        subindent = ' ' * 4 * (level + 1)
-        for f in files:
-            tree_str += '{}{}\n'.format(subindent, f)
-            
-    return tree_str
+    exclude = frozenset(DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else exclude_dirs)
+    expanded = {}    # rel path -> (subdirectory names, file names)
+    collapsed = {}   # rel path -> (file count, dir count)
+
+    # Breadth-first: decide which directories fit in the budget
+    queue = deque([(os.path.abspath(start_path), "", 0, [])])
+    remaining = max_entries - 1  # the root line
+    while queue and remaining > 0:
+        path, rel, level, rule_sets = queue.popleft()
+        ignore_mtime, rules = _load_gitignore(path)
+        if rules:
+            rule_sets = rule_sets + [(rel, rules, ignore_mtime)]
+
+        dirs, files = _visible_entries(path, rel, rule_sets, exclude)
+
+        # Lines this directory adds: its files (capped) and one line per subdirectory
+        cost = min(len(files), max_files_per_dir) + (len(files) > max_files_per_dir) + len(dirs)
+        if rel and (level >= max_depth or cost > remaining):
+            collapsed[rel] = (len(files), len(dirs))
+            continue
+
+        remaining -= cost
+        expanded[rel] = (dirs, files)
+        for d in dirs:
+            queue.append((os.path.join(path, d), _join(rel, d), level + 1, rule_sets))
+
+    # Depth-first: render in the usual tree order
+    lines = []
+
+    def render(rel, name, level):
+        indent = " " * 4 * level
+        if rel in collapsed:
+            file_count, dir_count = collapsed[rel]
+            if file_count or dir_count:
+                lines.append(f"{indent}{name}/ (… {file_count} files, {dir_count} dirs)")
+            else:
+                lines.append(f"{indent}{name}/")
+            return
+        if rel not in expanded:
+            lines.append(f"{indent}{name}/ …")
+            return
+
+        dirs, files = expanded[rel]
+        lines.append(f"{indent}{name}/")
+        subindent = " " * 4 * (level + 1)
+        for f in files[:max_files_per_dir]:
+            lines.append(f"{subindent}{f}")
+        if len(files) > max_files_per_dir:
+            lines.append(f"{subindent}… {len(files) - max_files_per_dir} more files")
+        for d in dirs:
+            render(_join(rel, d), d, level + 1)
+
+    render("", os.path.basename(start_path), 0)
+    return "\n".join(lines) + "\n"
+
+
+def _join(rel, name):
+    return f"{rel}/{name}" if rel else name
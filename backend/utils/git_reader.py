@@ -0,0 +1,548 @@
+"""
+In-process access to the local git repository.
+
+utils/git_utils.py used to fork a `git` process for every question. Most
+answers can be read straight from .git instead:
+
+- HEAD, branches and refs are plain files (plus packed-refs)
+- the index (.git/index) lists every tracked path with its blob sha and
+  the stat data git uses to spot modified files
+- objects (commits, trees, blobs) are read through ONE long-lived
+  `git cat-file --batch` process per repository
+
+Results are cached on HEAD, the index file's stat and the stat of the
+tracked files, so asking for the same context twice costs no fork at all.
+Anything this module cannot handle raises GitReaderError and the caller
+falls back to the git CLI.
+"""
+
+import atexit
+import difflib
+import hashlib
+import os
+import struct
+import subprocess
+import threading
+
+# Bytes sniffed to tell text from binary, like git does
+BINARY_SNIFF_BYTES = 8000
+# Object modes
+MODE_SYMLINK = 0o120000
+MODE_GITLINK = 0o160000
+MODE_TREE = 0o040000
+# Bytes of the function line git appends to a hunk header
+FUNC_CONTEXT_BYTES = 80
+
+
+class GitReaderError(Exception):
+    """The repository uses a format this reader does not support."""
+
+
+def find_git_dir(start=None):
+    """
+    Walk up from start (default: cwd) to the enclosing repository.
+
+    Returns:
+        tuple: (git dir, work tree), or (None, None) outside a repository
+    """
+    path = os.path.abspath(start or os.getcwd())
+    while True:
+        candidate = os.path.join(path, ".git")
+        if os.path.isdir(candidate):
+            return candidate, path
+        if os.path.isfile(candidate):
+            # Worktrees and submodules: ".git" is a file pointing at the real git dir
+            with open(candidate, "r", encoding="utf-8") as f:
+                line = f.read().strip()
+            if line.startswith("gitdir:"):
+                git_dir = line[len("gitdir:"):].strip()
+                return os.path.normpath(os.path.join(path, git_dir)), path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None, None
+        path = parent
+
+
+def _is_binary(data):
+    return b"\0" in data[:BINARY_SNIFF_BYTES]
+
+
+def _func_context(lines, start):
+    """
+    The hunk header suffix git adds by default: the closest line above the
+    hunk (old side, start is 1-based) beginning with a letter, "_" or "$".
+    """
+    for line in reversed(lines[:max(start - 1, 0)]):
+        if line[:1].isalpha() and line[:1].isascii() or line[:1] in ("_", "$"):
+            head = line.encode("utf-8")[:FUNC_CONTEXT_BYTES].decode("utf-8", "ignore")
+            return " " + head.rstrip()
+    return ""
+
+
+def blob_sha(data):
+    """Git blob sha of some content."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class GitRepo:
+    def __init__(self, git_dir, work_tree):
+        self.git_dir = git_dir
+        self.work_tree = work_tree
+        self.common_dir = git_dir
+        commondir_file = os.path.join(git_dir, "commondir")
+        if os.path.isfile(commondir_file):
+            with open(commondir_file, "r", encoding="utf-8") as f:
+                self.common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+        self._check_format()
+
+        self._lock = threading.RLock()
+        self._batch = None
+        self._index = (None, [])        # (index stat key, entries)
+        self._head_files = (None, {})   # (head sha, {path: (mode, sha)})
+        self._diff = (None, None)       # (cache key, (staged, unstaged))
+        self._recent = (None, set())    # ((head sha, commits, max paths), paths)
+
+    def _check_format(self):
+        config = os.path.join(self.common_dir, "config")
+        try:
+            with open(config, "r", encoding="utf-8") as f:
+                text = f.read().lower()
+        except OSError:
+            return
+        if "objectformat" in text and "sha256" in text:
+            raise GitReaderError("SHA-256 repositories are not supported")
+
+    # -----------------------------
+    # Refs
+    # -----------------------------
+
+    def _read_ref(self, ref):
+        for base in (self.git_dir, self.common_dir):
+            try:
+                with open(os.path.join(base, ref), "r", encoding="utf-8") as f:
+                    return f.read().strip()
+            except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                continue
+        try:
+            with open(os.path.join(self.common_dir, "packed-refs"), "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("#") or line.startswith("^"):
+                        continue
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        except FileNotFoundError:
+            pass
+        return None
+
+    def head(self):
+        """
+        Returns:
+            tuple: (branch name or None when detached, commit sha or None on an unborn branch)
+        """
+        value = self._read_ref("HEAD")
+        branch = None
+        # Follow symbolic refs (HEAD -> refs/heads/main)
+        for _ in range(5):
+            if value is None or not value.startswith("ref:"):
+                break
+            ref = value[len("ref:"):].strip()
+            if branch is None and ref.startswith("refs/heads/"):
+                branch = ref[len("refs/heads/"):]
+            value = self._read_ref(ref)
+        return branch, value
+
+    # -----------------------------
+    # Index
+    # -----------------------------
+
+    def _index_path(self):
+        return os.path.join(self.git_dir, "index")
+
+    def index_key(self):
+        try:
+            st = os.stat(self._index_path())
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def index_entries(self):
+        """
+        Parsed index entries, re-read only when the index file changes.
+
+        Returns:
+            list: (path, sha, mode, stage, mtime_sec, mtime_nsec, size) in index order
+        """
+        key = self.index_key()
+        with self._lock:
+            if key is not None and self._index[0] == key:
+                return self._index[1]
+            entries = self._parse_index() if key is not None else []
+            self._index = (key, entries)
+            return entries
+
+    def _parse_index(self):
+        with open(self._index_path(), "rb") as f:
+            data = f.read()
+
+        if data[:4] != b"DIRC":
+            raise GitReaderError("Unrecognized index file")
+        version, count = struct.unpack(">II", data[4:12])
+        if version not in (2, 3, 4):
+            raise GitReaderError(f"Unsupported index version {version}")
+
+        entries = []
+        offset = 12
+        previous = b""
+        for _ in range(count):
+            start = offset
+            (_, _, mtime_sec, mtime_nsec, _, _, mode, _, _, size) = struct.unpack(">10I", data[offset:offset + 40])
+            sha = data[offset + 40:offset + 60].hex()
+            flags, = struct.unpack(">H", data[offset + 60:offset + 62])
+            offset += 62
+            if version >= 3 and flags & 0x4000:
+                offset += 2  # extended flags
+
+            if version == 4:
+                # Path is prefix-compressed against the previous entry
+                strip, shift = 0, 0
+                while True:
+                    byte = data[offset]
+                    offset += 1
+                    strip = (strip << 7) | (byte & 0x7F) if shift else byte & 0x7F
+                    if not byte & 0x80:
+                        break
+                    strip += 1
+                    shift += 1
+                end = data.index(b"\0", offset)
+                name = previous[:len(previous) - strip] + data[offset:end]
+                offset = end + 1
+            else:
+                end = data.index(b"\0", offset)
+                name = data[offset:end]
+                # Entries are NUL-padded to a multiple of 8 bytes
+                offset = start + ((end - start + 8) & ~7)
+            previous = name
+
+            if mode == MODE_TREE:
+                raise GitReaderError("Sparse indexes are not supported")
+            stage = (flags >> 12) & 0x3
+            entries.append((name.decode("utf-8", "surrogateescape"), sha, mode, stage, mtime_sec, mtime_nsec, size))
+
+        # A split index keeps most entries in a shared file
+        while offset + 8 <= len(data) - 20:
+            signature = data[offset:offset + 4]
+            ext_size, = struct.unpack(">I", data[offset + 4:offset + 8])
+            if signature == b"link":
+                raise GitReaderError("Split indexes are not supported")
+            offset += 8 + ext_size
+
+        return entries
+
+    def ls_files(self):
+        """Tracked paths, like `git ls-files`."""
+        paths = []
+        for entry in self.index_entries():
+            if not paths or paths[-1] != entry[0]:
+                paths.append(entry[0])
+        return paths
+
+    # -----------------------------
+    # Objects
+    # -----------------------------
+
+    def read_object(self, sha):
+        """
+        Read an object through the persistent `git cat-file --batch` process.
+
+        Returns:
+            tuple: (type, content bytes)
+        """
+        with self._lock:
+            if self._batch is None or self._batch.poll() is not None:
+                try:
+                    self._batch = subprocess.Popen(
+                        ["git", "cat-file", "--batch"], cwd=self.work_tree,
+                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                    )
+                except FileNotFoundError:
+                    raise GitReaderError("git not found")
+
+            try:
+                self._batch.stdin.write(sha.encode("ascii") + b"\n")
+                self._batch.stdin.flush()
+                header = self._batch.stdout.readline().split()
+                if len(header) != 3:
+                    raise GitReaderError(f"Object {sha} missing")
+                kind, size = header[1].decode("ascii"), int(header[2])
+                content = self._batch.stdout.read(size + 1)[:size]
+            except (OSError, ValueError) as e:
+                self.close()
+                raise GitReaderError(f"git cat-file failed: {e}")
+        return kind, content
+
+    def _tree_entries(self, tree_sha):
+        """{name: (mode, sha)} of one tree object."""
+        _, content = self.read_object(tree_sha)
+        entries = {}
+        offset = 0
+        while offset < len(content):
+            space = content.index(b" ", offset)
+            nul = content.index(b"\0", space)
+            mode = int(content[offset:space], 8)
+            name = content[space + 1:nul].decode("utf-8", "surrogateescape")
+            entries[name] = (mode, content[nul + 1:nul + 21].hex())
+            offset = nul + 21
+        return entries
+
+    def _tree_files(self, tree_sha, prefix, files):
+        for name, (mode, sha) in self._tree_entries(tree_sha).items():
+            if mode == MODE_TREE:
+                self._tree_files(sha, f"{prefix}{name}/", files)
+            else:
+                files[prefix + name] = (mode, sha)
+
+    def _commit(self, sha):
+        """(tree sha, first parent sha or None) of a commit."""
+        _, content = self.read_object(sha)
+        tree, parent = None, None
+        for line in content.split(b"\n"):
+            if not line:
+                break  # end of headers
+            if line.startswith(b"tree "):
+                tree = line[5:].decode("ascii")
+            elif line.startswith(b"parent ") and parent is None:
+                parent = line[7:].decode("ascii")
+        return tree, parent
+
+    def _changed_paths(self, old_tree, new_tree, prefix, paths):
+        """Paths that differ between two trees; identical subtrees are skipped unread."""
+        old = self._tree_entries(old_tree) if old_tree else {}
+        new = self._tree_entries(new_tree) if new_tree else {}
+        for name in old.keys() | new.keys():
+            old_mode, old_sha = old.get(name, (None, None))
+            new_mode, new_sha = new.get(name, (None, None))
+            if old_sha == new_sha:
+                continue
+            old_sub = old_sha if old_mode == MODE_TREE else None
+            new_sub = new_sha if new_mode == MODE_TREE else None
+            if old_sub or new_sub:
+                self._changed_paths(old_sub, new_sub, f"{prefix}{name}/", paths)
+            if (old_sha and not old_sub) or (new_sha and not new_sub):
+                paths.add(prefix + name)
+
+    def recent_paths(self, head_sha, commits=5, max_paths=500):
+        """
+        Paths touched by the last few first-parent commits, cached per HEAD.
+        The root commit and bulk commits (more than max_paths files, e.g. a
+        reformat or vendoring) say nothing about where work is happening
+        and are left out.
+
+        Returns:
+            set: "/"-separated paths
+        """
+        key = (head_sha, commits, max_paths)
+        with self._lock:
+            if self._recent[0] == key:
+                return self._recent[1]
+
+        paths = set()
+        sha = head_sha
+        for _ in range(commits):
+            if not sha:
+                break
+            tree, parent = self._commit(sha)
+            if not parent:
+                break
+            changed = set()
+            self._changed_paths(self._commit(parent)[0], tree, "", changed)
+            if len(changed) <= max_paths:
+                paths |= changed
+            sha = parent
+
+        with self._lock:
+            self._recent = (key, paths)
+        return paths
+
+    def head_files(self, head_sha):
+        """{path: (mode, sha)} of the HEAD commit, cached per commit."""
+        with self._lock:
+            if self._head_files[0] == head_sha:
+                return self._head_files[1]
+
+        files = {}
+        if head_sha:
+            self._tree_files(self._commit(head_sha)[0], "", files)
+
+        with self._lock:
+            self._head_files = (head_sha, files)
+        return files
+
+    # -----------------------------
+    # Diffs
+    # -----------------------------
+
+    def _worktree_candidates(self):
+        """
+        Tracked files whose stat no longer matches the index. Racily clean
+        files (modified in the same second the index was written) are
+        included too; their content is hashed before they count as changed.
+        """
+        key = self.index_key()
+        index_mtime = key[0] // 1_000_000_000 if key else 0
+        candidates = []
+        for path, sha, mode, stage, mtime_sec, mtime_nsec, size in self.index_entries():
+            if stage != 0 or mode == MODE_GITLINK:
+                continue
+            try:
+                st = os.lstat(os.path.join(self.work_tree, path))
+            except OSError:
+                candidates.append((path, None, None))
+                continue
+            same_time = st.st_mtime_ns // 1_000_000_000 == mtime_sec and (
+                mtime_nsec == 0 or st.st_mtime_ns % 1_000_000_000 == mtime_nsec
+            )
+            if not same_time or st.st_size % 2 ** 32 != size or mtime_sec >= index_mtime:
+                candidates.append((path, st.st_mtime_ns, st.st_size))
+        return candidates
+
+    def _worktree_content(self, path, mode):
+        full = os.path.join(self.work_tree, path)
+        if mode == MODE_SYMLINK:
+            return os.readlink(full).encode("utf-8", "surrogateescape")
+        with open(full, "rb") as f:
+            return f.read()
+
+    def state_key(self):
+        """
+        Changes whenever `git diff` / `git diff --cached` output could change:
+        a new HEAD, a rewritten index or a tracked file whose stat moved.
+        """
+        _, head_sha = self.head()
+        return head_sha, self.index_key(), tuple(self._worktree_candidates())
+
+    def diff(self):
+        """
+        Staged (index vs HEAD) and unstaged (work tree vs index) diffs in
+        `git diff` format, cached until HEAD, the index or a tracked file changes.
+
+        Returns:
+            tuple: (staged diff, unstaged diff)
+        """
+        key = self.state_key()
+        head_sha, _, candidates = key
+        with self._lock:
+            if self._diff[0] == key:
+                return self._diff[1]
+
+        staged_index = {entry[0]: (entry[2], entry[1]) for entry in self.index_entries() if entry[3] == 0}
+
+        staged = []
+        head_files = self.head_files(head_sha)
+        for path in sorted(set(head_files) | set(staged_index)):
+            old, new = head_files.get(path), staged_index.get(path)
+            if (old and old[0] == MODE_GITLINK) or (new and new[0] == MODE_GITLINK):
+                continue  # submodules
+            if old != new:
+                staged.append(self._render(path, old, new, worktree=False))
+
+        unstaged = []
+        for path, _, _ in sorted(candidates):
+            mode, sha = staged_index[path]
+            if not os.path.lexists(os.path.join(self.work_tree, path)):
+                unstaged.append(self._render(path, (mode, sha), None, worktree=True))
+                continue
+            content = self._worktree_content(path, mode)
+            new_sha = blob_sha(content)
+            if new_sha != sha:
+                unstaged.append(self._render(path, (mode, sha), (mode, new_sha), worktree=True, new_content=content))
+
+        result = ("".join(staged), "".join(unstaged))
+        with self._lock:
+            self._diff = (key, result)
+        return result
+
+    def _render(self, path, old, new, worktree, new_content=None):
+        """One file's diff in `git diff` format (hunks computed with difflib)."""
+        lines = [f"diff --git a/{path} b/{path}\n"]
+        old_sha = old[1][:7] if old else "0000000"
+        new_sha = new[1][:7] if new else "0000000"
+        if old is None:
+            lines.append(f"new file mode {new[0]:06o}\n")
+            lines.append(f"index {old_sha}..{new_sha}\n")
+        elif new is None:
+            lines.append(f"deleted file mode {old[0]:06o}\n")
+            lines.append(f"index {old_sha}..{new_sha}\n")
+        elif old[0] != new[0]:
+            lines.append(f"old mode {old[0]:06o}\nnew mode {new[0]:06o}\n")
+            if old[1] == new[1]:
+                return "".join(lines)
+            lines.append(f"index {old_sha}..{new_sha}\n")
+        else:
+            lines.append(f"index {old_sha}..{new_sha} {old[0]:06o}\n")
+
+        a = self.read_object(old[1])[1] if old else b""
+        if new is None:
+            b = b""
+        elif new_content is not None:
+            b = new_content
+        else:
+            b = self.read_object(new[1])[1]
+
+        if _is_binary(a) or _is_binary(b):
+            a_name = f"a/{path}" if old else "/dev/null"
+            b_name = f"b/{path}" if new else "/dev/null"
+            lines.append(f"Binary files {a_name} and {b_name} differ\n")
+            return "".join(lines)
+
+        lines.append(f"--- a/{path}\n" if old else "--- /dev/null\n")
+        lines.append(f"+++ b/{path}\n" if new else "+++ /dev/null\n")
+        a_lines = a.decode("utf-8", "replace").splitlines(keepends=True)
+        b_lines = b.decode("utf-8", "replace").splitlines(keepends=True)
+        for line in list(difflib.unified_diff(a_lines, b_lines, n=3))[2:]:
+            if line.startswith("@@ "):
+                start = int(line[4:line.index(" ", 4)].split(",")[0])
+                line = line.rstrip("\n") + _func_context(a_lines, start) + "\n"
+            lines.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+        return "".join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._batch is not None:
+                try:
+                    self._batch.stdin.close()
+                    self._batch.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    self._batch.kill()
+                self._batch = None
+
+
+_repos = {}
+_repos_lock = threading.Lock()
+
+
+def get_repo(start=None):
+    """
+    The GitRepo enclosing start (default: cwd), shared per repository.
+
+    Returns:
+        GitRepo or None: None outside a git repository
+
+    Raises:
+        GitReaderError: If the repository format is not supported
+    """
+    git_dir, work_tree = find_git_dir(start)
+    if git_dir is None:
+        return None
+    with _repos_lock:
+        repo = _repos.get(git_dir)
+        if repo is None:
+            repo = GitRepo(git_dir, work_tree)
+            _repos[git_dir] = repo
+        return repo
+
+
+@atexit.register
+def _close_all():
+    for repo in list(_repos.values()):
+        repo.close()
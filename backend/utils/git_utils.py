@@ -1,8 +1,30 @@
 import subprocess
-import os
+
+from utils.git_reader import get_repo, find_git_dir, GitReaderError
+from utils.project_summary import summarize_project, PROJECT_SUMMARY_TOKENS
+
+# HEAD sha -> `git show HEAD` output
+_last_commit_diff = (None, None)
+
+
+def _repo():
+    """The in-process reader (utils/git_reader.py), or None to use the git CLI."""
+    try:
+        return get_repo()
+    except (GitReaderError, OSError):
+        return None
+
 
 def get_git_diff():
     """Returns the current unstaged and staged diff of the repository."""
+    repo = _repo()
+    if repo is not None:
+        try:
+            staged, unstaged = repo.diff()
+            return f"--- Staged Changes ---\n{staged}\n\n--- Unstaged Changes ---\n{unstaged}"
+        except (GitReaderError, OSError):
+            pass  # fall back to the git CLI
+
     try:
         # Get staged changes
         staged = subprocess.check_output(["git", "diff", "--cached"], stderr=subprocess.STDOUT).decode("utf-8")
@@ -14,38 +36,41 @@ def get_git_diff():
 
 def get_last_commit_diff():
     """Returns the diff of the last commit."""
+    global _last_commit_diff
+    repo = _repo()
+    head_sha = repo.head()[1] if repo is not None else None
+    if head_sha and _last_commit_diff[0] == head_sha:
+        return _last_commit_diff[1]
+
     try:
-        return subprocess.check_output(["git", "show", "HEAD"], stderr=subprocess.STDOUT).decode("utf-8")
+        diff = subprocess.check_output(["git", "show", "HEAD"], stderr=subprocess.STDOUT).decode("utf-8")
     except (subprocess.CalledProcessError, FileNotFoundError):
         return "No commits found or not a git repository."
+    if head_sha:
+        _last_commit_diff = (head_sha, diff)
+    return diff
 
-def get_project_summary():
-    """Returns a summary of the project structure (files)."""
-    try:
-        # List files, ignoring .git and common ignores
-        files = subprocess.check_output(["git", "ls-files"], stderr=subprocess.STDOUT).decode("utf-8")
-        return f"--- Project Files ---\n{files}"
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # Fallback to os.walk if not a git repo
-        summary = []
-        for root, dirs, filenames in os.walk("."):
-            if ".git" in dirs:
-                dirs.remove(".git")
-            if ".oracle_data" in dirs:
-                dirs.remove(".oracle_data")
-            for f in filenames:
-                summary.append(os.path.join(root, f))
-        return "\n".join(summary)
+def get_project_summary(max_tokens=PROJECT_SUMMARY_TOKENS):
+    """
+    Returns a summary of the project structure: directories with file
+    counts, sizes and languages, expanded down to the changed files
+    (utils/project_summary.py), within roughly max_tokens.
+    """
+    return f"--- Project Files ---\n{summarize_project(max_tokens)}"
 
 def is_git_repo():
     """Checks if the current directory is inside a git repository."""
-    try:
-        subprocess.check_output(["git", "rev-parse", "--is-inside-work-tree"], stderr=subprocess.STDOUT)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+    # Looks for .git in the current directory and its parents, no fork
+    git_dir, _ = find_git_dir()
+    return git_dir is not None
 def get_current_branch():
     """Returns the name of the current git branch."""
+    repo = _repo()
+    if repo is not None:
+        branch, _ = repo.head()
+        # Detached HEAD: empty, like `git branch --show-current`
+        return branch or ""
+
     try:
         return subprocess.check_output(["git", "branch", "--show-current"], stderr=subprocess.STDOUT).decode("utf-8").strip()
     except (subprocess.CalledProcessError, FileNotFoundError):
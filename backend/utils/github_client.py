@@ -0,0 +1,174 @@
+"""
+Shared GitHub API client.
+
+All GitHub traffic (issues/PRs, repo analysis, phase verification) goes
+through one requests.Session with a keep-alive connection pool, default
+connect/read timeouts and the auth header set in one place. The client is
+built lazily on first use through utils/clients.py.
+
+GETs are revalidated against the on-disk response cache (utils/http_cache.py)
+with If-None-Match / If-Modified-Since, so unchanged resources cost a 304.
+Listings too large to buffer (recursive trees) are streamed through
+get_parsed(), which caches the parsed result under the response's ETag
+instead of the body.
+"""
+
+import json
+
+from config import (
+    GITHUB_TOKEN, GITHUB_API_URL, GITHUB_CONNECT_TIMEOUT, GITHUB_READ_TIMEOUT, GITHUB_CACHE_ENABLED
+)
+from utils.clients import register_client, get_client
+from utils.http_cache import HTTPCache, cache_key
+
+POOL_SIZE = 16
+
+
+def parse_repo_url(repo_url):
+    """
+    Split https://github.com/owner/repo into (owner, repo).
+
+    Raises:
+        IndexError: If the URL has no owner/repo part
+    """
+    parts = repo_url.rstrip("/").split("/")
+    owner, repo = parts[-2], parts[-1]
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return owner, repo
+
+
+class GitHubClient:
+    def __init__(self, token=GITHUB_TOKEN, base_url=GITHUB_API_URL,
+                 timeout=(GITHUB_CONNECT_TIMEOUT, GITHUB_READ_TIMEOUT),
+                 use_cache=GITHUB_CACHE_ENABLED):
+        # requests is imported here so importing this module stays cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.has_token = bool(token)
+        self.cache = HTTPCache() if use_cache else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.session.headers.update({
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "execution_orecal"
+        })
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+
+    def url(self, path):
+        """Absolute URL for an API path ("/repos/...") or a full URL."""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def _conditional(self, url, headers, variant=""):
+        """Cache key and entry for url, adding the revalidation headers of the entry to headers."""
+        accept = headers.get("Accept", self.session.headers.get("Accept"))
+        key = cache_key(f"{url}#{variant}" if variant else url, accept, self.session.headers.get("Authorization"))
+
+        cached = self.cache.lookup(key)
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return key, cached
+
+    def get(self, path, use_cache=True, **kwargs):
+        """
+        GET with conditional revalidation. A 304 is turned into the cached
+        200 response (marked with response.from_cache = True).
+        Streamed downloads and use_cache=False skip the cache.
+        """
+        if self.cache is None or not use_cache or kwargs.get("stream"):
+            return self.request("GET", path, **kwargs)
+
+        url = self.url(path)
+        headers = dict(kwargs.pop("headers", None) or {})
+        key, cached = self._conditional(url, headers)
+
+        response = self.request("GET", url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(key)
+            return self._cached_response(response, cached)
+
+        if response.status_code == 200:
+            self.cache.store(key, url, response.status_code, response.headers, response.content)
+        response.from_cache = False
+        return response
+
+    def get_parsed(self, path, parse, variant="", **kwargs):
+        """
+        Streamed GET whose parsed result is cached instead of the body.
+        parse(response) reads the 200 response into a JSON-serializable
+        value, stored with the response's ETag; a 304 returns the stored
+        value without downloading anything.
+
+        Args:
+            parse: Called with the streamed 200 response
+            variant: Tells apart different parses of the same URL
+
+        Returns:
+            tuple: (parsed value or None, status code)
+        """
+        url = self.url(path)
+        headers = dict(kwargs.pop("headers", None) or {})
+        key, cached = self._conditional(url, headers, variant) if self.cache is not None else (None, None)
+
+        response = self.request("GET", url, headers=headers, stream=True, **kwargs)
+        with response:
+            if response.status_code == 304 and cached:
+                self.cache.touch(key)
+                return json.loads(cached["body"]), 200
+            if response.status_code != 200:
+                return None, response.status_code
+            value = parse(response)
+
+        if key is not None:
+            self.cache.store(key, url, 200, response.headers, json.dumps(value).encode("utf-8"))
+        return value, 200
+
+    @staticmethod
+    def _cached_response(live, cached):
+        from requests import Response
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        response = Response()
+        response.status_code = cached["status"]
+        response._content = cached["body"]
+        response.headers = CaseInsensitiveDict(cached["headers"])
+        # Rate-limit headers of the 304 are the current ones
+        for name, value in live.headers.items():
+            if name.lower().startswith("x-ratelimit"):
+                response.headers[name] = value
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = live.url
+        response.request = live.request
+        response.reason = "OK (cached)"
+        response.from_cache = True
+        return response
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+
+register_client("github", GitHubClient)
+
+
+def get_github():
+    """The shared GitHubClient."""
+    return get_client("github")
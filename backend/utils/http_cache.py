@@ -0,0 +1,137 @@
+"""
+On-disk conditional-request cache for GitHub GET responses.
+
+Responses that carry an ETag or Last-Modified header are stored in
+.oracle_data/github_cache.sqlite3. The next GET for the same URL sends
+If-None-Match / If-Modified-Since; a 304 is answered from the stored body
+and does not count against GitHub's rate limit. The file is kept under a
+byte budget by evicting the least recently used entries.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from config import GITHUB_CACHE_MAX_BYTES
+from state.store import STORAGE_DIR
+from state.sqlite_util import connect, evict_lru
+
+CACHE_FILE = STORAGE_DIR / "github_cache.sqlite3"
+
+# Only these response headers are worth replaying from the cache
+_KEPT_HEADERS = ("content-type", "etag", "last-modified", "link")
+
+
+def cache_key(url, accept, auth):
+    """Entries differ per URL, representation and credentials."""
+    identity = hashlib.sha256((auth or "").encode("utf-8")).hexdigest()[:16]
+    return hashlib.sha256(f"{url}\n{accept}\n{identity}".encode("utf-8")).hexdigest()
+
+
+class HTTPCache:
+    def __init__(self, path=CACHE_FILE, max_bytes=GITHUB_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self._disabled = False
+
+    def _db(self):
+        if self._conn is not None or self._disabled:
+            return self._conn
+
+        try:
+            conn = connect(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache ("
+                " key TEXT PRIMARY KEY,"
+                " url TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " status INTEGER NOT NULL,"
+                " headers TEXT NOT NULL,"
+                " body BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_used ON http_cache(last_used)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️  Warning: GitHub response cache disabled: {e}")
+            self._disabled = True
+
+        return self._conn
+
+    def lookup(self, key):
+        """
+        Returns:
+            dict or None: {"etag", "last_modified", "status", "headers", "body"}
+        """
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT etag, last_modified, status, headers, body FROM http_cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+
+        if row is None:
+            return None
+        etag, last_modified, status, headers, body = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "status": status,
+            "headers": json.loads(headers),
+            "body": bytes(body)
+        }
+
+    def touch(self, key):
+        """Mark an entry as used (after a 304)."""
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                conn.execute("UPDATE http_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def store(self, key, url, status, headers, body):
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+        # A single response larger than the whole budget is not worth keeping
+        if len(body) > self.max_bytes // 4:
+            return
+
+        kept = {name: headers[name] for name in _KEPT_HEADERS if name in headers}
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                old = conn.execute("SELECT size FROM http_cache WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO http_cache"
+                    " (key, url, etag, last_modified, status, headers, body, size, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, etag, last_modified, status, json.dumps(kept), body, len(body), time.time())
+                )
+                self._total_bytes += len(body) - (old[0] if old else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._total_bytes = evict_lru(conn, "http_cache", self._total_bytes, self.max_bytes)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Warning: Failed to write GitHub response cache: {e}")
+
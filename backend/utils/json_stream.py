@@ -0,0 +1,115 @@
+"""
+Incremental reader for large JSON objects.
+
+GitHub's recursive tree response for a big monorepo is tens of megabytes
+of {"sha", "tree": [...], "truncated"}. iter_array_items() walks such a
+document chunk by chunk and yields the items of one top-level array as
+they complete, so memory stays bounded by the chunk size plus one item.
+Top-level scalar members are collected into a dict on the side.
+"""
+
+import codecs
+import json
+
+WHITESPACE = " \t\r\n"
+
+
+class _Reader:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder(strict=False)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """Append the next chunk to the buffer. Returns False at end of input."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if chunk:
+                # Drop what has been consumed so the buffer does not grow
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, got '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks, key, meta=None):
+    """
+    Yield the items of the array stored under `key` in a top-level object.
+
+    Args:
+        chunks: Iterable of bytes or str chunks (e.g. response.iter_content())
+        key: Name of the top-level member holding the array
+        meta: Optional dict that receives every other top-level member
+
+    Raises:
+        ValueError: If the input is not a JSON object
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            value = reader.value()
+            if meta is not None:
+                meta[name] = value
+
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
@@ -0,0 +1,309 @@
+"""
+Compact, directory-aggregated project summary for prompts.
+
+get_project_summary() used to paste the raw `git ls-files` output into
+the prompt, which for a big monorepo is megabytes. summarize_project()
+instead collapses the file list into a directory hierarchy:
+
+    src/ — 1,204 files, 8.1 MB; Python 71%, TypeScript 22%
+
+Structure near the root is always shown, but only "hot" directories are
+expanded further, down to the changed files themselves: files with
+staged or unstaged changes, or touched by the last few commits. The
+output never exceeds its token budget; directories that don't fit stay
+collapsed into their parent's counts.
+
+Everything is computed in a single pass over the git index (file sizes
+come from the index's stat data, no file is opened) and cached on the
+repository state.
+"""
+
+import heapq
+import os
+import posixpath
+import subprocess
+import threading
+
+from utils.context import CHARS_PER_TOKEN
+from utils.git_reader import get_repo, GitReaderError, MODE_GITLINK
+
+PROJECT_SUMMARY_TOKENS = 1000
+# Directory levels listed even when nothing in them changed
+BASE_DEPTH = 2
+# Subdirectories listed per directory before "… N more directories"
+MAX_DIRS_PER_DIR = 8
+# Changed files listed per hot directory
+MAX_HOT_FILES_PER_DIR = 10
+# Commits whose files count as recently changed
+RECENT_COMMITS = 5
+# Languages named per directory, and the smallest share worth naming
+MAX_LANGUAGES = 3
+MIN_LANGUAGE_SHARE = 0.05
+
+WALK_EXCLUDE_DIRS = (".git", "__pycache__", "venv", ".venv", "node_modules", ".oracle_data")
+
+LANGUAGES = {
+    'py': 'Python', 'js': 'JavaScript', 'jsx': 'JavaScript', 'mjs': 'JavaScript', 'cjs': 'JavaScript',
+    'ts': 'TypeScript', 'tsx': 'TypeScript', 'java': 'Java', 'kt': 'Kotlin', 'go': 'Go', 'rs': 'Rust',
+    'rb': 'Ruby', 'php': 'PHP', 'c': 'C', 'h': 'C', 'cc': 'C++', 'cpp': 'C++', 'hpp': 'C++', 'cs': 'C#',
+    'swift': 'Swift', 'scala': 'Scala', 'sh': 'Shell', 'sql': 'SQL', 'html': 'HTML', 'css': 'CSS',
+    'scss': 'CSS', 'vue': 'Vue', 'svelte': 'Svelte', 'md': 'Markdown', 'json': 'JSON',
+    'yml': 'YAML', 'yaml': 'YAML', 'toml': 'TOML', 'proto': 'Protobuf',
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+MAX_CACHED = 4
+
+
+def _language(path):
+    _, ext = posixpath.splitext(path)
+    return LANGUAGES.get(ext[1:].lower())
+
+
+def _count(files):
+    return f"{files:,} file" + ("" if files == 1 else "s")
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+# -----------------------------
+# Aggregation
+# -----------------------------
+
+def _new_dir():
+    return {"files": 0, "bytes": 0, "languages": {}, "dirs": set(), "hot": False, "hot_files": []}
+
+
+def aggregate(entries):
+    """
+    Fold (path, size, hot reason or None) entries into per-directory totals.
+
+    Returns:
+        dict: {dir rel path ("" for the root): totals}; only changed files are kept individually
+    """
+    dirs = {"": _new_dir()}
+    for path, size, reason in entries:
+        parent, _, name = path.rpartition("/")
+        language = _language(name)
+
+        # Walk up through the ancestors, creating (and linking) missing ones
+        node, created = parent, None
+        while True:
+            info = dirs.get(node)
+            is_new = info is None
+            if is_new:
+                info = dirs[node] = _new_dir()
+            if created is not None:
+                info["dirs"].add(created)
+            created = node if is_new else None
+            info["files"] += 1
+            info["bytes"] += size
+            if language:
+                info["languages"][language] = info["languages"].get(language, 0) + size
+            if reason:
+                info["hot"] = True
+            if not node:
+                break
+            node = node.rpartition("/")[0]
+
+        if reason:
+            dirs[parent]["hot_files"].append((name, size, reason))
+    return dirs
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+
+def _languages(info):
+    total = sum(info["languages"].values())
+    if not total:
+        return ""
+    top = sorted(info["languages"].items(), key=lambda item: item[1], reverse=True)[:MAX_LANGUAGES]
+    shares = [f"{name} {size * 100 // total}%" for name, size in top if size / total >= MIN_LANGUAGE_SHARE]
+    return "; " + ", ".join(shares) if shares else ""
+
+
+def _dir_line(name, info):
+    return f"{name}/ — {_count(info['files'])}, {_format_size(info['bytes'])}{_languages(info)}" + \
+           (" *" if info["hot"] else "")
+
+
+def _children(rel, dirs, hot_only):
+    """
+    Lines listed under a directory: its changed files, then its
+    subdirectories (only the changed ones when hot_only).
+
+    Returns:
+        list: (kind, rel path or None, text); kind is "dir", "file" or "more"
+    """
+    info = dirs[rel]
+    lines = []
+    hot_files = sorted(info["hot_files"])
+    for name, size, reason in hot_files[:MAX_HOT_FILES_PER_DIR]:
+        lines.append(("file", None, f"{name} ({_format_size(size)}) [{reason}]"))
+    if len(hot_files) > MAX_HOT_FILES_PER_DIR:
+        lines.append(("more", None, f"… {len(hot_files) - MAX_HOT_FILES_PER_DIR} more changed files"))
+
+    # Changed subtrees first, then the biggest
+    subdirs = sorted(info["dirs"], key=lambda d: (not dirs[d]["hot"], -dirs[d]["files"], d))
+    shown = [d for d in subdirs if dirs[d]["hot"]]
+    if not hot_only:
+        shown += [d for d in subdirs if not dirs[d]["hot"]][:max(MAX_DIRS_PER_DIR - len(shown), 0)]
+    for d in shown:
+        lines.append(("dir", d, _dir_line(d.rpartition("/")[2], dirs[d])))
+    shown_set = set(shown)
+    hidden = [d for d in subdirs if d not in shown_set]
+    if hidden:
+        lines.append(("more", None, f"… {len(hidden)} more directories "
+                                    f"({sum(dirs[d]['files'] for d in hidden):,} files)"))
+    return lines
+
+
+def render(dirs, max_chars, root_name="."):
+    """
+    Render the aggregated tree within max_chars.
+
+    Budget goes first to the root's listing, then to hot directories (at
+    any depth) before the rest of the first BASE_DEPTH levels. Below
+    BASE_DEPTH only the path down to changed files is listed.
+    """
+    root = dirs[""]
+    header = f"{root_name}/ — {_count(root['files'])}, {_format_size(root['bytes'])}{_languages(root)}"
+    legend = "(* = contains changed files)" if root["hot"] else ""
+    remaining = max_chars - len(header) - len(legend) - 2
+    listed = {}  # dir rel path -> child lines that fit
+
+    heap = [(0, 0, 0, "")]
+    while heap and remaining > 0:
+        _, depth, _, rel = heapq.heappop(heap)
+        children = []
+        for kind, child, text in _children(rel, dirs, hot_only=depth >= BASE_DEPTH):
+            cost = 4 * (depth + 1) + len(text) + 1
+            if cost > remaining:
+                remaining = 0
+                break
+            remaining -= cost
+            children.append((kind, child, text))
+            if kind == "dir" and (dirs[child]["hot"] or depth + 1 < BASE_DEPTH):
+                heapq.heappush(heap, (not dirs[child]["hot"], depth + 1, -dirs[child]["files"], child))
+        listed[rel] = children
+
+    lines = [header]
+
+    def walk(rel, depth):
+        for kind, child, text in listed.get(rel, []):
+            lines.append(" " * 4 * depth + text)
+            if kind == "dir":
+                walk(child, depth + 1)
+
+    walk("", 1)
+    if legend:
+        lines.append(legend)
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Sources
+# -----------------------------
+
+def _index_entries(repo, state_key):
+    """(path, size, hot reason) per tracked file, in one pass over the index."""
+    head_sha, _, candidates = state_key
+    head_files = repo.head_files(head_sha)
+    recent = repo.recent_paths(head_sha, RECENT_COMMITS) if head_sha else set()
+    # Tracked files whose stat moved since they were staged
+    modified = {candidate[0] for candidate in candidates}
+
+    for path, sha, mode, stage, _, _, size in repo.index_entries():
+        if stage > 1 or mode == MODE_GITLINK:
+            continue  # one line per conflicted path; submodules have no size
+        if stage == 1:
+            reason = "conflicted"
+        elif path in modified:
+            reason = "modified"
+        elif head_files.get(path, (None, None))[1] != sha:
+            reason = "staged"
+        elif path in recent:
+            reason = "recent"
+        else:
+            reason = None
+        yield path, size, reason
+
+
+def _cli_entries():
+    """`git ls-files` entries when the in-process reader can't be used."""
+    from utils.diff_reader import numstat
+
+    files = subprocess.run(
+        ["git", "-c", "core.quotePath=false", "ls-files"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+    ).stdout.decode("utf-8", "replace").splitlines()
+    staged = {path for path, _, _ in numstat(cached=True)}
+    modified = {path for path, _, _ in numstat()}
+    for path in files:
+        try:
+            size = os.lstat(path).st_size
+        except OSError:
+            size = 0
+        reason = "modified" if path in modified else "staged" if path in staged else None
+        yield path, size, reason
+
+
+def _walk_entries(start):
+    """Every file below start, for directories that are not git repositories."""
+    for root, dirnames, filenames in os.walk(start):
+        dirnames[:] = sorted(d for d in dirnames if d not in WALK_EXCLUDE_DIRS)
+        rel = os.path.relpath(root, start).replace(os.sep, "/")
+        for name in filenames:
+            try:
+                size = os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                size = 0
+            yield (name if rel == "." else f"{rel}/{name}"), size, None
+
+
+def summarize_project(max_tokens=PROJECT_SUMMARY_TOKENS, start="."):
+    """
+    Directory-aggregated summary of the project's files within max_tokens.
+
+    Returns:
+        str: Prompt-ready summary
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    try:
+        repo = get_repo(start)
+    except (GitReaderError, OSError):
+        repo = False  # a repository the reader can't handle
+
+    if repo is None:
+        return render(aggregate(_walk_entries(start)), max_chars)
+
+    if repo:
+        try:
+            state_key = repo.state_key()
+            key = (repo.git_dir, state_key, max_tokens)
+            with _cache_lock:
+                if key in _cache:
+                    return _cache[key]
+            summary = render(aggregate(_index_entries(repo, state_key)), max_chars,
+                             os.path.basename(repo.work_tree) or ".")
+        except (GitReaderError, OSError):
+            repo = False
+        else:
+            with _cache_lock:
+                if len(_cache) >= MAX_CACHED:
+                    _cache.pop(next(iter(_cache)))
+                _cache[key] = summary
+            return summary
+
+    try:
+        return render(aggregate(_cli_entries()), max_chars)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return render(aggregate(_walk_entries(start)), max_chars)
@@ -1,10 +1,17 @@
 """
 Rollback and phase navigation utilities for execution_orecal
 Handles phase history, rollback operations, and phase retry functionality
+
+Every phase completion records a snapshot (state/snapshots.py). Rollback,
+undo, redo and checkout restore one, and push the state they leave onto
+the redo stack, so nothing is thrown away.
 """
 
 from datetime import datetime
-from state.store import STATE, save_state
+from state.store import (STATE, set_value, append_value, delete_value, transaction, phase_history,
+                         count_completed_phases)
+from state.snapshots import (record_phase_snapshot, phase_snapshot, push_redo, pop_redo, restore,
+                             SnapshotError)
 
 
 def record_phase_completion(phase_index, phase_name, commit_sha="", time_spent=""):
@@ -15,14 +22,11 @@ def record_phase_completion(phase_index, phase_name, commit_sha="", time_spent="
         phase_index: Index of the completed phase
         phase_name: Name of the phase
         commit_sha: Git commit SHA (optional)
-        time_spent: Human-readable time spent (e.g., "1h 23m")
+        time_spent: Human-readable time spent (e.g., "1h 23m"); the entry also
+            keeps the duration in seconds for analytics
     """
-    # Initialize phase_history if it doesn't exist (backward compatibility)
-    if "phase_history" not in STATE:
-        STATE["phase_history"] = []
-    
     # Count completed tasks
-    from utils.task_manager import get_tasks
+    from utils.task_manager import get_tasks, get_phase_duration
     tasks = get_tasks(phase_index)
     tasks_completed = sum(1 for task in tasks if task.get("completed", False))
     
@@ -33,25 +37,29 @@ def record_phase_completion(phase_index, phase_name, commit_sha="", time_spent="
         "completed_at": datetime.now().isoformat(),
         "commit_sha": commit_sha,
         "time_spent": time_spent,
+        "duration_seconds": get_phase_duration(phase_index),
         "tasks_completed": tasks_completed,
         "total_tasks": len(tasks)
     }
     
-    STATE["phase_history"].append(history_entry)
-    save_state()
+    # phase_history is created if missing (backward compatibility)
+    append_value(["phase_history"], history_entry)
 
+    # The phase as it was completed, for rollback/undo/checkout
+    record_phase_snapshot(phase_index)
 
-def get_phase_history():
+
+def get_phase_history(completions_only=False):
     """
     Get the phase completion history
     
+    Args:
+        completions_only: Leave out rollback/retry/undo records
+    
     Returns:
         list: Phase history entries
     """
-    if "phase_history" not in STATE:
-        STATE["phase_history"] = []
-    
-    return STATE["phase_history"]
+    return phase_history(completions_only)
 
 
 def rollback_to_phase(phase_index):
@@ -71,39 +79,42 @@ def rollback_to_phase(phase_index):
         # Can't roll back to current or future phase
         return False
     
-    # Clear tasks for phases after the rollback point
-    if "phase_tasks" in STATE:
-        phases_to_clear = list(range(phase_index + 1, STATE["current_phase"] + 1))
-        for p in phases_to_clear:
-            phase_key = str(p)
-            if phase_key in STATE["phase_tasks"]:
-                del STATE["phase_tasks"][phase_key]
-    
-    # Clear time tracking for future phases
-    if "phase_time_tracking" in STATE:
-        phases_to_clear = list(range(phase_index + 1, STATE["current_phase"] + 1))
-        for p in phases_to_clear:
-            phase_key = str(p)
-            if phase_key in STATE["phase_time_tracking"]:
-                del STATE["phase_time_tracking"][phase_key]
-    
-    # Update current phase
-    STATE["current_phase"] = phase_index
-    
-    # Add rollback record to history (for tracking)
-    if "phase_history" not in STATE:
-        STATE["phase_history"] = []
-    
-    STATE["phase_history"].append({
-        "action": "rollback",
-        "rolled_back_to": phase_index,
-        "timestamp": datetime.now().isoformat()
-    })
-    
-    save_state()
+    snapshot = phase_snapshot(phase_index)
+
+    # All of it is written at once
+    try:
+        with transaction():
+            push_redo()
+            if snapshot is not None:
+                restore(snapshot)
+            else:
+                # Sessions from before snapshots: clear the later phases
+                _clear_phases(range(phase_index + 1, STATE["current_phase"] + 1))
+                set_value(["current_phase"], phase_index)
+
+            # Add rollback record to history (for tracking)
+            append_value(["phase_history"], {
+                "action": "rollback",
+                "rolled_back_to": phase_index,
+                "timestamp": datetime.now().isoformat()
+            })
+    except SnapshotError as e:
+        print(f"⚠️  Warning: {e}")
+        return False
+    
     return True
 
 
+def _clear_phases(phase_indexes):
+    """Delete the tasks and time tracking of the given phases."""
+    for p in phase_indexes:
+        phase_key = str(p)
+        if phase_key in STATE.get("phase_tasks", {}):
+            delete_value(["phase_tasks", phase_key])
+        if phase_key in STATE.get("phase_time_tracking", {}):
+            delete_value(["phase_time_tracking", phase_key])
+
+
 def retry_current_phase():
     """
     Reset the current phase to start over
@@ -112,27 +123,19 @@ def retry_current_phase():
         bool: True if successful
     """
     current = STATE.get("current_phase", 0)
-    phase_key = str(current)
-    
-    # Clear tasks for current phase
-    if "phase_tasks" in STATE and phase_key in STATE["phase_tasks"]:
-        del STATE["phase_tasks"][phase_key]
     
-    # Clear time tracking for current phase
-    if "phase_time_tracking" in STATE and phase_key in STATE["phase_time_tracking"]:
-        del STATE["phase_time_tracking"][phase_key]
-    
-    # Add retry record to history
-    if "phase_history" not in STATE:
-        STATE["phase_history"] = []
-    
-    STATE["phase_history"].append({
-        "action": "retry",
-        "phase": current,
-        "timestamp": datetime.now().isoformat()
-    })
+    with transaction():
+        # The abandoned attempt can still be brought back with redo
+        push_redo()
+        _clear_phases([current])
+        
+        # Add retry record to history
+        append_value(["phase_history"], {
+            "action": "retry",
+            "phase": current,
+            "timestamp": datetime.now().isoformat()
+        })
     
-    save_state()
     return True
 
 
@@ -177,25 +180,107 @@ def undo_last_verification():
     if current == 0:
         return False  # Can't undo from first phase
     
-    # Move back one phase
+    # Move back one phase, to the state it was verified in
     previous_phase = current - 1
-    STATE["current_phase"] = previous_phase
+    snapshot = phase_snapshot(previous_phase)
+    try:
+        with transaction():
+            push_redo()
+            if snapshot is not None:
+                restore(snapshot)
+            else:
+                set_value(["current_phase"], previous_phase)
+            
+            # Add undo record to history
+            append_value(["phase_history"], {
+                "action": "undo",
+                "from_phase": current,
+                "to_phase": previous_phase,
+                "timestamp": datetime.now().isoformat()
+            })
+    except SnapshotError as e:
+        print(f"⚠️  Warning: {e}")
+        return False
+    
+    return True
+
+
+def checkout_phase(phase_index):
+    """
+    Restore the session as it was when a phase was completed, without
+    regenerating anything. Works backwards and, after a rollback,
+    forwards.
+    
+    Args:
+        phase_index: Index of a completed phase
+        
+    Returns:
+        bool: True if successful, False if the phase has no snapshot
+    """
+    snapshot = phase_snapshot(phase_index)
+    if snapshot is None:
+        return False
     
-    # Add undo record to history
-    if "phase_history" not in STATE:
-        STATE["phase_history"] = []
+    try:
+        with transaction():
+            push_redo()
+            restore(snapshot)
+            append_value(["phase_history"], {
+                "action": "checkout",
+                "phase": phase_index,
+                "timestamp": datetime.now().isoformat()
+            })
+    except SnapshotError as e:
+        print(f"⚠️  Warning: {e}")
+        return False
     
-    STATE["phase_history"].append({
-        "action": "undo",
-        "from_phase": current,
-        "to_phase": previous_phase,
-        "timestamp": datetime.now().isoformat()
-    })
+    return True
+
+
+def redo():
+    """
+    Return to the state the last rollback/undo/retry/checkout left
+    
+    Returns:
+        bool: True if successful, False if there is nothing to redo
+    """
+    try:
+        with transaction():
+            snapshot = pop_redo()
+            if snapshot is None:
+                return False
+            restore(snapshot)
+            append_value(["phase_history"], {
+                "action": "redo",
+                "phase": STATE.get("current_phase", 0),
+                "timestamp": datetime.now().isoformat()
+            })
+    except SnapshotError as e:
+        print(f"⚠️  Warning: {e}")
+        return False
     
-    save_state()
     return True
 
 
+def can_redo():
+    """
+    Returns:
+        bool: True if a rollback/undo/retry/checkout can be redone
+    """
+    return bool(STATE.get("snapshots", {}).get("redo"))
+
+
+def get_checkout_choices():
+    """
+    Get list of phases that have a snapshot to check out
+    
+    Returns:
+        list: List of (phase_index, phase_name) tuples
+    """
+    phases = STATE.get("phases", [])
+    return [(i, phases[i]) for i in range(len(phases)) if phase_snapshot(i) is not None]
+
+
 def get_completed_phases_count():
     """
     Get count of completed phases (for display)
@@ -203,6 +288,5 @@ def get_completed_phases_count():
     Returns:
         int: Number of completed phases
     """
-    history = get_phase_history()
     # Count only completion entries (not rollback/retry/undo)
-    return sum(1 for entry in history if "action" not in entry)
+    return count_completed_phases()
@@ -4,7 +4,7 @@ Handles task CRUD operations, completion tracking, and time tracking
 """
 
 from datetime import datetime
-from state.store import STATE, save_state
+from state.store import STATE, set_value, append_value, delete_value, transaction
 
 
 def save_tasks(phase_index, tasks):
@@ -15,26 +15,20 @@ def save_tasks(phase_index, tasks):
         phase_index: Index of the phase
         tasks: List of task description strings
     """
-    # Initialize phase_tasks if it doesn't exist (backward compatibility)
-    if "phase_tasks" not in STATE:
-        STATE["phase_tasks"] = {}
-    
     # Convert string tasks to task objects if new
     phase_key = str(phase_index)
     
-    if phase_key not in STATE["phase_tasks"]:
-        # New phase, create task objects
-        STATE["phase_tasks"][phase_key] = [
+    if phase_key not in STATE.get("phase_tasks", {}):
+        # New phase, create task objects (phase_tasks is created if missing)
+        set_value(["phase_tasks", phase_key], [
             {
                 "task": task,
                 "completed": False,
                 "started_at": None
             }
             for task in tasks
-        ]
+        ])
     # If tasks already exist, don't overwrite (preserves completion status)
-    
-    save_state()
 
 
 def get_tasks(phase_index):
@@ -68,10 +62,11 @@ def mark_task_complete(phase_index, task_index):
     tasks = get_tasks(phase_index)
     
     if 0 <= task_index < len(tasks):
-        tasks[task_index]["completed"] = True
-        if tasks[task_index]["started_at"] is None:
-            tasks[task_index]["started_at"] = datetime.now().isoformat()
-        save_state()
+        path = ["phase_tasks", str(phase_index), task_index]
+        with transaction():
+            set_value(path + ["completed"], True)
+            if tasks[task_index]["started_at"] is None:
+                set_value(path + ["started_at"], datetime.now().isoformat())
         return True
     
     return False
@@ -91,8 +86,7 @@ def mark_task_incomplete(phase_index, task_index):
     tasks = get_tasks(phase_index)
     
     if 0 <= task_index < len(tasks):
-        tasks[task_index]["completed"] = False
-        save_state()
+        set_value(["phase_tasks", str(phase_index), task_index, "completed"], False)
         return True
     
     return False
@@ -106,21 +100,12 @@ def add_task(phase_index, task_description):
         phase_index: Index of the phase
         task_description: Description of the new task
     """
-    if "phase_tasks" not in STATE:
-        STATE["phase_tasks"] = {}
-    
-    phase_key = str(phase_index)
-    
-    if phase_key not in STATE["phase_tasks"]:
-        STATE["phase_tasks"][phase_key] = []
-    
-    STATE["phase_tasks"][phase_key].append({
+    # The phase's task list is created if missing
+    append_value(["phase_tasks", str(phase_index)], {
         "task": task_description,
         "completed": False,
         "started_at": None
     })
-    
-    save_state()
 
 
 def delete_task(phase_index, task_index):
@@ -137,8 +122,7 @@ def delete_task(phase_index, task_index):
     tasks = get_tasks(phase_index)
     
     if 0 <= task_index < len(tasks):
-        tasks.pop(task_index)
-        save_state()
+        delete_value(["phase_tasks", str(phase_index), task_index])
         return True
     
     return False
@@ -159,8 +143,7 @@ def edit_task(phase_index, task_index, new_description):
     tasks = get_tasks(phase_index)
     
     if 0 <= task_index < len(tasks):
-        tasks[task_index]["task"] = new_description
-        save_state()
+        set_value(["phase_tasks", str(phase_index), task_index, "task"], new_description)
         return True
     
     return False
@@ -195,17 +178,13 @@ def start_phase_timer(phase_index):
     Args:
         phase_index: Index of the phase
     """
-    if "phase_time_tracking" not in STATE:
-        STATE["phase_time_tracking"] = {}
-    
     phase_key = str(phase_index)
     
-    if phase_key not in STATE["phase_time_tracking"]:
-        STATE["phase_time_tracking"][phase_key] = {
+    if phase_key not in STATE.get("phase_time_tracking", {}):
+        set_value(["phase_time_tracking", phase_key], {
             "started_at": datetime.now().isoformat(),
             "completed_at": None
-        }
-        save_state()
+        })
 
 
 def complete_phase_timer(phase_index):
@@ -224,21 +203,40 @@ def complete_phase_timer(phase_index):
     phase_key = str(phase_index)
     
     if phase_key in STATE["phase_time_tracking"]:
-        STATE["phase_time_tracking"][phase_key]["completed_at"] = datetime.now().isoformat()
-        save_state()
-        
-        # Calculate duration
-        started = datetime.fromisoformat(STATE["phase_time_tracking"][phase_key]["started_at"])
-        completed = datetime.fromisoformat(STATE["phase_time_tracking"][phase_key]["completed_at"])
-        duration = completed - started
-        
-        # Format as human-readable
-        hours = int(duration.total_seconds() // 3600)
-        minutes = int((duration.total_seconds() % 3600) // 60)
-        
-        if hours > 0:
-            return f"{hours}h {minutes}m"
-        else:
-            return f"{minutes}m"
+        set_value(["phase_time_tracking", phase_key, "completed_at"], datetime.now().isoformat())
+        return format_duration(get_phase_duration(phase_index))
     
     return None
+
+
+def get_phase_duration(phase_index):
+    """
+    Time spent on a phase, from its timer
+    
+    Args:
+        phase_index: Index of the phase
+        
+    Returns:
+        float: Seconds between start and completion, or None if the phase isn't timed and completed
+    """
+    timer = STATE.get("phase_time_tracking", {}).get(str(phase_index))
+    if not timer or not timer.get("started_at") or not timer.get("completed_at"):
+        return None
+    started = datetime.fromisoformat(timer["started_at"])
+    completed = datetime.fromisoformat(timer["completed_at"])
+    return (completed - started).total_seconds()
+
+
+def format_duration(seconds):
+    """
+    Format seconds as human-readable time (e.g., "1h 23m")
+    """
+    if seconds is None:
+        return None
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    else:
+        return f"{minutes}m"
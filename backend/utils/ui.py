@@ -144,6 +144,8 @@ def print_task_commands():
   [yellow]rollback[/yellow]               Go back to a previous phase
   [yellow]retry-phase[/yellow]            Reset current phase and start over
   [yellow]undo-verify[/yellow]            Undo last phase verification
+  [yellow]checkout <number>[/yellow]      Restore a completed phase as it was
+  [yellow]redo[/yellow]                   Redo the last rollback/undo/retry/checkout
   [yellow]history[/yellow]                View phase completion history
   [yellow]suggest[/yellow]                Get smart suggestions based on current code
   [yellow]help[/yellow]                   Show this help message